@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -9,14 +9,174 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = None
     openai_model: str = "gpt-4o"
     openai_temperature: float = 0.7
+    openai_transcription_model: str = "whisper-1"
+    openai_transcription_backend: str = "async"  # "async" or "thread"
+    openai_transcription_max_concurrency: int = 4
+    openai_batch_max_concurrency: int = 8
+    openai_batch_max_retries: int = 3  # retries of a rate-limited batch prompt
+    openai_batch_backoff_seconds: float = 1.0  # first backoff when no Retry-After is given
+
+    # Response Cache Configuration
+    response_cache_enabled: bool = True
+    response_cache_ttl_seconds: float = 300.0
+    response_cache_max_entries: int = 1024
+    response_cache_max_bytes: int = 16 * 1024 * 1024
+
+    # Semantic Cache Configuration
+    # Off by default: answers are reused across users for prompts that merely look alike.
+    # Requires numpy (pip install numpy); without it the cache stays off.
+    semantic_cache_enabled: bool = False  # follows the response cache policy
+    semantic_cache_embedder: str = "hashing"  # "hashing" (local) or "openai"
+    semantic_cache_dimensions: int = 512  # hashing embedder only
+    semantic_cache_threshold: float = 0.92  # minimum cosine similarity of a hit
+    semantic_cache_max_entries: int = 4096
+    semantic_cache_ttl_seconds: float = 3600.0
+    semantic_cache_ann_min_entries: int = 1024  # use LSH candidates from this many entries
+    semantic_cache_lsh_tables: int = 8
+    semantic_cache_lsh_bits: int = 8
+
+    # AWS Bedrock Configuration
+    aws_region: str = "us-east-1"
+    aws_access_key_id: Optional[str] = None
+    aws_secret_access_key: Optional[str] = None
+    bedrock_model_id: str = "anthropic.claude-3-5-sonnet-20240620-v1:0"
+    bedrock_max_tokens: int = 4096
+    bedrock_temperature: float = 0.7
+    bedrock_endpoint_url: Optional[str] = None  # e.g. a local Bedrock runtime stub
+    bedrock_max_workers: int = 16
+    bedrock_max_pool_connections: int = 16
+    bedrock_connect_timeout: float = 5.0
+    bedrock_read_timeout: float = 120.0
+    bedrock_max_retries: int = 3  # retries after the first attempt
+    bedrock_retry_mode: str = "adaptive"  # "legacy", "standard" or "adaptive"
+    bedrock_stream_queue_size: int = 32
+
+    # LLM Gateway Configuration
+    llm_providers: List[str] = ["openai"]  # "openai", "bedrock", "stub" or registered
+    llm_routing_policy: str = "latency"  # "latency", "cost" or "weighted"
+    llm_provider_costs: Dict[str, float] = {}
+    llm_provider_weights: Dict[str, float] = {}
+    llm_provider_max_concurrency: Dict[str, int] = {}
+    llm_default_max_concurrency: int = 32
+    llm_hedge_after_seconds: Optional[float] = None
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30.0
+    llm_ewma_alpha: float = 0.2
+    llm_stub_latency: float = 0.05
+    llm_stub_failure_rate: float = 0.0
+
+    # Session Store Configuration
+    session_backend: str = "memory"  # "memory" or "sqlite"
+    session_sqlite_path: str = ".cache/sessions.db"
+    session_cache_max_entries: int = 1024
+    session_history_max_tokens: int = 3000
+    session_chars_per_token: float = 4.0
+    session_summary_enabled: bool = True
+    session_summary_trigger_tokens: int = 2000  # unsummarized history that triggers compaction
+    session_summary_keep_messages: int = 6  # newest messages never folded into the summary
+    session_summary_max_tokens: int = 300
 
     # ElevenLabs Configuration
     elevenlabs_api_key: Optional[str] = None
     elevenlabs_voice_id: str = "21m00Tcm4TlvDq8ikWAM"  # Rachel - default voice
     elevenlabs_model_id: str = "eleven_monolingual_v1"
+    elevenlabs_backend: str = "async"  # "async" or "thread"
+    elevenlabs_thread_pool_size: int = 8
+    elevenlabs_stream_queue_size: int = 8
+
+    # TTS Cache Configuration
+    tts_cache_enabled: bool = True
+    tts_cache_dir: str = ".cache/tts"
+    tts_cache_memory_bytes: int = 32 * 1024 * 1024
+    tts_cache_disk_bytes: int = 512 * 1024 * 1024
+    tts_cache_warmup_phrases: List[str] = [
+        "Thank you for using AIRA. Take care of your health. Goodbye!",
+    ]
+
+    # Voice WebSocket Configuration
+    voice_pipeline_min_sentence_chars: int = 20
+    voice_pipeline_max_tts_in_flight: int = 3
+    voice_transcriber: str = "buffered"  # "buffered", "chunked" or a registered backend
+    voice_partial_interval_bytes: int = 64 * 1024
+    voice_partial_max_concurrency: int = 2  # partial transcriptions in flight, apart from final ones
+    voice_max_utterance_bytes: int = 25 * 1024 * 1024
+
+    # Streaming Configuration
+    sse_heartbeat_seconds: float = 15.0  # idle time before a ": ping" comment is sent
 
     # Firecrawl Configuration
     firecrawl_api_key: Optional[str] = None
+    firecrawl_max_workers: int = 8
+    firecrawl_crawl_poll_seconds: float = 2.0
+    firecrawl_per_host_concurrency: int = 2  # bulk scrape requests in flight per host
+    firecrawl_per_host_interval_seconds: float = 0.5  # gap between bulk scrape starts per host
+
+    # Search Cache Configuration
+    search_cache_enabled: bool = True
+    # Freshness per result format; links change less often than page content
+    search_cache_ttl_seconds: Dict[str, float] = {"links": 86400, "markdown": 3600, "html": 3600}
+    search_cache_default_ttl_seconds: float = 3600
+    search_cache_stale_seconds: float = 86400  # serve stale results this long while refreshing
+    search_cache_max_bytes: int = 64 * 1024 * 1024  # compressed
+    search_cache_compression_level: int = 6
+
+    # Retrieval (RAG) Configuration
+    rag_index_path: str = ".cache/rag.db"
+    rag_auto_index: bool = True  # index pages returned by scrapes and crawls
+    rag_chunk_chars: int = 1200
+    rag_chunk_overlap_chars: int = 200
+    rag_top_k: int = 5
+    rag_bm25_k1: float = 1.2
+    rag_bm25_b: float = 0.75
+    rag_context_max_chars: int = 6000  # retrieved text added to the system prompt
+    rag_embeddings_enabled: bool = False  # requires numpy
+    rag_embedding_model: str = "text-embedding-3-small"
+    rag_embedding_dimensions: int = 512
+    rag_embeddings_path: str = ".cache/rag_embeddings.f32"
+
+    # Job Queue Configuration
+    job_store_path: str = ".cache/jobs.db"
+    job_workers: int = 4  # jobs running at once
+    job_max_concurrency: Dict[str, int] = {"crawl": 2, "batch_generate": 2}
+    job_results_page_size: int = 100
+    job_lease_seconds: float = 30.0  # running jobs not renewed for this long are requeued
+
+    # Metrics Configuration
+    metrics_enabled: bool = True  # per-route HTTP metrics; /metrics is always served
+
+    # Event Loop Monitor Configuration
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_seconds: float = 0.1  # how often lag is sampled
+    loop_monitor_block_threshold_seconds: float = 0.1  # lag counted as a block
+    loop_monitor_debug: bool = False  # print the loop thread's stack during blocks
+
+    # Admission Control Configuration
+    admission_enabled: bool = True
+    # Path prefix -> upstream whose concurrency limit the request counts against
+    admission_routes: Dict[str, str] = {
+        "/api/v1/bedrock": "llm",
+        "/api/v1/aws-bedrock": "llm",
+        "/api/v1/rag/chat": "llm",
+        "/api/v1/voice": "tts",
+        "/api/v1/transcription": "stt",
+        "/api/v1/search": "search",
+    }
+    admission_batch_paths: List[str] = ["/generate/batch"]  # admitted at batch priority
+    admission_initial_limit: int = 16
+    admission_min_limit: int = 2
+    admission_max_limit: int = 256
+    admission_latency_tolerance: float = 2.0  # short/long latency ratio tolerated before shrinking
+    admission_backoff: float = 0.7  # limit multiplier after an upstream failure
+    admission_queue_size: int = 64
+    admission_queue_timeout_seconds: float = 2.0
+    # Share of the limit each priority class may fill
+    admission_priority_shares: Dict[str, float] = {"voice": 1.0, "interactive": 0.9, "batch": 0.5}
+
+    # Tracing Configuration
+    tracing_enabled: bool = False
+    tracing_sample_ratio: float = 0.1  # share of new traces recorded, 0.0-1.0
+    tracing_exporter: str = "jsonl"  # jsonl or none; see register_exporter
+    tracing_jsonl_path: str = ".cache/traces.jsonl"
 
     # API Configuration
     api_title: str = "Medi-AI FastAPI Backend"
@@ -1,10 +1,20 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.routes import openai_router
+from app.routes import openai_router, bedrock_router
+from app.routes.admission import AdmissionMiddleware
+from app.routes.jobs import router as jobs_router
+from app.routes.metrics import MetricsMiddleware, router as metrics_router
+from app.routes.rag import router as rag_router
+from app.routes.search import router as search_router
+from app.routes.tracing import TracingMiddleware
 from app.routes.transcription import router as transcription_router
 from app.routes.voice import router as voice_router
 from app.routes.websocket import router as websocket_router
+from app.services.elevenlabs_service import elevenlabs_service
+from app.services.job_queue import job_queue
+from app.services.loop_monitor import loop_monitor
 
 # Create FastAPI application
 app = FastAPI(
@@ -15,6 +25,10 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+# Shed load for saturated upstreams; added first so 503s still get CORS headers
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -24,11 +38,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route request counts and latency, exposed at /metrics
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# Root span per request; sampled traces go to the configured exporter
+if settings.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(openai_router)
+app.include_router(bedrock_router)
 app.include_router(transcription_router)
 app.include_router(voice_router)
 app.include_router(websocket_router)
+app.include_router(jobs_router)
+app.include_router(search_router)
+app.include_router(rag_router)
+app.include_router(metrics_router)
+
+
+@app.on_event("startup")
+async def warm_up_tts_cache():
+    """Pre-synthesize configured phrases in the background."""
+    if settings.tts_cache_enabled and settings.tts_cache_warmup_phrases:
+        app.state.tts_warmup = asyncio.create_task(
+            elevenlabs_service.warm_up_cache(settings.tts_cache_warmup_phrases)
+        )
+
+
+@app.on_event("startup")
+async def start_job_queue():
+    """Resume background jobs interrupted by the last shutdown."""
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    """Stop running jobs; they are resumed on the next startup."""
+    await job_queue.stop()
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    """Sample event loop lag for /metrics."""
+    if settings.loop_monitor_enabled:
+        await loop_monitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    """Stop the event loop monitor."""
+    await loop_monitor.stop()
 
 
 @app.get("/")
@@ -1,17 +1,45 @@
 from .schemas import (
     GenerateRequest,
     GenerateResponse,
+    BatchGenerateRequest,
+    BatchGenerateResult,
     ChatMessage,
     ChatRequest,
     ChatResponse,
+    ConversationMessageRequest,
+    ConversationResponse,
+    CrawlJobRequest,
+    JobResponse,
+    JobResultsResponse,
+    IndexDocumentRequest,
+    IndexDocumentResponse,
+    RetrievalSearchRequest,
+    RetrievedChunk,
+    RetrievalSearchResponse,
+    RetrievalChatRequest,
+    RetrievalChatResponse,
     ErrorResponse,
 )
 
 __all__ = [
     "GenerateRequest",
     "GenerateResponse",
+    "BatchGenerateRequest",
+    "BatchGenerateResult",
     "ChatMessage",
     "ChatRequest",
     "ChatResponse",
+    "ConversationMessageRequest",
+    "ConversationResponse",
+    "CrawlJobRequest",
+    "JobResponse",
+    "JobResultsResponse",
+    "IndexDocumentRequest",
+    "IndexDocumentResponse",
+    "RetrievalSearchRequest",
+    "RetrievedChunk",
+    "RetrievalSearchResponse",
+    "RetrievalChatRequest",
+    "RetrievalChatResponse",
     "ErrorResponse",
 ]
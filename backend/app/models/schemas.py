@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, HttpUrl
 from typing import Optional, List, Dict, Any
 
 
@@ -9,6 +9,7 @@ class GenerateRequest(BaseModel):
     max_tokens: Optional[int] = Field(None, description="Maximum tokens to generate", ge=1, le=8192)
     temperature: Optional[float] = Field(None, description="Sampling temperature", ge=0.0, le=1.0)
     system_prompt: Optional[str] = Field(None, description="Optional system prompt")
+    cache: Optional[bool] = Field(None, description="Force (true) or bypass (false) the response cache; by default only temperature 0 is cached")
 
     model_config = {
         "json_schema_extra": {
@@ -32,6 +33,76 @@ class GenerateResponse(BaseModel):
     usage: Optional[Dict[str, Any]] = Field(None, description="Token usage information")
     stop_reason: Optional[str] = Field(None, description="Reason for stopping generation")
     error: Optional[str] = Field(None, description="Error message if failed")
+    cached: bool = Field(False, description="Whether the response was served from the cache")
+    provider: Optional[str] = Field(None, description="LLM provider that produced the response")
+
+
+class BatchGenerateRequest(BaseModel):
+    """Request model for batch text generation."""
+
+    prompts: List[str] = Field(..., description="User prompts", min_length=1, max_length=1000)
+    temperature: Optional[float] = Field(None, description="Sampling temperature", ge=0.0, le=1.0)
+    system_prompt: Optional[str] = Field(None, description="Optional system prompt shared by all prompts")
+    cache: Optional[bool] = Field(None, description="Force (true) or bypass (false) the response cache; by default only temperature 0 is cached")
+    max_concurrency: Optional[int] = Field(None, description="Prompts in flight at once (capped by the server)", ge=1)
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "prompts": [
+                        "Summarize: patient reports mild headache for two days.",
+                        "Summarize: follow-up visit, blood pressure normal."
+                    ],
+                    "temperature": 0,
+                    "max_concurrency": 4
+                }
+            ]
+        }
+    }
+
+
+class BatchGenerateResult(BaseModel):
+    """One NDJSON line of a batch generation response."""
+
+    index: int = Field(..., description="Position of the prompt in the request")
+    success: bool = Field(..., description="Whether this prompt succeeded")
+    content: Optional[str] = Field(None, description="Generated text content")
+    model: str = Field(..., description="Model used for generation")
+    usage: Optional[Dict[str, Any]] = Field(None, description="Token usage information")
+    error: Optional[str] = Field(None, description="Error message if failed")
+    cached: bool = Field(False, description="Whether the response was served from the cache")
+
+
+class CrawlJobRequest(BaseModel):
+    """Request model for a background website crawl."""
+
+    url: HttpUrl = Field(..., description="Starting URL to crawl")
+    max_depth: int = Field(2, description="Maximum depth to crawl", ge=1)
+    limit: int = Field(10, description="Maximum number of pages to crawl", ge=1)
+
+
+class JobResponse(BaseModel):
+    """Response model for a background job."""
+
+    id: str = Field(..., description="Job ID")
+    kind: str = Field(..., description="Job kind (crawl, batch_generate, ...)")
+    status: str = Field(..., description="queued, running, succeeded, failed or cancelled")
+    params: Dict[str, Any] = Field(..., description="Parameters the job was submitted with")
+    error: Optional[str] = Field(None, description="Error message if failed")
+    result_count: int = Field(0, description="Results saved so far")
+    created_at: float = Field(..., description="Submission time (Unix seconds)")
+    updated_at: float = Field(..., description="Last status or result change (Unix seconds)")
+
+
+class JobResultsResponse(BaseModel):
+    """One page of a job's results."""
+
+    job_id: str = Field(..., description="Job ID")
+    status: str = Field(..., description="Job status when the page was read")
+    offset: int = Field(..., description="Index of the first result in this page")
+    results: List[Dict[str, Any]] = Field(default_factory=list, description="Results, in the order they were saved")
+    next_offset: Optional[int] = Field(None, description="Offset of the next page, if more results may follow")
 
 
 class ChatMessage(BaseModel):
@@ -59,6 +130,7 @@ class ChatRequest(BaseModel):
     max_tokens: Optional[int] = Field(None, description="Maximum tokens to generate", ge=1, le=8192)
     temperature: Optional[float] = Field(None, description="Sampling temperature", ge=0.0, le=1.0)
     system_prompt: Optional[str] = Field(None, description="Optional system prompt")
+    cache: Optional[bool] = Field(None, description="Force (true) or bypass (false) the response cache; by default only temperature 0 is cached")
 
     model_config = {
         "json_schema_extra": {
@@ -86,6 +158,92 @@ class ChatResponse(BaseModel):
     usage: Optional[Dict[str, Any]] = Field(None, description="Token usage information")
     stop_reason: Optional[str] = Field(None, description="Reason for stopping generation")
     error: Optional[str] = Field(None, description="Error message if failed")
+    cached: bool = Field(False, description="Whether the response was served from the cache")
+    provider: Optional[str] = Field(None, description="LLM provider that produced the response")
+    conversation_id: Optional[str] = Field(None, description="Conversation the response was appended to")
+
+
+class ConversationMessageRequest(BaseModel):
+    """Request model for appending a user message to a stored conversation."""
+
+    content: str = Field(..., description="The new user message", min_length=1)
+    max_tokens: Optional[int] = Field(None, description="Maximum tokens to generate", ge=1, le=8192)
+    temperature: Optional[float] = Field(None, description="Sampling temperature", ge=0.0, le=1.0)
+    system_prompt: Optional[str] = Field(None, description="Optional system prompt")
+    history_max_tokens: Optional[int] = Field(None, description="Token budget for the history sent to the model", ge=1)
+    cache: Optional[bool] = Field(None, description="Force (true) or bypass (false) the response cache; by default only temperature 0 is cached")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "content": "What are its main features?",
+                    "max_tokens": 500,
+                    "temperature": 0.7
+                }
+            ]
+        }
+    }
+
+
+class ConversationResponse(BaseModel):
+    """Response model for a stored conversation."""
+
+    conversation_id: str = Field(..., description="Conversation ID")
+    messages: List[ChatMessage] = Field(default_factory=list, description="Full conversation history")
+
+
+class IndexDocumentRequest(BaseModel):
+    """Request model for adding a document to the retrieval index."""
+
+    url: str = Field(..., description="Document URL, used as its identity", min_length=1)
+    content: str = Field(..., description="Document text (markdown)", min_length=1)
+    title: str = Field("", description="Document title")
+
+
+class IndexDocumentResponse(BaseModel):
+    """Response model for an indexed document."""
+
+    url: str = Field(..., description="Document URL")
+    chunks: int = Field(..., description="Number of chunks stored for the document")
+    indexed: bool = Field(..., description="False if the same content was already indexed")
+
+
+class RetrievalSearchRequest(BaseModel):
+    """Request model for searching the retrieval index."""
+
+    query: str = Field(..., description="Search text", min_length=1)
+    k: Optional[int] = Field(None, description="Number of chunks to return", ge=1, le=50)
+
+
+class RetrievedChunk(BaseModel):
+    """One chunk returned by the retrieval index."""
+
+    url: str = Field(..., description="Source document URL")
+    title: str = Field("", description="Source document title")
+    text: str = Field(..., description="Chunk text")
+    score: float = Field(..., description="Relevance score (higher is better)")
+
+
+class RetrievalSearchResponse(BaseModel):
+    """Response model for a retrieval search."""
+
+    query: str = Field(..., description="Search text")
+    results: List[RetrievedChunk] = Field(default_factory=list, description="Chunks, best first")
+    count: int = Field(..., description="Number of chunks returned")
+    took_ms: float = Field(..., description="Search time in milliseconds")
+
+
+class RetrievalChatRequest(ChatRequest):
+    """Request model for chat grounded in the retrieval index."""
+
+    k: Optional[int] = Field(None, description="Number of chunks to retrieve", ge=1, le=50)
+
+
+class RetrievalChatResponse(ChatResponse):
+    """Response model for chat grounded in the retrieval index."""
+
+    sources: List[RetrievedChunk] = Field(default_factory=list, description="Chunks given to the model, numbered in order")
 
 
 class ErrorResponse(BaseModel):
@@ -1,3 +1,4 @@
 from .openai import router as openai_router
+from .bedrock import router as bedrock_router
 
-__all__ = ["openai_router"]
+__all__ = ["openai_router", "bedrock_router"]
@@ -0,0 +1,67 @@
+import time
+from fastapi.responses import JSONResponse
+from app.config import settings
+from app.services.admission import PRIORITIES, Overloaded, admission
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that sheds load before it reaches saturated upstreams.
+
+    Non-GET requests under a prefix in ``admission_routes`` take a slot of
+    that upstream's adaptive limiter for as long as the response is sent.
+    GET routes there only read local state (stats, stored conversations) and
+    are not admitted. Paths in ``admission_batch_paths``, and requests sent
+    with ``X-Priority: batch`` (e.g. dashboards), queue behind interactive
+    ones. When no slot frees up in time, the request is answered at once
+    with 503 and a Retry-After header instead of timing out upstream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _priority(scope) -> str:
+        path = scope["path"]
+        if any(batch_path in path for batch_path in settings.admission_batch_paths):
+            return "batch"
+        header = next((value for name, value in scope["headers"] if name == b"x-priority"), b"")
+        # Clients may lower their priority, never raise it to voice
+        return "batch" if header.strip().lower() == b"batch" else "interactive"
+
+    async def __call__(self, scope, receive, send):
+        upstream = None
+        if settings.admission_enabled and scope["type"] == "http" and scope["method"] != "GET":
+            upstream = admission.route(scope["path"])
+        if upstream is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = admission.limiter(upstream)
+        try:
+            await limiter.acquire(PRIORITIES[self._priority(scope)])
+        except Overloaded as e:
+            response = JSONResponse(
+                {"detail": str(e)},
+                status_code=503,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        latency = None
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal latency, status_code
+            if message["type"] == "http.response.start":
+                # Time to the first byte tracks the upstream; the body may be a long stream
+                latency = time.monotonic() - started
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            limiter.release(latency, failed=status_code >= 500 or status_code == 429)
@@ -0,0 +1,139 @@
+import json
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.config import settings
+from app.models import (
+    BatchGenerateRequest,
+    CrawlJobRequest,
+    JobResponse,
+    JobResultsResponse,
+)
+from app.services.job_queue import TERMINAL_STATES, job_queue
+
+router = APIRouter(prefix="/api/v1/jobs", tags=["jobs"])
+
+
+async def get_job_or_404(job_id: str) -> dict:
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}",
+        )
+    return job
+
+
+@router.post("/crawl", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_crawl(request: CrawlJobRequest):
+    """
+    Crawl a website in the background.
+
+    Returns immediately with the job; crawled pages are saved as results
+    while the crawl runs.
+
+    Args:
+        request: CrawlJobRequest with URL, max depth, and limit options
+
+    Returns:
+        The queued job
+    """
+    return await job_queue.submit("crawl", request.model_dump(mode="json"))
+
+
+@router.post("/generate-batch", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_batch_generation(request: BatchGenerateRequest):
+    """
+    Run a batch generation in the background.
+
+    Each prompt's result is saved as it finishes, tagged with its index.
+
+    Args:
+        request: BatchGenerateRequest with the prompts and shared parameters
+
+    Returns:
+        The queued job
+    """
+    return await job_queue.submit("batch_generate", request.model_dump())
+
+
+@router.get("", response_model=List[JobResponse])
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """List recent jobs, newest first, optionally filtered by status."""
+    return await job_queue.list(status, min(limit, 500))
+
+
+@router.get("/stats")
+async def job_stats():
+    """Jobs running or waiting in this process and the concurrency limits."""
+    return job_queue.stats()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Get a job's status.
+
+    Raises:
+        HTTPException: If the job does not exist
+    """
+    return await get_job_or_404(job_id)
+
+
+@router.get("/{job_id}/results", response_model=JobResultsResponse)
+async def get_job_results(job_id: str, offset: int = 0, limit: Optional[int] = None):
+    """
+    Get one page of a job's results.
+
+    Poll with ``next_offset`` until it is null to read every result.
+
+    Raises:
+        HTTPException: If the job does not exist
+    """
+    job = await get_job_or_404(job_id)
+    limit = min(limit or settings.job_results_page_size, settings.job_results_page_size)
+    results = await job_queue.results(job_id, offset, limit)
+    next_offset = offset + len(results)
+    if job["status"] in TERMINAL_STATES and next_offset >= job["result_count"]:
+        next_offset = None
+    return JobResultsResponse(
+        job_id=job_id,
+        status=job["status"],
+        offset=offset,
+        results=results,
+        next_offset=next_offset,
+    )
+
+
+@router.get("/{job_id}/results/stream")
+async def stream_job_results(job_id: str, offset: int = 0):
+    """
+    Stream a job's results as NDJSON, following the job until it finishes.
+
+    Raises:
+        HTTPException: If the job does not exist
+    """
+    await get_job_or_404(job_id)
+
+    async def lines():
+        async for result in job_queue.follow(job_id, offset):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.delete("/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job. Finished jobs are returned unchanged.
+
+    Raises:
+        HTTPException: If the job does not exist
+    """
+    job = await job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}",
+        )
+    return job
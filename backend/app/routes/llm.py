@@ -0,0 +1,344 @@
+import uuid
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.models import (
+    GenerateRequest,
+    GenerateResponse,
+    ChatRequest,
+    ChatResponse,
+    ConversationMessageRequest,
+    ConversationResponse,
+)
+from app.routes.sse import sse_response, wants_sse
+from app.services.llm_gateway import llm_gateway
+from app.services.session_store import session_store, with_summary
+
+
+def create_llm_router(
+    prefix: str,
+    tags: List[str],
+    service: str,
+    providers: Optional[List[str]] = None,
+) -> APIRouter:
+    """
+    Build the text generation routes on top of the LLM gateway.
+
+    Args:
+        prefix: URL prefix of the router
+        tags: OpenAPI tags
+        service: Name reported by the health check
+        providers: Restrict routing to these providers (defaults to ``llm_providers``)
+
+    Returns:
+        APIRouter with /health, /generate, /generate/stream, /chat,
+        /chat/stream and the /conversations session endpoints
+    """
+    router = APIRouter(prefix=prefix, tags=tags)
+
+    @router.get("/health")
+    async def health_check():
+        """Health check endpoint."""
+        return {"status": "healthy", "service": service}
+
+    @router.post("/generate", response_model=GenerateResponse)
+    async def generate_text(request: GenerateRequest):
+        """
+        Generate text from a single prompt.
+
+        The request is routed through the LLM gateway to the best available
+        provider, failing over to the next one if it errors.
+
+        Args:
+            request: GenerateRequest with prompt and optional parameters
+
+        Returns:
+            GenerateResponse with generated text and metadata
+
+        Raises:
+            HTTPException: If generation fails
+        """
+        try:
+            result = await llm_gateway.complete(
+                messages=[{"role": "user", "content": request.prompt}],
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                system_prompt=request.system_prompt,
+                cache=request.cache,
+                providers=providers,
+            )
+
+            if not result["success"]:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Text generation failed: {result.get('error', 'Unknown error')}",
+                )
+
+            return GenerateResponse(**result)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An unexpected error occurred: {str(e)}",
+            )
+
+    @router.post("/generate/stream")
+    async def generate_text_stream(
+        request: GenerateRequest,
+        http_request: Request,
+        format: Optional[str] = None,
+    ):
+        """
+        Generate text from a single prompt with streaming.
+
+        This endpoint streams the generated response token-by-token for a better
+        user experience with long responses.
+
+        By default the body is plain text. With ``?format=sse`` or an
+        ``Accept: text/event-stream`` header it is a Server-Sent Events
+        stream of typed events:
+
+        event: delta  data: {"content": "..."}
+        event: usage  data: {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        event: done   data: {"finish_reason": "stop", "model": "...", "provider": "..."}
+        event: error  data: {"message": "..."}
+
+        Args:
+            request: GenerateRequest with prompt and optional parameters
+            http_request: Incoming request, used for content negotiation
+            format: "sse" or "text" to override the Accept header
+
+        Returns:
+            StreamingResponse with generated text chunks or SSE events
+
+        Raises:
+            HTTPException: If generation fails
+        """
+        messages = [{"role": "user", "content": request.prompt}]
+
+        if wants_sse(http_request, format):
+            try:
+                return await sse_response(llm_gateway.stream_events(
+                    messages=messages,
+                    max_tokens=request.max_tokens,
+                    temperature=request.temperature,
+                    system_prompt=request.system_prompt,
+                    providers=providers,
+                ))
+
+            except Exception as e:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Streaming generation failed: {str(e)}",
+                )
+
+        try:
+            chunks = llm_gateway.stream(
+                messages=messages,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                system_prompt=request.system_prompt,
+                providers=providers,
+            )
+
+            # Wait for the first chunk so a failure on every provider is a 500
+            try:
+                first_chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                first_chunk = ""
+
+            async def generate():
+                # A failure after the first chunk aborts the response rather
+                # than passing error text off as generated output
+                try:
+                    yield first_chunk
+                    async for chunk in chunks:
+                        yield chunk
+                finally:
+                    await chunks.aclose()
+
+            return StreamingResponse(
+                generate(),
+                media_type="text/plain",
+            )
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Streaming generation failed: {str(e)}",
+            )
+
+    @router.post("/chat", response_model=ChatResponse)
+    async def chat_completion(request: ChatRequest):
+        """
+        Multi-turn chat completion.
+
+        This endpoint supports conversation history with multiple messages.
+
+        Args:
+            request: ChatRequest with message history and optional parameters
+
+        Returns:
+            ChatResponse with generated response and metadata
+
+        Raises:
+            HTTPException: If chat completion fails
+        """
+        try:
+            # Convert Pydantic models to dicts
+            messages = [msg.model_dump() for msg in request.messages]
+
+            result = await llm_gateway.complete(
+                messages=messages,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                system_prompt=request.system_prompt,
+                cache=request.cache,
+                providers=providers,
+            )
+
+            if not result["success"]:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Chat completion failed: {result.get('error', 'Unknown error')}",
+                )
+
+            return ChatResponse(**result)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An unexpected error occurred: {str(e)}",
+            )
+
+    @router.post("/chat/stream")
+    async def chat_completion_stream(request: ChatRequest):
+        """
+        Multi-turn chat completion with streaming.
+
+        Streams the answer as Server-Sent Events, with the same events as
+        ``/generate/stream?format=sse``: "delta" for each token chunk, then
+        a final "usage" and "done" (or "error"). If the client disconnects,
+        the upstream completion is cancelled.
+
+        Args:
+            request: ChatRequest with message history and optional parameters
+
+        Returns:
+            StreamingResponse with SSE events
+
+        Raises:
+            HTTPException: If the stream cannot be started
+        """
+        try:
+            # Convert Pydantic models to dicts
+            messages = [msg.model_dump() for msg in request.messages]
+
+            return await sse_response(llm_gateway.stream_events(
+                messages=messages,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                system_prompt=request.system_prompt,
+                providers=providers,
+            ))
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Streaming chat failed: {str(e)}",
+            )
+
+    @router.post("/conversations", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED)
+    async def create_conversation():
+        """
+        Start a server-side conversation.
+
+        Returns:
+            ConversationResponse with the new conversation ID
+        """
+        conversation_id = uuid.uuid4().hex
+        await session_store.create(conversation_id)
+        return ConversationResponse(conversation_id=conversation_id)
+
+    @router.get("/conversations/{conversation_id}", response_model=ConversationResponse)
+    async def get_conversation(conversation_id: str):
+        """
+        Return the full history of a stored conversation.
+
+        Raises:
+            HTTPException: If the conversation does not exist
+        """
+        history = await session_store.get(conversation_id)
+        if history is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Conversation not found: {conversation_id}",
+            )
+        return ConversationResponse(conversation_id=conversation_id, messages=history)
+
+    @router.delete("/conversations/{conversation_id}", status_code=status.HTTP_204_NO_CONTENT)
+    async def delete_conversation(conversation_id: str):
+        """Forget a stored conversation."""
+        await session_store.delete(conversation_id)
+
+    @router.post("/conversations/{conversation_id}/messages", response_model=ChatResponse)
+    async def append_message(conversation_id: str, request: ConversationMessageRequest):
+        """
+        Send one new user message in a stored conversation.
+
+        Only the new message travels over the wire; the server adds it to the
+        stored history and sends the running summary of older turns plus the
+        most recent messages that fit the token budget to the model. The user
+        message and the reply are stored only if the completion succeeds.
+        Unknown conversation IDs start a new conversation.
+
+        Args:
+            conversation_id: Conversation to continue
+            request: ConversationMessageRequest with the new message
+
+        Returns:
+            ChatResponse with generated response and metadata
+
+        Raises:
+            HTTPException: If chat completion fails
+        """
+        try:
+            user_message = {"role": "user", "content": request.content}
+            summary, messages = await session_store.context(
+                conversation_id, [user_message], request.history_max_tokens
+            )
+
+            result = await llm_gateway.complete(
+                messages=messages,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                system_prompt=with_summary(request.system_prompt, summary),
+                cache=request.cache,
+                providers=providers,
+            )
+
+            if not result["success"]:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Chat completion failed: {result.get('error', 'Unknown error')}",
+                )
+
+            await session_store.append(conversation_id, [
+                user_message,
+                {"role": "assistant", "content": result["content"]},
+            ])
+            return ChatResponse(**result, conversation_id=conversation_id)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"An unexpected error occurred: {str(e)}",
+            )
+
+    return router
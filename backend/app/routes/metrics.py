@@ -0,0 +1,67 @@
+import time
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.admission import admission
+from app.services.loop_monitor import loop_monitor
+from app.services.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS, metrics
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts and latency per route.
+
+    Requests are labelled with the route's path template (e.g.
+    ``/api/v1/jobs/{job_id}``) so IDs do not create new series; requests
+    that match no route share the "unmatched" label. Latency runs until the
+    last body chunk is sent, so streaming responses are timed in full.
+    Written as plain ASGI rather than ``BaseHTTPMiddleware`` so streaming
+    bodies are passed through unbuffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.labels(method, path, str(status_code)).inc()
+            HTTP_REQUEST_SECONDS.labels(method, path).observe(time.perf_counter() - started)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@router.get("/metrics/loop")
+async def event_loop_stats():
+    """Event loop lag and block counts seen by the loop monitor."""
+    return loop_monitor.stats()
+
+
+@router.get("/metrics/admission")
+async def admission_stats():
+    """Adaptive concurrency limits, queues and shed requests per upstream."""
+    return admission.stats()
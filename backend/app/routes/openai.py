@@ -1,140 +1,69 @@
-from fastapi import APIRouter, HTTPException, status
 from fastapi.responses import StreamingResponse
-from app.models import (
-    GenerateRequest,
-    GenerateResponse,
-    ChatRequest,
-    ChatResponse,
-)
+from app.models import BatchGenerateRequest, BatchGenerateResult
+from app.routes.llm import create_llm_router
+from app.services.llm_gateway import llm_gateway
 from app.services.openai_service import openai_service
+from app.services.response_cache import response_cache
+from app.services.semantic_cache import semantic_cache
 
-# Keep the same prefix for backward compatibility with frontend
-router = APIRouter(prefix="/api/v1/bedrock", tags=["openai"])
+# Keep the same prefix for backward compatibility with frontend. Requests are
+# routed by the LLM gateway across the providers in LLM_PROVIDERS.
+router = create_llm_router(prefix="/api/v1/bedrock", tags=["openai"], service="openai")
 
 
-@router.get("/health")
-async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy", "service": "openai"}
-
-
-@router.post("/generate", response_model=GenerateResponse)
-async def generate_text(request: GenerateRequest):
+@router.post("/generate/batch")
+async def generate_batch(request: BatchGenerateRequest):
     """
-    Generate text using OpenAI model.
+    Generate text for many prompts in one request.
 
-    This endpoint accepts a prompt and generates a response using the configured
-    OpenAI model.
+    Prompts run concurrently, bounded by ``max_concurrency``, and each result
+    is streamed back as an NDJSON line as soon as it finishes, so lines
+    arrive in completion order and carry the prompt's ``index``. A failed
+    prompt yields a line with ``success: false`` and does not stop the batch.
 
     Args:
-        request: GenerateRequest with prompt and optional parameters
+        request: BatchGenerateRequest with the prompts and shared parameters
 
     Returns:
-        GenerateResponse with generated text and metadata
-
-    Raises:
-        HTTPException: If generation fails
+        StreamingResponse of application/x-ndjson BatchGenerateResult lines
     """
-    try:
-        result = await openai_service.generate_text(
-            prompt=request.prompt,
+    async def lines():
+        results = openai_service.generate_many(
+            prompts=request.prompts,
             temperature=request.temperature,
             system_prompt=request.system_prompt,
+            cache=request.cache,
+            max_concurrency=request.max_concurrency,
         )
+        try:
+            async for index, result in results:
+                line = BatchGenerateResult(index=index, **result)
+                yield line.model_dump_json() + "\n"
+        finally:
+            await results.aclose()
 
-        if not result["success"]:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Text generation failed: {result.get('error', 'Unknown error')}",
-            )
-
-        return GenerateResponse(**result)
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An unexpected error occurred: {str(e)}",
-        )
-
-
-@router.post("/generate/stream")
-async def generate_text_stream(request: GenerateRequest):
-    """
-    Generate text using OpenAI model with streaming.
-
-    This endpoint streams the generated response token-by-token for a better
-    user experience with long responses.
-
-    Args:
-        request: GenerateRequest with prompt and optional parameters
-
-    Returns:
-        StreamingResponse with generated text chunks
-
-    Raises:
-        HTTPException: If generation fails
-    """
-    try:
-        async def generate():
-            async for chunk in openai_service.stream_text(
-                prompt=request.prompt,
-                temperature=request.temperature,
-                system_prompt=request.system_prompt,
-            ):
-                yield chunk
-
-        return StreamingResponse(
-            generate(),
-            media_type="text/plain",
-        )
-
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Streaming generation failed: {str(e)}",
-        )
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat_completion(request: ChatRequest):
-    """
-    Multi-turn chat completion using OpenAI model.
+@router.get("/cache/stats")
+async def cache_stats():
+    """Response cache hit/miss counters."""
+    return response_cache.stats()
 
-    This endpoint supports conversation history with multiple messages.
 
-    Args:
-        request: ChatRequest with message history and optional parameters
+@router.get("/semantic-cache/stats")
+async def semantic_cache_stats():
+    """Semantic cache hit rate, size and upstream latency saved."""
+    return semantic_cache.stats()
 
-    Returns:
-        ChatResponse with generated response and metadata
 
-    Raises:
-        HTTPException: If chat completion fails
-    """
-    try:
-        # Convert Pydantic models to dicts
-        messages = [msg.model_dump() for msg in request.messages]
+@router.get("/coalescing/stats")
+async def coalescing_stats():
+    """Counters for identical in-flight requests joined into one upstream call."""
+    return openai_service.flights.stats()
 
-        result = await openai_service.chat_completion(
-            messages=messages,
-            temperature=request.temperature,
-            system_prompt=request.system_prompt,
-        )
 
-        if not result["success"]:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Chat completion failed: {result.get('error', 'Unknown error')}",
-            )
-
-        return ChatResponse(**result)
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An unexpected error occurred: {str(e)}",
-        )
+@router.get("/gateway/stats")
+async def gateway_stats():
+    """Per-provider latency, circuit state and concurrency of the LLM gateway."""
+    return llm_gateway.stats()
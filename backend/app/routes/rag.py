@@ -0,0 +1,132 @@
+import time
+from fastapi import APIRouter, HTTPException, status
+from app.models import (
+    IndexDocumentRequest,
+    IndexDocumentResponse,
+    RetrievalSearchRequest,
+    RetrievalSearchResponse,
+    RetrievalChatRequest,
+    RetrievalChatResponse,
+)
+from app.services.llm_gateway import llm_gateway
+from app.services.retrieval_index import fit_context, retrieval_index, with_context
+
+router = APIRouter(prefix="/api/v1/rag", tags=["rag"])
+
+
+@router.post("/documents", response_model=IndexDocumentResponse)
+async def index_document(request: IndexDocumentRequest):
+    """
+    Add a document to the retrieval index, replacing an earlier version.
+
+    Pages scraped or crawled through the search routes and crawl jobs are
+    indexed automatically; this endpoint indexes text from elsewhere.
+
+    Raises:
+        HTTPException: If indexing fails
+    """
+    try:
+        result = await retrieval_index.add_document(request.url, request.content, request.title)
+        return IndexDocumentResponse(**result)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Indexing failed: {str(e)}",
+        )
+
+
+@router.delete("/documents", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_document(url: str):
+    """
+    Remove a document from the retrieval index.
+
+    Raises:
+        HTTPException: If the document is not indexed
+    """
+    if not await retrieval_index.remove_document(url):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document not indexed: {url}",
+        )
+
+
+@router.post("/search", response_model=RetrievalSearchResponse)
+async def search_index(request: RetrievalSearchRequest):
+    """
+    Search the local index of scraped content.
+
+    Raises:
+        HTTPException: If the search fails
+    """
+    try:
+        started = time.perf_counter()
+        hits = await retrieval_index.search(request.query, request.k)
+        return RetrievalSearchResponse(
+            query=request.query,
+            results=hits,
+            count=len(hits),
+            took_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Index search failed: {str(e)}",
+        )
+
+
+@router.post("/chat", response_model=RetrievalChatResponse)
+async def chat_with_retrieval(request: RetrievalChatRequest):
+    """
+    Chat completion grounded in the local index.
+
+    The latest user message is searched in the index and the best chunks are
+    added to the system prompt as numbered sources, so the answer comes from
+    indexed content without a live search or crawl.
+
+    Args:
+        request: RetrievalChatRequest with message history and optional parameters
+
+    Returns:
+        RetrievalChatResponse with the answer and the sources it was given
+
+    Raises:
+        HTTPException: If retrieval or chat completion fails
+    """
+    try:
+        # Convert Pydantic models to dicts
+        messages = [msg.model_dump() for msg in request.messages]
+        question = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+
+        hits = fit_context(await retrieval_index.search(question, request.k)) if question else []
+
+        result = await llm_gateway.complete(
+            messages=messages,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            system_prompt=with_context(request.system_prompt, hits),
+            cache=request.cache,
+        )
+
+        if not result["success"]:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Chat completion failed: {result.get('error', 'Unknown error')}",
+            )
+
+        return RetrievalChatResponse(**result, sources=hits)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {str(e)}",
+        )
+
+
+@router.get("/stats")
+async def index_stats():
+    """Size of the retrieval index and search counters."""
+    return retrieval_index.stats()
@@ -1,7 +1,10 @@
+import json
 from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel, HttpUrl
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl
 from typing import Optional, List
 from app.services.firecrawl_service import firecrawl_service
+from app.services.search_cache import search_cache
 
 router = APIRouter(prefix="/api/v1/search", tags=["search"])
 
@@ -17,6 +20,11 @@ class ScrapeRequest(BaseModel):
     formats: Optional[List[str]] = ["markdown"]
 
 
+class BulkScrapeRequest(BaseModel):
+    urls: List[HttpUrl] = Field(..., min_length=1, max_length=100)
+    formats: Optional[List[str]] = ["markdown"]
+
+
 class CrawlRequest(BaseModel):
     url: HttpUrl
     max_depth: Optional[int] = 2
@@ -98,6 +106,37 @@ async def scrape_url(request: ScrapeRequest):
         )
 
 
+@router.post("/scrape/bulk")
+async def scrape_urls(request: BulkScrapeRequest):
+    """
+    Scrape several URLs concurrently using Firecrawl.
+
+    Duplicate URLs (after normalization) are scraped once. Each result is
+    streamed back as an NDJSON line as soon as it finishes:
+    {"url": normalized_url, "requested": [urls], "success": true, "data": {...}}
+    or, for a URL that failed, "success": false and an "error". A failed
+    URL does not stop the others.
+
+    Args:
+        request: BulkScrapeRequest with URLs and format options
+
+    Returns:
+        StreamingResponse of application/x-ndjson lines
+    """
+    async def lines():
+        results = firecrawl_service.scrape_many(
+            urls=[str(url) for url in request.urls],
+            formats=request.formats,
+        )
+        try:
+            async for url, requested, result in results:
+                yield json.dumps({"url": url, "requested": requested, **result}) + "\n"
+        finally:
+            await results.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/crawl")
 async def crawl_website(request: CrawlRequest):
     """
@@ -134,3 +173,9 @@ async def crawl_website(request: CrawlRequest):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Website crawling failed: {str(e)}",
         )
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Search result cache hit/miss counters and memory use."""
+    return search_cache.stats()
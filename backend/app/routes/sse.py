@@ -0,0 +1,138 @@
+import asyncio
+import json
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Any, AsyncIterator, Dict, Optional
+from app.config import settings
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Keep proxies from buffering or caching the stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+_END = object()
+
+
+def wants_sse(request: Request, format: Optional[str] = None) -> bool:
+    """Whether the client asked for Server-Sent Events (``?format=sse`` or Accept)."""
+    if format is not None:
+        return format == "sse"
+    return SSE_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Encode one SSE event with a JSON payload."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(
+    events: AsyncIterator[Dict[str, Any]],
+    first: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """
+    Encode LLM stream events as SSE, with heartbeats and prompt cancellation.
+
+    Each event dict's "type" becomes the SSE event name and the remaining
+    keys its JSON data. Events carry increasing ids so clients can tell how
+    far they got. A ``: ping`` comment is sent whenever the upstream is idle
+    for ``sse_heartbeat_seconds``. An upstream failure becomes an "error"
+    event. If the client disconnects, the server cancels this generator and
+    the upstream stream is closed right away.
+
+    Args:
+        events: Typed events from ``LLMGateway.stream_events``
+        first: An event already read from ``events``, sent first
+
+    Yields:
+        SSE-encoded text
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+
+    async def pump() -> None:
+        try:
+            async for event in events:
+                await queue.put(event)
+            await queue.put(_END)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            await events.aclose()
+
+    # Read the upstream in its own task so heartbeats go out while it is idle
+    reader = asyncio.create_task(pump())
+    event_id = 0
+    try:
+        if first is not None:
+            yield format_event(first["type"], _payload(first), event_id)
+            event_id += 1
+
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), settings.sse_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                yield format_event("error", {"message": str(item)}, event_id)
+                break
+            yield format_event(item["type"], _payload(item), event_id)
+            event_id += 1
+    finally:
+        # Runs on normal completion and when a client disconnect cancels us
+        reader.cancel()
+        try:
+            await reader
+        except (asyncio.CancelledError, Exception):
+            pass
+
+
+async def sse_response(events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """
+    Wrap LLM stream events in an SSE response.
+
+    The first event is awaited before the response starts, so a request
+    that fails on every provider surfaces as an exception (and a 500)
+    rather than as an error event in a 200 response. If the client goes
+    away before the body starts, the encoder never runs; a background task
+    then closes the stream so its provider slot is released right away.
+
+    Raises:
+        Exception: If the stream fails before its first event
+    """
+    try:
+        first = await events.__anext__()
+    except StopAsyncIteration:
+        first = None
+
+    return StreamingResponse(
+        event_stream(events, first),
+        media_type=SSE_MEDIA_TYPE,
+        headers=SSE_HEADERS,
+        background=BackgroundTask(_close, events),
+    )
+
+
+async def _close(events: AsyncIterator[Dict[str, Any]]) -> None:
+    """Close the upstream stream; a no-op if ``event_stream`` already did."""
+    try:
+        await events.aclose()
+    except Exception as e:
+        print(f"Error closing LLM stream: {str(e)}")
+
+
+def _payload(event: Dict[str, Any]) -> Dict[str, Any]:
+    if event["type"] == "usage":
+        return event["usage"]
+    return {key: value for key, value in event.items() if key != "type"}
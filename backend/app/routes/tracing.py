@@ -0,0 +1,43 @@
+from app.services.tracing import parse_traceparent, tracer
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the root span of every HTTP request.
+
+    Continues the trace of an incoming W3C ``traceparent`` header and, for
+    sampled requests, returns the request's own ``traceparent`` so clients
+    can find it in the exported traces. Spans opened by route handlers and
+    the services they call become its children. The span is named after
+    the route's path template once routing has happened.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = next((value for name, value in scope["headers"] if name == b"traceparent"), None)
+        parent = parse_traceparent(header.decode("latin-1")) if header else None
+        method = scope["method"]
+
+        with tracer.span(f"{method} {scope['path']}", parent=parent, **{"http.method": method}) as span:
+
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if span.recording:
+                        traceparent = f"00-{span.trace.trace_id}-{span.span_id}-01"
+                        message["headers"] = [*message.get("headers", []), (b"traceparent", traceparent.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None:
+                    span.set_name(f"{method} {route}")
+                    span.set_attribute("http.route", route)
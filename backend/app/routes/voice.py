@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
+from app.config import settings
 from app.services.elevenlabs_service import elevenlabs_service
-from typing import Optional
+from app.services.tts_cache import tts_cache
+from typing import Optional, Tuple
+import re
 
 router = APIRouter(prefix="/api/v1/voice", tags=["voice"])
 
@@ -13,11 +16,41 @@ class TextToSpeechRequest(BaseModel):
     model_id: Optional[str] = None
 
 
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range ``Range`` header into inclusive byte offsets.
+
+    Returns:
+        (start, end) tuple, or None if the range cannot be satisfied
+    """
+    match = RANGE_HEADER.match(range_header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
 @router.post("/text-to-speech")
-async def text_to_speech(request: TextToSpeechRequest):
+async def text_to_speech(request: TextToSpeechRequest, http_request: Request):
     """
     Convert text to speech using ElevenLabs.
 
+    Audio is content-addressed on (text, voice, model), so the response
+    carries a stable ETag, honours If-None-Match, and supports single byte
+    ranges; repeated phrases are served from the TTS cache.
+
     Args:
         request: TextToSpeechRequest with text and optional voice/model settings
 
@@ -27,19 +60,23 @@ async def text_to_speech(request: TextToSpeechRequest):
     Raises:
         HTTPException: If text-to-speech conversion fails
     """
+    voice_id = request.voice_id or settings.elevenlabs_voice_id
+    model_id = request.model_id or settings.elevenlabs_model_id
+    etag = f'"{tts_cache.make_key(request.text, voice_id, model_id)}"'
+    headers = {
+        "Content-Disposition": "inline; filename=speech.mp3",
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+    }
+
+    if http_request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
     try:
         audio_bytes = await elevenlabs_service.text_to_speech(
             text=request.text,
-            voice_id=request.voice_id,
-            model_id=request.model_id,
-        )
-
-        return Response(
-            content=audio_bytes,
-            media_type="audio/mpeg",
-            headers={
-                "Content-Disposition": "inline; filename=speech.mp3"
-            }
+            voice_id=voice_id,
+            model_id=model_id,
         )
 
     except Exception as e:
@@ -50,6 +87,28 @@ async def text_to_speech(request: TextToSpeechRequest):
             detail=f"Text-to-speech conversion failed: {str(e)}",
         )
 
+    range_header = http_request.headers.get("range")
+    if range_header:
+        byte_range = parse_range(range_header, len(audio_bytes))
+        if byte_range is None:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{len(audio_bytes)}"},
+            )
+        start, end = byte_range
+        return Response(
+            content=audio_bytes[start:end + 1],
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type="audio/mpeg",
+            headers={**headers, "Content-Range": f"bytes {start}-{end}/{len(audio_bytes)}"},
+        )
+
+    return Response(
+        content=audio_bytes,
+        media_type="audio/mpeg",
+        headers=headers,
+    )
+
 
 @router.post("/text-to-speech/stream")
 async def text_to_speech_stream(request: TextToSpeechRequest):
@@ -66,13 +125,28 @@ async def text_to_speech_stream(request: TextToSpeechRequest):
         HTTPException: If text-to-speech conversion fails
     """
     try:
+        audio_stream = elevenlabs_service.text_to_speech_stream(
+            text=request.text,
+            voice_id=request.voice_id,
+            model_id=request.model_id,
+        )
+
+        # Wait for the first chunk so upstream failures still surface as a 500
+        # and the response starts as soon as ElevenLabs produces audio.
+        try:
+            first_chunk = await audio_stream.__anext__()
+        except StopAsyncIteration:
+            first_chunk = b""
+
         async def generate():
-            async for chunk in elevenlabs_service.text_to_speech_stream(
-                text=request.text,
-                voice_id=request.voice_id,
-                model_id=request.model_id,
-            ):
-                yield chunk
+            # Chunks are pulled only as fast as the client reads them; a
+            # shared upstream waits for its slowest reader
+            try:
+                yield first_chunk
+                async for chunk in audio_stream:
+                    yield chunk
+            finally:
+                await audio_stream.aclose()
 
         return StreamingResponse(
             generate(),
@@ -86,6 +160,18 @@ async def text_to_speech_stream(request: TextToSpeechRequest):
         )
 
 
+@router.get("/cache/stats")
+async def tts_cache_stats():
+    """TTS cache hit/miss counters and tier sizes."""
+    return tts_cache.stats()
+
+
+@router.get("/coalescing/stats")
+async def coalescing_stats():
+    """Counters for identical in-flight requests joined into one upstream call."""
+    return elevenlabs_service.flights.stats()
+
+
 @router.get("/voices")
 async def get_voices():
     """
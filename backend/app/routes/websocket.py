@@ -1,146 +1,517 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.config import settings
 from app.services.openai_service import openai_service
 from app.services.elevenlabs_service import elevenlabs_service
+from app.services.streaming_transcription import StreamingTranscriber, create_transcriber
+from app.services.session_store import session_store, with_summary
+from app.services.metrics import VOICE_TURNS, WEBSOCKETS_ACTIVE, record_voice_stage
+from app.services.tracing import tracer
+from app.services.admission import Overloaded, admission
+from typing import Dict, List, Optional, Tuple
 import json
 import base64
 import asyncio
+import re
+import struct
+import time
+import uuid
 
 router = APIRouter(tags=["websocket"])
 
+SYSTEM_PROMPT = "You are AIRA (AI Responsive & Intelligent Assistant), a comprehensive medical AI assistant. You can help with symptom analysis, appointments, medications, health coaching, emergencies, and all healthcare needs. Provide supportive and informative responses. Always recommend consulting with healthcare professionals for serious symptoms. Keep responses concise and clear for voice interaction."
+
+GOODBYE_PHRASES = ['goodbye', 'bye', 'end call', 'hang up', 'stop', 'quit', 'exit']
+GOODBYE_MESSAGE = "Thank you for using AIRA. Take care of your health. Goodbye!"
+
+# Binary sub-protocol: offered by the client in Sec-WebSocket-Protocol. Audio
+# travels as binary frames of a 5-byte header (frame kind, big-endian seq)
+# followed by raw audio bytes; control messages stay JSON text frames.
+BINARY_SUBPROTOCOL = "aira.binary.v1"
+FRAME_HEADER = struct.Struct(">BI")
+FRAME_AUDIO = 0x01        # Client -> Server: one complete utterance
+FRAME_AUDIO_REPLY = 0x02  # Server -> Client: one complete answer clip
+FRAME_AUDIO_CHUNK = 0x03  # Server -> Client: one sentence of a pipelined answer
+FRAME_UTTERANCE_CHUNK = 0x04  # Client -> Server: part of a streamed utterance
+
+# End of a sentence: terminal punctuation (plus closing quotes/brackets) and
+# whitespace, or a line break.
+SENTENCE_BOUNDARY = re.compile(r"""[.!?]+["')\]]*\s+|\n+""")
+
+
+def split_sentences(buffer: str, min_chars: int) -> Tuple[List[str], str]:
+    """
+    Cut complete sentences off the front of a streamed text buffer.
+
+    Fragments shorter than ``min_chars`` are merged with the following
+    sentence so TTS is not started for things like "Dr." or "Okay.".
+
+    Args:
+        buffer: Text received so far that has not been emitted yet
+        min_chars: Minimum length of an emitted sentence
+
+    Returns:
+        Tuple of (complete sentences, remaining buffer)
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_BOUNDARY.finditer(buffer):
+        candidate = buffer[start:match.end()].strip()
+        if len(candidate) >= min_chars:
+            sentences.append(candidate)
+            start = match.end()
+    return sentences, buffer[start:]
+
+
+def encode_audio_frame(kind: int, seq: int, audio: bytes) -> bytes:
+    """Prefix raw audio with the binary frame header."""
+    return b"".join((FRAME_HEADER.pack(kind, seq), audio))
+
+
+def decode_audio_frame(frame: bytes) -> Tuple[int, int, memoryview]:
+    """
+    Split a binary frame into its header fields and audio payload.
+
+    Returns:
+        Tuple of (frame kind, seq, audio payload view)
+
+    Raises:
+        ValueError: If the frame is shorter than the header
+    """
+    if len(frame) < FRAME_HEADER.size:
+        raise ValueError("Binary frame is shorter than its header")
+    kind, seq = FRAME_HEADER.unpack_from(frame)
+    return kind, seq, memoryview(frame)[FRAME_HEADER.size:]
+
+
+async def send_audio(websocket: WebSocket, audio: bytes, binary: bool = False):
+    """Send a complete audio clip as a single frame."""
+    if binary:
+        await websocket.send_bytes(encode_audio_frame(FRAME_AUDIO_REPLY, 0, audio))
+        return
+    await websocket.send_json({
+        "type": "audio",
+        "data": base64.b64encode(audio).decode('utf-8')
+    })
+
+
+async def send_audio_chunk(websocket: WebSocket, seq: int, sentence: str, audio: bytes, binary: bool = False):
+    """Send the audio for one sentence of a pipelined answer."""
+    if binary:
+        await websocket.send_bytes(encode_audio_frame(FRAME_AUDIO_CHUNK, seq, audio))
+        return
+    await websocket.send_json({
+        "type": "audio_chunk",
+        "seq": seq,
+        "text": sentence,
+        "data": base64.b64encode(audio).decode('utf-8')
+    })
+
+
+async def run_legacy_turn(websocket: WebSocket, messages: List[Dict[str, str]], binary: bool = False) -> str:
+    """
+    Answer a turn in series: full completion, full TTS, one audio frame.
+
+    Returns:
+        The assistant response text, or an empty string on failure
+    """
+    llm_started = time.perf_counter()
+    async with admission.slot("llm", "voice"):
+        response = await openai_service.chat_completion(
+            messages=messages,
+            temperature=0.7
+        )
+    llm_seconds = time.perf_counter() - llm_started
+    # Not streamed: the first token arrives with the whole answer
+    record_voice_stage("llm_ttft", "legacy", llm_seconds)
+    record_voice_stage("llm_total", "legacy", llm_seconds)
+
+    if not response["success"]:
+        await websocket.send_json({
+            "type": "error",
+            "message": "Failed to generate response"
+        })
+        return ""
+
+    response_text = response["content"]
+
+    # Send text response
+    await websocket.send_json({
+        "type": "response",
+        "text": response_text
+    })
+
+    # Generate audio with ElevenLabs and send it back in one frame
+    tts_started = time.perf_counter()
+    async with admission.slot("tts", "voice"):
+        audio_bytes = await elevenlabs_service.text_to_speech(response_text)
+    tts_seconds = time.perf_counter() - tts_started
+    record_voice_stage("tts_ttfb", "legacy", tts_seconds)
+    record_voice_stage("tts_total", "legacy", tts_seconds)
+
+    send_started = time.perf_counter()
+    await send_audio(websocket, audio_bytes, binary)
+    record_voice_stage("send", "legacy", time.perf_counter() - send_started)
+
+    return response_text
+
+
+async def run_pipelined_turn(websocket: WebSocket, messages: List[Dict[str, str]], binary: bool = False) -> str:
+    """
+    Answer a turn with LLM streaming, per-sentence TTS and ordered audio frames.
+
+    GPT tokens are cut at sentence boundaries and TTS starts for each sentence
+    as soon as it is complete, with at most ``voice_pipeline_max_tts_in_flight``
+    syntheses running at once. Audio is sent as ``audio_chunk`` frames in
+    sentence order, so playback can begin after the first sentence. Each
+    sentence's text goes out as a ``response_delta`` frame when it is cut and
+    the full ``response`` as soon as the LLM finishes, without waiting on TTS.
+    A failed synthesis stops the LLM stream at the next token.
+
+    Returns:
+        The assistant response text
+    """
+    tts_slots = asyncio.Semaphore(settings.voice_pipeline_max_tts_in_flight)
+    # The sender task and the LLM loop share the socket
+    send_lock = asyncio.Lock()
+    pending: asyncio.Queue = asyncio.Queue()
+    # TTS stages run from the first sentence being ready to synthesize
+    tts_started: Optional[float] = None
+
+    async def synthesize(sentence: str) -> bytes:
+        async with tts_slots, admission.slot("tts", "voice"):
+            return await elevenlabs_service.text_to_speech(sentence)
+
+    async def schedule(sentence: str):
+        nonlocal tts_started
+        if tts_started is None:
+            tts_started = time.perf_counter()
+        pending.put_nowait((sentence, asyncio.create_task(synthesize(sentence))))
+        async with send_lock:
+            await websocket.send_json({
+                "type": "response_delta",
+                "text": sentence
+            })
+
+    async def send_in_order() -> int:
+        seq = 0
+        send_seconds = 0.0
+        while True:
+            item = await pending.get()
+            if item is None:
+                if seq:
+                    record_voice_stage("tts_total", "pipelined", time.perf_counter() - tts_started)
+                    record_voice_stage("send", "pipelined", send_seconds)
+                return seq
+            sentence, task = item
+            audio_bytes = await task
+            if seq == 0:
+                record_voice_stage("tts_ttfb", "pipelined", time.perf_counter() - tts_started)
+            send_started = time.perf_counter()
+            async with send_lock:
+                await send_audio_chunk(websocket, seq, sentence, audio_bytes, binary)
+            send_seconds += time.perf_counter() - send_started
+            seq += 1
+
+    sender = asyncio.create_task(send_in_order())
+    parts = []
+    buffer = ""
+    llm_started = time.perf_counter()
+    stream = openai_service.stream_chat(messages=messages, temperature=0.7)
+    try:
+        # Held for the whole stream, which HTTP admission does not time, so it is not observed
+        async with admission.slot("llm", "voice", observe=False):
+            try:
+                async for delta in stream:
+                    if sender.done():
+                        # The sender only stops early on a failed synthesis
+                        break
+                    if not parts:
+                        record_voice_stage("llm_ttft", "pipelined", time.perf_counter() - llm_started)
+                    parts.append(delta)
+                    buffer += delta
+                    sentences, buffer = split_sentences(buffer, settings.voice_pipeline_min_sentence_chars)
+                    for sentence in sentences:
+                        await schedule(sentence)
+            finally:
+                # Stop paying for tokens as soon as the turn is given up
+                await stream.aclose()
+
+        if sender.done():
+            # Raises the synthesis error
+            await sender
+        record_voice_stage("llm_total", "pipelined", time.perf_counter() - llm_started)
+        if buffer.strip():
+            await schedule(buffer.strip())
+        pending.put_nowait(None)
+
+        response_text = "".join(parts).strip()
+        async with send_lock:
+            await websocket.send_json({
+                "type": "response",
+                "text": response_text
+            })
+        count = await sender
+    except BaseException:
+        sender.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None:
+                item[1].cancel()
+        raise
+
+    await websocket.send_json({
+        "type": "audio_end",
+        "count": count
+    })
+    return response_text
+
+
+async def respond_to_transcript(
+    websocket: WebSocket,
+    transcript: str,
+    conversation_id: str,
+    pipelined: bool = False,
+    binary: bool = False,
+) -> bool:
+    """
+    Send the transcript back and answer it, appending the turn to the session.
+
+    Returns:
+        True if the user ended the call
+    """
+    # Send transcript back to client
+    await websocket.send_json({
+        "type": "transcript",
+        "text": transcript
+    })
+
+    # Check for goodbye
+    if any(phrase in transcript.lower() for phrase in GOODBYE_PHRASES):
+        # Send goodbye response
+        await websocket.send_json({
+            "type": "response",
+            "text": GOODBYE_MESSAGE
+        })
+
+        # Generate goodbye audio
+        async with admission.slot("tts", "voice"):
+            goodbye_audio = await elevenlabs_service.text_to_speech(GOODBYE_MESSAGE)
+        await send_audio(websocket, goodbye_audio, binary)
+
+        # Send end signal
+        await websocket.send_json({
+            "type": "end"
+        })
+        return True
+
+    # Build conversation context: summary of older turns plus recent messages
+    summary, recent = await session_store.context(
+        conversation_id, [{"role": "user", "content": transcript}]
+    )
+    messages = [
+        {
+            "role": "system",
+            "content": with_summary(SYSTEM_PROMPT, summary)
+        },
+        *recent,
+    ]
+
+    if pipelined:
+        response_text = await run_pipelined_turn(websocket, messages, binary)
+    else:
+        response_text = await run_legacy_turn(websocket, messages, binary)
+
+    if response_text:
+        # Update conversation history; older turns get folded into the summary
+        await session_store.append(conversation_id, [
+            {"role": "user", "content": transcript},
+            {"role": "assistant", "content": response_text},
+        ])
+
+    return False
+
 
 @router.websocket("/ws/voice")
 async def voice_websocket(websocket: WebSocket):
     """
     WebSocket endpoint for real-time voice conversation.
-    
+
     Flow:
     1. Client sends audio chunks (base64 encoded)
     2. Server transcribes with Whisper
     3. Server gets GPT response
     4. Server generates voice with ElevenLabs
     5. Server streams audio back to client
-    
+
+    Connect with ``?mode=pipelined`` to stream the answer sentence by sentence;
+    the default mode sends the whole answer as one audio frame. The history
+    is kept in the session store: reconnect with ``?conversation_id=...``
+    (announced in the first "session" message) to resume a conversation.
+
     Message format:
+    Server -> Client: {"type": "session", "conversation_id": "id"}
     Client -> Server: {"type": "audio", "data": "base64_audio_data"}
     Server -> Client: {"type": "transcript", "text": "transcribed_text"}
     Server -> Client: {"type": "response", "text": "gpt_response"}
     Server -> Client: {"type": "audio", "data": "base64_audio_data"}
+
+    When the upstreams are saturated even for voice turns, the turn is
+    answered with {"type": "error", "message": "...", "retry_after": seconds}.
+
+    Instead of one "audio" message, an utterance can be streamed while the
+    user is talking; the configured transcriber may then report partials:
+    Client -> Server: {"type": "utterance_start", "mime_type": "audio/webm", "size_hint": 0}
+    Client -> Server: {"type": "utterance_chunk", "data": "base64_audio_data"}
+    Server -> Client: {"type": "transcript_partial", "text": "partial_text"}
+    Client -> Server: {"type": "utterance_end"}
+
+    Pipelined mode replaces the single audio frame with:
+    Server -> Client: {"type": "audio_chunk", "seq": 0, "text": "sentence", "data": "base64_audio_data"}
+    Server -> Client: {"type": "response", "text": "gpt_response"}
+    Server -> Client: {"type": "audio_end", "count": number_of_chunks}
+
+    Clients offering the ``aira.binary.v1`` sub-protocol send and receive
+    audio as binary frames (see ``FRAME_HEADER``) instead of base64 JSON;
+    pipelined chunks then carry only their seq, and all other messages are
+    unchanged.
     """
-    await websocket.accept()
-    
-    conversation_history = []
-    
+    binary = BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary else None)
+    WEBSOCKETS_ACTIVE.labels("/ws/voice").inc()
+
+    pipelined = websocket.query_params.get("mode") == "pipelined"
+    mode = "pipelined" if pipelined else "legacy"
+    conversation_id = websocket.query_params.get("conversation_id") or uuid.uuid4().hex
+    transcriber: Optional[StreamingTranscriber] = None
+
     try:
+        await websocket.send_json({
+            "type": "session",
+            "conversation_id": conversation_id
+        })
+
         while True:
             # Receive message from client
-            message = await websocket.receive_text()
-            data = json.loads(message)
-            
-            if data["type"] == "audio":
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("bytes") is not None:
                 try:
-                    # Decode audio data
-                    audio_data = base64.b64decode(data["data"])
-                    
-                    # Transcribe with Whisper
-                    audio_file = ("audio.webm", audio_data, "audio/webm")
-                    transcript = await openai_service.transcribe_audio(audio_file)
-                    
-                    # Send transcript back to client
+                    kind, _, payload = decode_audio_frame(message["bytes"])
+                except ValueError:
+                    kind = None
+                if kind == FRAME_AUDIO:
+                    data = {"type": "audio"}
+                elif kind == FRAME_UTTERANCE_CHUNK:
+                    data = {"type": "utterance_chunk"}
+                else:
                     await websocket.send_json({
-                        "type": "transcript",
-                        "text": transcript
+                        "type": "error",
+                        "message": "Unsupported binary frame"
+                    })
+                    continue
+            else:
+                data = json.loads(message["text"])
+                payload = None
+
+            if data["type"] in ("audio", "utterance_end"):
+                try:
+                    with tracer.span("voice.turn", **{"voice.mode": mode, "conversation.id": conversation_id}) as span:
+                        turn_started = time.perf_counter()
+                        if data["type"] == "audio":
+                            # Decode audio data
+                            if payload is None:
+                                audio_data = base64.b64decode(data["data"])
+                            else:
+                                audio_data = payload.tobytes()
+                            record_voice_stage("decode", mode, time.perf_counter() - turn_started)
+                            span.set_attribute("audio.bytes", len(audio_data))
+
+                            # Transcribe with Whisper
+                            transcribe_started = time.perf_counter()
+                            audio_file = ("audio.webm", audio_data, "audio/webm")
+                            async with admission.slot("stt", "voice"):
+                                transcript = await openai_service.transcribe_audio(audio_file)
+                        else:
+                            if transcriber is None:
+                                raise ValueError("utterance_end received without utterance_start")
+                            current, transcriber = transcriber, None
+                            transcribe_started = time.perf_counter()
+                            async with admission.slot("stt", "voice"):
+                                transcript = await current.finish()
+                        record_voice_stage("transcribe", mode, time.perf_counter() - transcribe_started)
+                        span.set_attribute("transcript.chars", len(transcript))
+
+                        ended = await respond_to_transcript(
+                            websocket, transcript, conversation_id, pipelined, binary
+                        )
+                        record_voice_stage("turn", mode, time.perf_counter() - turn_started)
+                        VOICE_TURNS.labels(mode).inc()
+                        if ended:
+                            break
+
+                except WebSocketDisconnect:
+                    raise
+                except Overloaded as e:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": str(e),
+                        "retry_after": e.retry_after
                     })
-                    
-                    # Check for goodbye
-                    goodbye_phrases = ['goodbye', 'bye', 'end call', 'hang up', 'stop', 'quit', 'exit']
-                    if any(phrase in transcript.lower() for phrase in goodbye_phrases):
-                        goodbye_msg = "Thank you for using AIRA. Take care of your health. Goodbye!"
-                        
-                        # Send goodbye response
-                        await websocket.send_json({
-                            "type": "response",
-                            "text": goodbye_msg
-                        })
-                        
-                        # Generate goodbye audio
-                        goodbye_audio = await elevenlabs_service.text_to_speech(goodbye_msg)
-                        goodbye_audio_b64 = base64.b64encode(goodbye_audio).decode('utf-8')
-                        
-                        await websocket.send_json({
-                            "type": "audio",
-                            "data": goodbye_audio_b64
-                        })
-                        
-                        # Send end signal
-                        await websocket.send_json({
-                            "type": "end"
-                        })
-                        break
-                    
-                    # Build conversation context
-                    messages = [
-                        {
-                            "role": "system",
-                            "content": "You are AIRA (AI Responsive & Intelligent Assistant), a comprehensive medical AI assistant. You can help with symptom analysis, appointments, medications, health coaching, emergencies, and all healthcare needs. Provide supportive and informative responses. Always recommend consulting with healthcare professionals for serious symptoms. Keep responses concise and clear for voice interaction."
-                        },
-                        *conversation_history,
-                        {
-                            "role": "user",
-                            "content": transcript
-                        }
-                    ]
-                    
-                    # Get GPT response
-                    response = await openai_service.chat_completion(
-                        messages=messages,
-                        temperature=0.7
-                    )
-                    
-                    if response["success"]:
-                        response_text = response["content"]
-                        
-                        # Update conversation history
-                        conversation_history.append({"role": "user", "content": transcript})
-                        conversation_history.append({"role": "assistant", "content": response_text})
-                        
-                        # Keep only last 10 messages for context
-                        if len(conversation_history) > 10:
-                            conversation_history = conversation_history[-10:]
-                        
-                        # Send text response
-                        await websocket.send_json({
-                            "type": "response",
-                            "text": response_text
-                        })
-                        
-                        # Generate audio with ElevenLabs
-                        audio_bytes = await elevenlabs_service.text_to_speech(response_text)
-                        
-                        # Encode audio to base64
-                        audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-                        
-                        # Send audio back to client
-                        await websocket.send_json({
-                            "type": "audio",
-                            "data": audio_b64
-                        })
-                    else:
-                        # Send error response
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": "Failed to generate response"
-                        })
-                        
                 except Exception as e:
                     await websocket.send_json({
                         "type": "error",
                         "message": f"Error processing audio: {str(e)}"
                     })
-            
+
+            elif data["type"] == "utterance_start":
+                if transcriber is not None:
+                    transcriber.cancel()
+                try:
+                    transcriber = create_transcriber(
+                        content_type=data.get("mime_type", "audio/webm"),
+                        size_hint=int(data.get("size_hint", 0)),
+                    )
+                except (TypeError, ValueError) as e:
+                    # e.g. a null or non-numeric size_hint
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": str(e)
+                    })
+
+            elif data["type"] == "utterance_chunk":
+                if transcriber is None:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": "utterance_chunk received without utterance_start"
+                    })
+                    continue
+                try:
+                    if payload is None:
+                        transcriber.feed(base64.b64decode(data.get("data", "")))
+                    else:
+                        transcriber.feed(payload)
+                except ValueError as e:
+                    transcriber.cancel()
+                    transcriber = None
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": str(e)
+                    })
+                    continue
+
+                partial = transcriber.poll_partial()
+                if partial:
+                    await websocket.send_json({
+                        "type": "transcript_partial",
+                        "text": partial
+                    })
+
             elif data["type"] == "ping":
                 # Respond to ping to keep connection alive
                 await websocket.send_json({"type": "pong"})
-                
+
     except WebSocketDisconnect:
         print("WebSocket disconnected")
     except Exception as e:
@@ -153,6 +524,9 @@ async def voice_websocket(websocket: WebSocket):
         except:
             pass
     finally:
+        WEBSOCKETS_ACTIVE.labels("/ws/voice").dec()
+        if transcriber is not None:
+            transcriber.cancel()
         try:
             await websocket.close()
         except:
@@ -0,0 +1,244 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.metrics import ADMISSION_IN_FLIGHT, ADMISSION_LIMIT, ADMISSION_REJECTED
+
+# Lower number wins; live voice turns go first, batch and dashboard traffic last
+PRIORITIES = {"voice": 0, "interactive": 1, "batch": 2}
+
+
+class Overloaded(Exception):
+    """Raised when an upstream has no capacity left for a request."""
+
+    def __init__(self, upstream: str, reason: str, retry_after: int):
+        super().__init__(f"Server busy: {upstream} capacity exhausted ({reason}), retry in {retry_after}s")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one upstream that adapts to its latency.
+
+    Each finished request feeds its latency into a short-term and a
+    long-term EWMA. While the short-term latency stays within
+    ``admission_latency_tolerance`` times the long-term one, the limit grows
+    by about the square root of itself. When the upstream slows down under
+    load, the ratio of the two scales the limit down. Comparing averages
+    rather than a minimum keeps a steady mix of cache hits and upstream calls
+    from looking like congestion. Failures (5xx, 429) cut the limit by
+    ``admission_backoff``, at most once per typical request duration.
+
+    Requests over the limit wait in a priority queue, up to
+    ``admission_queue_size`` of them, for at most
+    ``admission_queue_timeout_seconds``. Each priority class may only use its
+    ``admission_priority_shares`` fraction of the limit, which keeps headroom
+    for voice turns when batch traffic piles up.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.limit = float(settings.admission_initial_limit)
+        self.in_flight = 0
+        self.short_latency: Optional[float] = None
+        self.long_latency: Optional[float] = None
+        self._last_backoff = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self.admitted = 0
+        self.rejected = 0
+        self.failures = 0
+        self._publish()
+
+    def _capacity(self, priority: int) -> float:
+        share = settings.admission_priority_shares.get(_priority_name(priority), 1.0)
+        return max(1.0, self.limit * share)
+
+    @property
+    def retry_after(self) -> int:
+        """Whole seconds until a slot is likely to free up."""
+        return max(1, math.ceil(self.short_latency or 1.0))
+
+    async def acquire(self, priority: int) -> None:
+        """
+        Take a slot, waiting in the queue if the limit is reached.
+
+        Raises:
+            Overloaded: If the queue is full or the wait exceeds the deadline
+        """
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        blocked = self._waiters and self._waiters[0][0] <= priority
+        if not blocked and self.in_flight < self._capacity(priority):
+            self._admit()
+            return
+
+        if len(self._waiters) >= settings.admission_queue_size:
+            self._reject(priority, "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await asyncio.wait({future}, timeout=settings.admission_queue_timeout_seconds)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller went away; hand the slot back
+                self.release(None, failed=False)
+            future.cancel()
+            raise
+
+        if not future.done():
+            future.cancel()
+            self._discard_cancelled()
+            self._reject(priority, "timeout")
+
+    def _admit(self) -> None:
+        self.in_flight += 1
+        self.admitted += 1
+        ADMISSION_IN_FLIGHT.labels(self.name).set(self.in_flight)
+
+    def _reject(self, priority: int, reason: str) -> None:
+        self.rejected += 1
+        ADMISSION_REJECTED.labels(self.name, _priority_name(priority), reason).inc()
+        raise Overloaded(self.name, reason, self.retry_after)
+
+    def _discard_cancelled(self) -> None:
+        self._waiters = [w for w in self._waiters if not w[2].done()]
+        heapq.heapify(self._waiters)
+
+    def _wake(self) -> None:
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight >= self._capacity(priority):
+                return
+            heapq.heappop(self._waiters)
+            self._admit()
+            future.set_result(None)
+
+    def release(self, latency: Optional[float], failed: bool) -> None:
+        """
+        Return a slot and adapt the limit.
+
+        Args:
+            latency: Seconds the request took, or None to skip adaptation
+            failed: Whether the upstream failed or pushed back
+        """
+        self.in_flight -= 1
+        if failed:
+            self.failures += 1
+            self._back_off()
+        elif latency is not None:
+            self._observe(latency)
+        ADMISSION_IN_FLIGHT.labels(self.name).set(self.in_flight)
+        self._publish()
+        self._wake()
+
+    def _back_off(self) -> None:
+        now = time.monotonic()
+        if now - self._last_backoff >= (self.short_latency or 1.0):
+            self._last_backoff = now
+            self.limit = max(settings.admission_min_limit, self.limit * settings.admission_backoff)
+
+    def _observe(self, latency: float) -> None:
+        if self.short_latency is None:
+            self.short_latency = self.long_latency = latency
+            return
+        self.short_latency = 0.2 * latency + 0.8 * self.short_latency
+        self.long_latency = 0.02 * latency + 0.98 * self.long_latency
+
+        gradient = max(0.5, min(1.0, settings.admission_latency_tolerance * self.long_latency / self.short_latency))
+        if gradient >= 1.0 and self.in_flight + 1 < self.limit / 2:
+            # Not using half the limit; growing it would prove nothing
+            return
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = 0.8 * self.limit + 0.2 * target
+        self.limit = max(settings.admission_min_limit, min(settings.admission_max_limit, limit))
+
+    def _publish(self) -> None:
+        ADMISSION_LIMIT.labels(self.name).set(round(self.limit, 2))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": sum(1 for w in self._waiters if not w[2].done()),
+            "short_latency": self.short_latency,
+            "long_latency": self.long_latency,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "failures": self.failures,
+        }
+
+
+def _priority_name(priority: int) -> str:
+    return next(name for name, value in PRIORITIES.items() if value == priority)
+
+
+class AdmissionController:
+    """Adaptive limiters per upstream, created on first use."""
+
+    def __init__(self):
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+
+    def limiter(self, upstream: str) -> AdaptiveLimiter:
+        if upstream not in self.limiters:
+            self.limiters[upstream] = AdaptiveLimiter(upstream)
+        return self.limiters[upstream]
+
+    def route(self, path: str) -> Optional[str]:
+        """Upstream a request path is admitted against, if any (longest prefix wins)."""
+        matches = [prefix for prefix in settings.admission_routes if path.startswith(prefix)]
+        return settings.admission_routes[max(matches, key=len)] if matches else None
+
+    @asynccontextmanager
+    async def slot(self, upstream: str, priority: str = "interactive", observe: bool = True) -> AsyncIterator[None]:
+        """
+        Hold a slot of an upstream for the duration of the block.
+
+        Exceptions raised in the block count as upstream failures, so the
+        block should only wrap the call to that upstream. Cancellation (e.g.
+        the client went away) releases the slot without counting as one.
+
+        Args:
+            upstream: Upstream name, e.g. "llm"
+            priority: One of ``PRIORITIES``
+            observe: Feed the block's duration into the limit; turn off for
+                blocks timed differently from HTTP requests (e.g. whole streams)
+
+        Raises:
+            Overloaded: If no slot frees up in time
+        """
+        if not settings.admission_enabled:
+            yield
+            return
+
+        limiter = self.limiter(upstream)
+        await limiter.acquire(PRIORITIES[priority])
+        started = time.monotonic()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            limiter.release(time.monotonic() - started if observe else None, failed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.admission_enabled,
+            "upstreams": {name: limiter.stats() for name, limiter in self.limiters.items()},
+        }
+
+
+# Singleton instance
+admission = AdmissionController()
@@ -1,7 +1,14 @@
+import asyncio
 import json
+import time
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 from app.config import settings
+from app.services.executor import iterate_in_executor
+from app.services.metrics import record_token_usage, record_upstream_error
+from app.services.tracing import tracer
 
 
 class BedrockService:
@@ -15,11 +22,92 @@ class BedrockService:
             session_kwargs["aws_access_key_id"] = settings.aws_access_key_id
             session_kwargs["aws_secret_access_key"] = settings.aws_secret_access_key
 
+        if settings.bedrock_endpoint_url:
+            session_kwargs["endpoint_url"] = settings.bedrock_endpoint_url
+
         self.bedrock_runtime = boto3.client(
             service_name="bedrock-runtime",
+            config=Config(
+                max_pool_connections=settings.bedrock_max_pool_connections,
+                connect_timeout=settings.bedrock_connect_timeout,
+                read_timeout=settings.bedrock_read_timeout,
+                retries={
+                    # Counts the first attempt too, unlike the legacy max_attempts key
+                    "total_max_attempts": settings.bedrock_max_retries + 1,
+                    "mode": settings.bedrock_retry_mode,
+                },
+            ),
             **session_kwargs
         )
 
+        # boto3 is blocking; every call runs on this bounded pool, sized to
+        # match the HTTP connection pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.bedrock_max_workers,
+            thread_name_prefix="bedrock",
+        )
+
+    def _invoke(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Call invoke_model and parse the response body (blocking)."""
+        response = self.bedrock_runtime.invoke_model(
+            modelId=settings.bedrock_model_id,
+            body=json.dumps(body)
+        )
+        return json.loads(response["body"].read())
+
+    def _invoke_stream(self, body: Dict[str, Any]):
+        """
+        Call invoke_model_with_response_stream and yield typed events (blocking).
+
+        Yields "delta" events for text, then "usage" and "done" events built
+        from the message_start and message_delta metadata.
+        """
+        response = self.bedrock_runtime.invoke_model_with_response_stream(
+            modelId=settings.bedrock_model_id,
+            body=json.dumps(body)
+        )
+
+        usage: Dict[str, int] = {}
+        stop_reason = None
+        stream = response.get("body")
+        if stream:
+            try:
+                for event in stream:
+                    chunk = event.get("chunk")
+                    if chunk:
+                        chunk_data = json.loads(chunk.get("bytes").decode())
+                        if chunk_data["type"] == "content_block_delta":
+                            if "delta" in chunk_data and "text" in chunk_data["delta"]:
+                                yield {"type": "delta", "content": chunk_data["delta"]["text"]}
+                        elif chunk_data["type"] == "message_start":
+                            usage.update(chunk_data.get("message", {}).get("usage", {}))
+                        elif chunk_data["type"] == "message_delta":
+                            usage.update(chunk_data.get("usage", {}))
+                            stop_reason = chunk_data.get("delta", {}).get("stop_reason", stop_reason)
+            finally:
+                # Release the HTTP connection even when the reader stopped early
+                stream.close()
+
+        if usage:
+            yield {"type": "usage", "usage": usage}
+        yield {"type": "done", "finish_reason": stop_reason, "model": settings.bedrock_model_id}
+
+    async def _run(self, fn, *args):
+        """Run a blocking boto3 call on the Bedrock executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def _invoke_traced(self, operation: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Invoke the model on the executor inside a "bedrock.<operation>" span."""
+        with tracer.span(f"bedrock.{operation}", **{"llm.model": settings.bedrock_model_id}) as span:
+            response_body = await self._run(self._invoke, body)
+            usage = response_body.get("usage", {})
+            span.set_attributes(**{
+                "llm.prompt_tokens": usage.get("input_tokens"),
+                "llm.completion_tokens": usage.get("output_tokens"),
+            })
+            return response_body
+
     async def generate_text(
         self,
         prompt: str,
@@ -40,7 +128,7 @@ class BedrockService:
             Dict containing the response and metadata
         """
         max_tokens = max_tokens or settings.bedrock_max_tokens
-        temperature = temperature or settings.bedrock_temperature
+        temperature = temperature if temperature is not None else settings.bedrock_temperature
 
         # Prepare the request body for Claude 3.5 Sonnet
         body = {
@@ -59,22 +147,20 @@ class BedrockService:
             body["system"] = system_prompt
 
         try:
-            response = self.bedrock_runtime.invoke_model(
-                modelId=settings.bedrock_model_id,
-                body=json.dumps(body)
-            )
-
-            response_body = json.loads(response["body"].read())
+            response_body = await self._invoke_traced("generate_text", body)
+            usage = response_body.get("usage", {})
+            record_token_usage("bedrock", usage.get("input_tokens"), usage.get("output_tokens"))
 
             return {
                 "success": True,
                 "content": response_body["content"][0]["text"],
                 "model": settings.bedrock_model_id,
-                "usage": response_body.get("usage", {}),
+                "usage": usage,
                 "stop_reason": response_body.get("stop_reason"),
             }
 
         except Exception as e:
+            record_upstream_error("bedrock", "chat")
             return {
                 "success": False,
                 "error": str(e),
@@ -99,9 +185,12 @@ class BedrockService:
 
         Yields:
             Text chunks as they are generated
+
+        Raises:
+            Exception: If the generation fails
         """
         max_tokens = max_tokens or settings.bedrock_max_tokens
-        temperature = temperature or settings.bedrock_temperature
+        temperature = temperature if temperature is not None else settings.bedrock_temperature
 
         body = {
             "anthropic_version": "bedrock-2023-05-31",
@@ -119,23 +208,117 @@ class BedrockService:
             body["system"] = system_prompt
 
         try:
-            response = self.bedrock_runtime.invoke_model_with_response_stream(
-                modelId=settings.bedrock_model_id,
-                body=json.dumps(body)
-            )
+            async for event in self._stream_body(body):
+                if event["type"] == "delta":
+                    yield event["content"]
 
-            stream = response.get("body")
-            if stream:
-                for event in stream:
-                    chunk = event.get("chunk")
-                    if chunk:
-                        chunk_data = json.loads(chunk.get("bytes").decode())
-                        if chunk_data["type"] == "content_block_delta":
-                            if "delta" in chunk_data and "text" in chunk_data["delta"]:
-                                yield chunk_data["delta"]["text"]
+        except Exception as e:
+            raise Exception(f"Bedrock streaming error: {str(e)}")
+
+    async def _stream_body(self, body: Dict[str, Any]):
+        """Read the event stream on a worker thread through a bounded queue."""
+        # Not made current: a generator must not change its consumer's context
+        span = tracer.span("bedrock.stream", **{"llm.model": settings.bedrock_model_id})
+        started = time.perf_counter()
+        first = True
+        try:
+            async for event in iterate_in_executor(
+                self._executor,
+                lambda: self._invoke_stream(body),
+                settings.bedrock_stream_queue_size,
+            ):
+                if event["type"] == "delta" and first:
+                    first = False
+                    span.set_attribute("llm.ttft_ms", round((time.perf_counter() - started) * 1000, 1))
+                elif event["type"] == "usage":
+                    usage = event["usage"]
+                    record_token_usage("bedrock", usage.get("input_tokens"), usage.get("output_tokens"))
+                    span.set_attributes(**{
+                        "llm.prompt_tokens": usage.get("input_tokens"),
+                        "llm.completion_tokens": usage.get("output_tokens"),
+                    })
+                yield event
 
         except Exception as e:
-            yield f"Error: {str(e)}"
+            record_upstream_error("bedrock", "stream")
+            span.record_error(e)
+            raise
+        finally:
+            span.end()
+
+    async def stream_chat_events(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+    ):
+        """
+        Stream a multi-turn chat completion as typed events.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            system_prompt: Optional system prompt
+
+        Yields:
+            {"type": "delta", "content": text} for each text chunk, then
+            {"type": "usage", "usage": {...}} and
+            {"type": "done", "finish_reason": reason, "model": model}
+
+        Raises:
+            Exception: If the completion fails
+        """
+        max_tokens = max_tokens or settings.bedrock_max_tokens
+        temperature = temperature if temperature is not None else settings.bedrock_temperature
+
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": messages
+        }
+
+        if system_prompt:
+            body["system"] = system_prompt
+
+        try:
+            async for event in self._stream_body(body):
+                yield event
+
+        except Exception as e:
+            raise Exception(f"Bedrock streaming error: {str(e)}")
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+    ):
+        """
+        Stream a multi-turn chat completion using AWS Bedrock Claude model.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            system_prompt: Optional system prompt
+
+        Yields:
+            Text chunks as they are generated
+
+        Raises:
+            Exception: If the completion fails
+        """
+        events = self.stream_chat_events(messages, max_tokens, temperature, system_prompt)
+        try:
+            async for event in events:
+                if event["type"] == "delta":
+                    yield event["content"]
+        finally:
+            await events.aclose()
 
     async def chat_completion(
         self,
@@ -157,7 +340,7 @@ class BedrockService:
             Dict containing the response and metadata
         """
         max_tokens = max_tokens or settings.bedrock_max_tokens
-        temperature = temperature or settings.bedrock_temperature
+        temperature = temperature if temperature is not None else settings.bedrock_temperature
 
         body = {
             "anthropic_version": "bedrock-2023-05-31",
@@ -170,22 +353,20 @@ class BedrockService:
             body["system"] = system_prompt
 
         try:
-            response = self.bedrock_runtime.invoke_model(
-                modelId=settings.bedrock_model_id,
-                body=json.dumps(body)
-            )
-
-            response_body = json.loads(response["body"].read())
+            response_body = await self._invoke_traced("chat_completion", body)
+            usage = response_body.get("usage", {})
+            record_token_usage("bedrock", usage.get("input_tokens"), usage.get("output_tokens"))
 
             return {
                 "success": True,
                 "content": response_body["content"][0]["text"],
                 "model": settings.bedrock_model_id,
-                "usage": response_body.get("usage", {}),
+                "usage": usage,
                 "stop_reason": response_body.get("stop_reason"),
             }
 
         except Exception as e:
+            record_upstream_error("bedrock", "chat")
             return {
                 "success": False,
                 "error": str(e),
@@ -1,7 +1,13 @@
-from elevenlabs.client import ElevenLabs
-from typing import Optional
+import time
+from elevenlabs.client import ElevenLabs, AsyncElevenLabs
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
 from app.config import settings
-import io
+from app.services.executor import iterate_in_executor
+from app.services.metrics import record_upstream_error
+from app.services.singleflight import SingleFlight
+from app.services.tracing import tracer
+from app.services.tts_cache import tts_cache
 
 
 class ElevenLabsService:
@@ -12,6 +18,64 @@ class ElevenLabsService:
         if not settings.elevenlabs_api_key:
             raise ValueError("ELEVENLABS_API_KEY is not set in environment variables")
         self.client = ElevenLabs(api_key=settings.elevenlabs_api_key)
+        self.async_client = AsyncElevenLabs(api_key=settings.elevenlabs_api_key)
+
+        # Identical concurrent syntheses share one upstream request, read no
+        # further ahead of the slowest listener than a single stream would be
+        self.flights = SingleFlight(max_buffered=settings.elevenlabs_stream_queue_size)
+
+        # Worker threads for the sync backend; each active synthesis holds one
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if settings.elevenlabs_backend == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.elevenlabs_thread_pool_size,
+                thread_name_prefix="elevenlabs",
+            )
+
+    async def _iter_audio(
+        self,
+        text: str,
+        voice_id: str,
+        model_id: str,
+        stream: bool,
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield audio chunks from ElevenLabs without blocking the event loop.
+
+        Uses the async client by default. With the ``thread`` backend, the sync
+        generator is drained on a worker thread into a bounded queue, so a slow
+        consumer pauses the upstream read instead of buffering the whole clip.
+
+        Args:
+            text: Text to convert to speech
+            voice_id: Voice ID to use
+            model_id: Model ID to use
+            stream: Use the low-latency streaming endpoint
+
+        Yields:
+            Audio chunks as they arrive from the upstream
+        """
+        if self._executor is None:
+            convert = (
+                self.async_client.text_to_speech.convert_as_stream
+                if stream
+                else self.async_client.text_to_speech.convert
+            )
+            async for chunk in convert(voice_id=voice_id, text=text, model_id=model_id):
+                yield chunk
+            return
+
+        convert = (
+            self.client.text_to_speech.convert_as_stream
+            if stream
+            else self.client.text_to_speech.convert
+        )
+        async for chunk in iterate_in_executor(
+            self._executor,
+            lambda: convert(voice_id=voice_id, text=text, model_id=model_id),
+            settings.elevenlabs_stream_queue_size,
+        ):
+            yield chunk
 
     async def text_to_speech(
         self,
@@ -36,21 +100,40 @@ class ElevenLabsService:
         voice_id = voice_id or settings.elevenlabs_voice_id
         model_id = model_id or settings.elevenlabs_model_id
 
-        try:
-            # Generate audio using ElevenLabs
-            audio_generator = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=voice_id,
-                model_id=model_id,
-            )
+        with tracer.span(
+            "elevenlabs.text_to_speech",
+            **{"tts.model": model_id, "tts.voice": voice_id, "tts.text_chars": len(text)},
+        ) as span:
+            audio_bytes, cached = await self._text_to_speech(text, voice_id, model_id)
+            span.set_attributes(**{"tts.cached": cached, "audio.bytes": len(audio_bytes)})
+            return audio_bytes
 
-            # Collect audio chunks
-            audio_bytes = b""
-            for chunk in audio_generator:
-                audio_bytes += chunk
+    async def _text_to_speech(self, text: str, voice_id: str, model_id: str) -> Tuple[bytes, bool]:
+        """Synthesize through the TTS cache; returns the audio and whether it was cached."""
+        cache_key = tts_cache.make_key(text, voice_id, model_id)
+        if settings.tts_cache_enabled:
+            cached = await tts_cache.get(cache_key)
+            if cached is not None:
+                return cached, True
 
+        async def synthesize() -> bytes:
+            # Collect audio chunks
+            chunks = []
+            try:
+                async for chunk in self._iter_audio(text, voice_id, model_id, stream=False):
+                    chunks.append(chunk)
+            except Exception:
+                record_upstream_error("elevenlabs", "tts")
+                raise
+
+            audio_bytes = b"".join(chunks)
+            if settings.tts_cache_enabled:
+                await tts_cache.put(cache_key, audio_bytes)
             return audio_bytes
 
+        try:
+            return await self.flights.do(cache_key, synthesize), False
+
         except Exception as e:
             raise Exception(f"ElevenLabs TTS error: {str(e)}")
 
@@ -74,20 +157,76 @@ class ElevenLabsService:
         voice_id = voice_id or settings.elevenlabs_voice_id
         model_id = model_id or settings.elevenlabs_model_id
 
+        # Not made current: a generator must not change its consumer's context
+        span = tracer.span(
+            "elevenlabs.text_to_speech_stream",
+            **{"tts.model": model_id, "tts.voice": voice_id, "tts.text_chars": len(text)},
+        )
+        cache_key = tts_cache.make_key(text, voice_id, model_id)
+        if settings.tts_cache_enabled:
+            cached = await tts_cache.get(cache_key)
+            if cached is not None:
+                span.set_attributes(**{"tts.cached": True, "audio.bytes": len(cached)})
+                span.end()
+                yield cached
+                return
+
+        async def synthesize():
+            # Keep a copy of the chunks so a completed stream can be cached
+            chunks = []
+            try:
+                async for chunk in self._iter_audio(text, voice_id, model_id, stream=True):
+                    chunks.append(chunk)
+                    yield chunk
+            except Exception:
+                record_upstream_error("elevenlabs", "tts_stream")
+                raise
+
+            if settings.tts_cache_enabled:
+                await tts_cache.put(cache_key, b"".join(chunks))
+
+        # Yield audio chunks as soon as the upstream sends them; identical
+        # concurrent streams share one upstream; callers arriving before its
+        # first chunk is dropped replay, later ones start their own
+        shared = self.flights.stream(f"stream:{cache_key}", synthesize)
+        started = time.perf_counter()
+        size = 0
         try:
-            # Generate audio using ElevenLabs with streaming
-            audio_generator = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=voice_id,
-                model_id=model_id,
-            )
-
-            # Yield audio chunks
-            for chunk in audio_generator:
+            async for chunk in shared:
+                if not size:
+                    span.set_attribute("tts.ttfb_ms", round((time.perf_counter() - started) * 1000, 1))
+                size += len(chunk)
                 yield chunk
 
         except Exception as e:
+            span.record_error(e)
             raise Exception(f"ElevenLabs TTS streaming error: {str(e)}")
+        finally:
+            span.set_attributes(**{"tts.cached": False, "audio.bytes": size})
+            span.end()
+            await shared.aclose()
+
+    async def warm_up_cache(self, phrases: List[str]) -> int:
+        """
+        Pre-synthesize phrases into the TTS cache with the default voice.
+
+        Args:
+            phrases: Texts to synthesize
+
+        Returns:
+            Number of phrases that were synthesized (not already cached)
+        """
+        synthesized = 0
+        for phrase in phrases:
+            key = tts_cache.make_key(phrase, settings.elevenlabs_voice_id, settings.elevenlabs_model_id)
+            if tts_cache.contains(key):
+                continue
+            try:
+                await self.text_to_speech(phrase)
+                synthesized += 1
+            except Exception as e:
+                print(f"TTS cache warm-up failed for {phrase!r}: {str(e)}")
+        return synthesized
 
     async def get_available_voices(self):
         """
@@ -97,9 +236,10 @@ class ElevenLabsService:
             List of voice objects with id, name, and other metadata
         """
         try:
-            response = self.client.voices.get_all()
+            response = await self.async_client.voices.get_all()
             return response.voices if hasattr(response, 'voices') else response
         except Exception as e:
+            record_upstream_error("elevenlabs", "voices")
             raise Exception(f"Error fetching voices: {str(e)}")
 
 
@@ -0,0 +1,77 @@
+import asyncio
+import concurrent.futures
+import threading
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Iterable
+
+_SENTINEL = object()
+
+
+async def iterate_in_executor(
+    executor: Executor,
+    fn: Callable[[], Iterable[Any]],
+    queue_size: int,
+) -> AsyncIterator[Any]:
+    """
+    Drain a blocking iterator on a worker thread without blocking the loop.
+
+    ``fn`` is called on the worker and its items are handed over through a
+    bounded queue, so a slow consumer pauses the producer instead of letting
+    it buffer everything. If the consumer stops early, the worker notices at
+    its next item, closes the iterator (releasing e.g. an HTTP body) and exits.
+
+    Args:
+        executor: Executor whose thread runs ``fn`` and the iteration
+        fn: Callable returning the blocking iterable
+        queue_size: Items buffered ahead of the consumer
+
+    Yields:
+        Items produced by the iterable; exceptions are re-raised here
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def put(item) -> None:
+        # Block the worker thread while the queue is full (backpressure),
+        # waking up periodically to notice a consumer that went away.
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while not stopped.is_set():
+            try:
+                future.result(timeout=0.5)
+                return
+            except concurrent.futures.TimeoutError:
+                continue
+        future.cancel()
+
+    def produce() -> None:
+        iterator = None
+        try:
+            iterator = iter(fn())
+            for item in iterator:
+                if stopped.is_set():
+                    return
+                put(item)
+            put(_SENTINEL)
+        except Exception as e:
+            put(e)
+        finally:
+            # Generators and streaming bodies release their resources on close
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _SENTINEL:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Let a worker blocked on a full queue notice and exit promptly
+        stopped.set()
+        while not queue.empty():
+            queue.get_nowait()
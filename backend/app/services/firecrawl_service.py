@@ -1,14 +1,95 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from firecrawl import FirecrawlApp
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Set, Tuple
 from app.config import settings
+from app.services.metrics import record_upstream_error
+from app.services.retrieval_index import retrieval_index
+from app.services.search_cache import search_cache
+from app.services.singleflight import SingleFlight
+from app.services.tracing import tracer
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonicalize a URL so trivially different spellings dedupe.
+
+    Lowercases the scheme and host, drops default ports, fragments and a
+    trailing slash, and sorts query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
 
 
 class FirecrawlService:
     """Service for web search and scraping using Firecrawl."""
 
     def __init__(self):
-        """Initialize Firecrawl client."""
-        self.client = FirecrawlApp(api_key=settings.firecrawl_api_key)
+        """Initialize Firecrawl service; the client is created on first use."""
+        self._client: Optional[FirecrawlApp] = None
+
+        # FirecrawlApp is blocking; its calls run on this bounded pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.firecrawl_max_workers,
+            thread_name_prefix="firecrawl",
+        )
+
+        # Identical concurrent searches share one upstream request
+        self.flights = SingleFlight()
+        # Stale-while-revalidate refreshes in flight by cache key; referenced
+        # so they are not garbage-collected mid-refresh
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        # Background indexing of scraped pages; referenced so they are not collected
+        self._indexing: Set[asyncio.Task] = set()
+
+    @property
+    def client(self) -> FirecrawlApp:
+        """
+        Firecrawl client, created on first use.
+
+        Raises:
+            ValueError: If FIRECRAWL_API_KEY is not set
+        """
+        if self._client is None:
+            if not settings.firecrawl_api_key:
+                raise ValueError("FIRECRAWL_API_KEY is not set in environment variables")
+            self._client = FirecrawlApp(api_key=settings.firecrawl_api_key)
+        return self._client
+
+    async def _run(self, fn, *args):
+        """Run a blocking Firecrawl call on the Firecrawl executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _index_pages(self, pages: List[Dict[str, Any]]) -> None:
+        """
+        Add scraped pages to the local retrieval index in the background.
+
+        Chunking, the SQLite write and any embedding call stay out of the
+        scrape's response path.
+        """
+        if not settings.rag_auto_index or not pages:
+            return
+        task = asyncio.create_task(self._index_in_background(pages))
+        self._indexing.add(task)
+        task.add_done_callback(self._indexing.discard)
+
+    async def _index_in_background(self, pages: List[Dict[str, Any]]) -> None:
+        """Index pages; never fails the scrape."""
+        try:
+            await retrieval_index.add_pages(pages)
+        except Exception as e:
+            print(f"Error indexing scraped pages: {str(e)}")
 
     async def search_web(
         self,
@@ -19,6 +100,12 @@ class FirecrawlService:
         """
         Search the web using Firecrawl.
 
+        Successful results are cached per normalized query, limit and format.
+        Fresh hits are served from memory. Once an entry is past its format's
+        TTL it is still served, flagged as cached, while one background
+        request refreshes it. Identical concurrent misses share one upstream
+        search.
+
         Args:
             query: Search query
             limit: Maximum number of results to return (default: 5)
@@ -30,12 +117,67 @@ class FirecrawlService:
         Raises:
             Exception: If search fails
         """
+        with tracer.span(
+            "firecrawl.search_web",
+            **{"search.query_chars": len(query), "search.limit": limit, "search.format": format},
+        ) as span:
+            result = await self._search_web(query, limit, format)
+            span.set_attributes(**{
+                "search.cached": bool(result.get("cached")),
+                "search.results": result.get("count", 0),
+                "content.bytes": sum(len(item.get("content") or "") for item in result.get("results", [])),
+            })
+            if not result["success"]:
+                span.record_error(result.get("error", "Unknown error"))
+            return result
+
+    async def _search_web(self, query: str, limit: int, format: str) -> Dict[str, Any]:
+        """Search through the result cache, refreshing stale entries in the background."""
+        if not settings.search_cache_enabled:
+            return await self._search(query, limit, format)
+
+        key = search_cache.make_key(query, limit, format)
+        cached = await search_cache.get(key, format)
+        if cached is not None:
+            value, fresh = cached
+            if not fresh and key not in self._refreshing:
+                refresh = asyncio.create_task(self._search_and_store(key, query, limit, format))
+                self._refreshing[key] = refresh
+                refresh.add_done_callback(lambda _: self._refreshing.pop(key, None))
+            return {**value, "query": query, "cached": True}
+
+        result = await self.flights.do(
+            f"search:{key}",
+            lambda: self._search_and_store(key, query, limit, format),
+        )
+        return {**result, "query": query}
+
+    async def _search_and_store(
+        self,
+        key: str,
+        query: str,
+        limit: int,
+        format: str
+    ) -> Dict[str, Any]:
+        """Search upstream and cache the results if the search succeeded."""
+        result = await self._search(query, limit, format)
+        if result["success"]:
+            await search_cache.set(key, result)
+        return {**result, "cached": False}
+
+    async def _search(
+        self,
+        query: str,
+        limit: int,
+        format: str
+    ) -> Dict[str, Any]:
+        """Run an uncached Firecrawl search and format its results."""
         try:
             # Perform web search using Firecrawl
-            results = self.client.search(
-                query=query,
-                limit=limit
-            )
+            results = await self._run(lambda: self.client.search(
+                query,
+                params={'limit': limit}
+            ))
 
             # Extract and format results
             formatted_results = []
@@ -69,6 +211,7 @@ class FirecrawlService:
             }
 
         except Exception as e:
+            record_upstream_error("firecrawl", "search")
             return {
                 "success": False,
                 "error": f"Firecrawl search error: {str(e)}",
@@ -98,13 +241,28 @@ class FirecrawlService:
         if formats is None:
             formats = ['markdown']
 
+        with tracer.span("firecrawl.scrape_url", **{"http.url": url, "scrape.formats": ",".join(formats)}) as span:
+            result = await self._scrape_url(url, formats)
+            if result["success"]:
+                data = result["data"]
+                span.set_attribute(
+                    "content.bytes", len(data.get("markdown") or "") + len(data.get("html") or "")
+                )
+            else:
+                span.record_error(result["error"])
+            return result
+
+    async def _scrape_url(self, url: str, formats: List[str]) -> Dict[str, Any]:
+        """Scrape a URL off the event loop and index the page."""
         try:
-            # Scrape URL using Firecrawl
-            result = self.client.scrape_url(
-                url=url,
-                params={
-                    'formats': formats
-                }
+            # Scrape URL using Firecrawl, off the event loop
+            result = await self._run(
+                lambda: self.client.scrape_url(
+                    url=url,
+                    params={
+                        'formats': formats
+                    }
+                )
             )
 
             scraped_data = {
@@ -123,18 +281,71 @@ class FirecrawlService:
             if 'screenshot' in formats:
                 scraped_data['screenshot'] = result.get('screenshot', '')
 
+            self._index_pages([scraped_data])
+
             return {
                 "success": True,
                 "data": scraped_data
             }
 
         except Exception as e:
+            record_upstream_error("firecrawl", "scrape")
             return {
                 "success": False,
                 "error": f"Firecrawl scraping error: {str(e)}",
                 "url": url
             }
 
+    async def scrape_many(
+        self,
+        urls: List[str],
+        formats: Optional[List[str]] = None,
+    ) -> AsyncIterator[Tuple[str, List[str], Dict[str, Any]]]:
+        """
+        Scrape several URLs concurrently.
+
+        URLs are normalized and deduplicated first. Scrapes run on the
+        Firecrawl executor, with at most ``firecrawl_per_host_concurrency``
+        in flight per host and at least ``firecrawl_per_host_interval_seconds``
+        between starts on the same host.
+
+        Args:
+            urls: URLs to scrape
+            formats: List of formats to return ('markdown', 'html', 'links', 'screenshot')
+
+        Yields:
+            (normalized_url, requested_urls, result) in completion order, where
+            result has the same shape as ``scrape_url``'s
+        """
+        requested: Dict[str, List[str]] = {}
+        for url in urls:
+            requested.setdefault(normalize_url(url), []).append(url)
+
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+        host_next_start: Dict[str, float] = {}
+
+        async def scrape(url: str) -> Tuple[str, List[str], Dict[str, Any]]:
+            host = urlsplit(url).netloc
+            limit = host_limits.setdefault(
+                host, asyncio.Semaphore(settings.firecrawl_per_host_concurrency)
+            )
+            async with limit:
+                # Space out request starts on the same host
+                now = time.monotonic()
+                start = max(now, host_next_start.get(host, now))
+                host_next_start[host] = start + settings.firecrawl_per_host_interval_seconds
+                if start > now:
+                    await asyncio.sleep(start - now)
+                return url, requested[url], await self.scrape_url(url, formats)
+
+        tasks = [asyncio.create_task(scrape(url)) for url in requested]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
     async def crawl_website(
         self,
         url: str,
@@ -156,15 +367,20 @@ class FirecrawlService:
             Exception: If crawling fails
         """
         try:
-            # Start crawl job
-            crawl_result = self.client.crawl_url(
-                url=url,
-                params={
-                    'maxDepth': max_depth,
-                    'limit': limit
-                }
+            # Start crawl job and wait for it off the event loop
+            crawl_result = await self._run(
+                lambda: self.client.crawl_url(
+                    url=url,
+                    params={
+                        'maxDepth': max_depth,
+                        'limit': limit
+                    }
+                )
             )
 
+            if isinstance(crawl_result, dict):
+                self._index_pages(crawl_result.get('data') or [])
+
             return {
                 "success": True,
                 "url": url,
@@ -172,12 +388,77 @@ class FirecrawlService:
             }
 
         except Exception as e:
+            record_upstream_error("firecrawl", "crawl")
             return {
                 "success": False,
                 "error": f"Firecrawl crawling error: {str(e)}",
                 "url": url
             }
 
+    async def crawl_pages(
+        self,
+        url: str,
+        max_depth: int = 2,
+        limit: int = 10,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Crawl a website, yielding pages as Firecrawl reports them.
+
+        The crawl is started asynchronously on Firecrawl and polled every
+        ``firecrawl_crawl_poll_seconds``. If the caller stops early or is
+        cancelled, the Firecrawl crawl is cancelled too.
+
+        Args:
+            url: Starting URL to crawl
+            max_depth: Maximum depth to crawl (default: 2)
+            limit: Maximum number of pages to crawl (default: 10)
+
+        Yields:
+            Crawled page dicts (markdown, metadata, ...)
+
+        Raises:
+            Exception: If the crawl cannot be started or fails
+        """
+        try:
+            started = await self._run(
+                self.client.async_crawl_url,
+                url,
+                {'maxDepth': max_depth, 'limit': limit},
+            )
+        except Exception:
+            record_upstream_error("firecrawl", "crawl")
+            raise
+        crawl_id = started['id']
+
+        finished = False
+        emitted = 0
+        try:
+            while True:
+                crawl_status = await self._run(self.client.check_crawl_status, crawl_id)
+                pages = crawl_status.get('data') or []
+                for page in pages[emitted:]:
+                    self._index_pages([page])
+                    yield page
+                emitted = max(emitted, len(pages))
+
+                if crawl_status.get('status') == 'completed':
+                    finished = True
+                    return
+                if crawl_status.get('status') in ('failed', 'cancelled'):
+                    finished = True
+                    record_upstream_error("firecrawl", "crawl")
+                    raise Exception(
+                        f"Firecrawl crawling error: crawl {crawl_status.get('status')}: "
+                        f"{crawl_status.get('error')}"
+                    )
+                await asyncio.sleep(settings.firecrawl_crawl_poll_seconds)
+        finally:
+            if not finished:
+                try:
+                    await self._run(self.client.cancel_crawl, crawl_id)
+                except Exception as e:
+                    print(f"Error cancelling Firecrawl crawl {crawl_id}: {str(e)}")
+
 
 # Singleton instance
 firecrawl_service = FirecrawlService()
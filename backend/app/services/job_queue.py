@@ -0,0 +1,502 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from app.config import settings
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+TERMINAL_STATES = {JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED}
+
+JOB_COLUMNS = "id, kind, params, status, error, result_count, created_at, updated_at"
+
+
+class JobStore:
+    """
+    SQLite store of jobs and their results.
+
+    Several processes may share the database. A worker runs a job only after
+    claiming it, which atomically moves it from queued to running under the
+    worker's owner ID with a lease. Terminal states are only written over a
+    running job, so a cancel from another process is never overwritten.
+
+    Methods are blocking; JobQueue calls them on a worker thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, "
+                "kind TEXT NOT NULL, "
+                "params TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "error TEXT, "
+                "result_count INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL, "
+                "owner TEXT, "
+                "lease_expires REAL)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            # Databases created before jobs were claimed lack the ownership columns
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            if "lease_expires" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires REAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_results ("
+                "job_id TEXT NOT NULL, "
+                "seq INTEGER NOT NULL, "
+                "data TEXT NOT NULL, "
+                "PRIMARY KEY (job_id, seq))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def _row_to_job(row) -> Dict[str, Any]:
+        job_id, kind, params, status, error, result_count, created_at, updated_at = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "params": json.loads(params),
+            "status": status,
+            "error": error,
+            "result_count": result_count,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def create(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                f"INSERT INTO jobs ({JOB_COLUMNS}) VALUES (?, ?, ?, ?, NULL, 0, ?, ?)",
+                (job_id, kind, json.dumps(params), JOB_QUEUED, now, now),
+            )
+            conn.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query = f"SELECT {JOB_COLUMNS} FROM jobs"
+        args: List[Any] = []
+        if status:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._connect().execute(query, args).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def _update(self, query: str, args: tuple) -> int:
+        with self._lock:
+            conn = self._connect()
+            rowcount = conn.execute(query, args).rowcount
+            conn.commit()
+        return rowcount
+
+    def claim(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """
+        Take a queued job for ``owner``.
+
+        Returns:
+            True if the job was queued and is now running under ``owner``
+        """
+        now = time.time()
+        return self._update(
+            "UPDATE jobs SET status = ?, owner = ?, lease_expires = ?, updated_at = ? "
+            "WHERE id = ? AND status = ?",
+            (JOB_RUNNING, owner, now + lease_seconds, now, job_id, JOB_QUEUED),
+        ) == 1
+
+    def finish(self, job_id: str, owner: str, status: str, error: Optional[str] = None) -> bool:
+        """
+        Record how a job run by ``owner`` ended.
+
+        Returns:
+            False if the job was no longer running under ``owner`` (e.g. cancelled meanwhile)
+        """
+        return self._update(
+            "UPDATE jobs SET status = ?, error = ?, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND status = ? AND owner = ?",
+            (status, error, time.time(), job_id, JOB_RUNNING, owner),
+        ) == 1
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job unless it already finished.
+
+        Returns:
+            True if the job was queued or running
+        """
+        return self._update(
+            "UPDATE jobs SET status = ?, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND status IN (?, ?)",
+            (JOB_CANCELLED, time.time(), job_id, JOB_QUEUED, JOB_RUNNING),
+        ) == 1
+
+    def renew_leases(self, owner: str, lease_seconds: float) -> List[str]:
+        """
+        Extend the leases of the jobs ``owner`` is running.
+
+        Returns:
+            IDs of the jobs still running under ``owner``
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status = ?",
+                (time.time() + lease_seconds, owner, JOB_RUNNING),
+            )
+            conn.commit()
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE owner = ? AND status = ?", (owner, JOB_RUNNING)
+            ).fetchall()
+        return [job_id for (job_id,) in rows]
+
+    def add_result(self, job_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            conn = self._connect()
+            (seq,) = conn.execute("SELECT result_count FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            conn.execute("INSERT INTO job_results VALUES (?, ?, ?)", (job_id, seq, json.dumps(data)))
+            conn.execute(
+                "UPDATE jobs SET result_count = ?, updated_at = ? WHERE id = ?",
+                (seq + 1, time.time(), job_id),
+            )
+            conn.commit()
+
+    def results(self, job_id: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT data FROM job_results WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                (job_id, offset, limit),
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def requeue_interrupted(self, owner: Optional[str] = None) -> List[str]:
+        """
+        Put running jobs whose worker is gone back in the queue.
+
+        A job counts as interrupted when its lease expired, i.e. the process
+        running it stopped renewing it, or when it is running under
+        ``owner`` (a worker handing its jobs back on shutdown). Jobs that a
+        live process is running are left alone. Partial results are dropped
+        since handlers start over.
+
+        Args:
+            owner: Also requeue this owner's running jobs
+
+        Returns:
+            IDs of all queued jobs, oldest first
+        """
+        with self._lock:
+            conn = self._connect()
+            interrupted = [
+                job_id for (job_id,) in conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? "
+                    "AND (lease_expires IS NULL OR lease_expires < ? OR owner = ?)",
+                    (JOB_RUNNING, time.time(), owner),
+                ).fetchall()
+            ]
+            for job_id in interrupted:
+                conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+                conn.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, lease_expires = NULL, "
+                    "result_count = 0, updated_at = ? WHERE id = ? AND status = ?",
+                    (JOB_QUEUED, time.time(), job_id, JOB_RUNNING),
+                )
+            conn.commit()
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (JOB_QUEUED,)
+            ).fetchall()
+        return [job_id for (job_id,) in rows]
+
+
+class JobContext:
+    """What a job handler gets: its parameters and a way to save results."""
+
+    def __init__(self, queue: "JobQueue", job: Dict[str, Any]):
+        self._queue = queue
+        self.job_id = job["id"]
+        self.params = job["params"]
+
+    async def emit(self, result: Dict[str, Any]) -> None:
+        """Save one result (a crawled page, a batch item, ...) of the job."""
+        await asyncio.to_thread(self._queue.store.add_result, self.job_id, result)
+        self._queue._notify(self.job_id)
+
+
+JobHandler = Callable[[JobContext], Awaitable[None]]
+
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def register_job_handler(kind: str, handler: JobHandler) -> None:
+    """Make a job kind submittable; ``handler`` runs the job and emits its results."""
+    JOB_HANDLERS[kind] = handler
+
+
+class JobQueue:
+    """
+    Background jobs persisted in a JobStore.
+
+    At most ``job_workers`` jobs run at once, and at most
+    ``job_max_concurrency[kind]`` of each kind; jobs only take a worker once
+    their kind has room. While running, a queue
+    renews the leases of its jobs every third of ``job_lease_seconds``. The
+    same loop requeues jobs whose lease expired (their process died) and
+    picks up jobs queued by other processes sharing the store. Jobs
+    cancelled by another process are stopped here too.
+    """
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        self.owner = uuid.uuid4().hex
+        self._maintainer: Optional[asyncio.Task] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: set = set()
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._workers: Optional[asyncio.Semaphore] = None
+        self._kind_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _limit(self, kind: str) -> asyncio.Semaphore:
+        if kind not in self._kind_limits:
+            self._kind_limits[kind] = asyncio.Semaphore(
+                settings.job_max_concurrency.get(kind, settings.job_workers)
+            )
+        return self._kind_limits[kind]
+
+    def _notify(self, job_id: str) -> None:
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    def _changed_event(self, job_id: str) -> asyncio.Event:
+        return self._changed.setdefault(job_id, asyncio.Event())
+
+    def _schedule(self, job_id: str) -> None:
+        if self._workers is None:
+            self._workers = asyncio.Semaphore(settings.job_workers)
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def _requeue(self, owner: Optional[str] = None) -> None:
+        for job_id in await asyncio.to_thread(self.store.requeue_interrupted, owner):
+            if job_id not in self._tasks:
+                self._schedule(job_id)
+
+    async def start(self) -> None:
+        """Resume jobs left queued, or running by a process that is gone."""
+        await self._requeue()
+        if self._maintainer is None:
+            self._maintainer = asyncio.create_task(self._maintain())
+
+    async def stop(self) -> None:
+        """Stop running jobs and hand them back to the queue for the next ``start``."""
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+            await asyncio.gather(self._maintainer, return_exceptions=True)
+            self._maintainer = None
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(self.store.requeue_interrupted, self.owner)
+
+    async def _maintain(self) -> None:
+        lease = settings.job_lease_seconds
+        while True:
+            await asyncio.sleep(lease / 3)
+            try:
+                running = set(await asyncio.to_thread(self.store.renew_leases, self.owner, lease))
+                for job_id, task in list(self._tasks.items()):
+                    job = await self.get(job_id) if job_id not in running else None
+                    if job is not None and job["status"] == JOB_CANCELLED:
+                        # Cancelled through another process
+                        self._cancel_requested.add(job_id)
+                        task.cancel()
+                await self._requeue()
+            except Exception as e:
+                print(f"Job queue maintenance failed: {str(e)}")
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a job.
+
+        Raises:
+            ValueError: If no handler is registered for ``kind``
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = await asyncio.to_thread(self.store.create, kind, params)
+        self._schedule(job["id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.list, status, limit)
+
+    async def results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.results, job_id, offset, limit)
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued or running job; finished jobs are left as they are.
+
+        Returns:
+            The job after cancellation, or None if it does not exist
+        """
+        job = await self.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATES:
+            return job
+
+        await asyncio.to_thread(self.store.cancel, job_id)
+        task = self._tasks.get(job_id)
+        if task is not None:
+            self._cancel_requested.add(job_id)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        else:
+            # Queued, or running in another process, which stops it on its next lease renewal
+            self._notify(job_id)
+        return await self.get(job_id)
+
+    async def follow(self, job_id: str, offset: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield a job's results from ``offset``, waiting for new ones until it finishes.
+        """
+        page_size = settings.job_results_page_size
+        while True:
+            # Grab the event first so a result saved meanwhile is not missed
+            changed = self._changed_event(job_id)
+            page = await self.results(job_id, offset, page_size)
+            for result in page:
+                yield result
+            offset += len(page)
+            if len(page) == page_size:
+                continue
+
+            job = await self.get(job_id)
+            if job is None or (job["status"] in TERMINAL_STATES and offset >= job["result_count"]):
+                return
+            try:
+                # The timeout also covers jobs run by another process
+                await asyncio.wait_for(changed.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job_id: str) -> None:
+        try:
+            job = await self.get(job_id)
+            if job is None or job["status"] != JOB_QUEUED:
+                return
+            # Kind limit first: a job waiting on its kind must not hold a
+            # worker that a job of another kind could use
+            async with self._limit(job["kind"]), self._workers:
+                await self._execute(job)
+        except asyncio.CancelledError:
+            if job_id not in self._cancel_requested:
+                # Shutdown: stop() hands the job back to the queue
+                raise
+            await asyncio.to_thread(self.store.cancel, job_id)
+        finally:
+            self._cancel_requested.discard(job_id)
+            self._tasks.pop(job_id, None)
+            self._notify(job_id)
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        if not await asyncio.to_thread(self.store.claim, job_id, self.owner, settings.job_lease_seconds):
+            # Claimed by another worker or process, or cancelled while queued
+            return
+        self._notify(job_id)
+        try:
+            await JOB_HANDLERS[job["kind"]](JobContext(self, job))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await asyncio.to_thread(self.store.finish, job_id, self.owner, JOB_FAILED, str(e))
+            return
+        await asyncio.to_thread(self.store.finish, job_id, self.owner, JOB_SUCCEEDED)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "active": len(self._tasks),
+            "workers": settings.job_workers,
+            "max_concurrency": settings.job_max_concurrency,
+        }
+
+
+async def run_crawl_job(ctx: JobContext) -> None:
+    """Crawl a website, saving each page as it is crawled."""
+    from app.services.firecrawl_service import firecrawl_service
+
+    async for page in firecrawl_service.crawl_pages(
+        url=ctx.params["url"],
+        max_depth=ctx.params.get("max_depth", 2),
+        limit=ctx.params.get("limit", 10),
+    ):
+        await ctx.emit(page)
+
+
+async def run_batch_generate_job(ctx: JobContext) -> None:
+    """Generate text for a list of prompts, saving each result as it finishes."""
+    from app.services.openai_service import openai_service
+
+    results = openai_service.generate_many(
+        prompts=ctx.params["prompts"],
+        temperature=ctx.params.get("temperature"),
+        system_prompt=ctx.params.get("system_prompt"),
+        cache=ctx.params.get("cache"),
+        max_concurrency=ctx.params.get("max_concurrency"),
+        priority="batch",
+    )
+    try:
+        async for index, result in results:
+            await ctx.emit({
+                "index": index,
+                "success": result["success"],
+                "content": result.get("content"),
+                "model": result.get("model"),
+                "usage": result.get("usage"),
+                "error": result.get("error"),
+                "cached": result.get("cached", False),
+            })
+    finally:
+        await results.aclose()
+
+
+register_job_handler("crawl", run_crawl_job)
+register_job_handler("batch_generate", run_batch_generate_job)
+
+
+# Singleton instance
+job_queue = JobQueue(JobStore(settings.job_store_path))
@@ -0,0 +1,510 @@
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from app.config import settings
+
+
+def normalize_usage(usage: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Map provider-specific token counts onto prompt/completion/total tokens."""
+    usage = usage or {}
+    prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0
+    completion_tokens = usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": usage.get("total_tokens", prompt_tokens + completion_tokens),
+    }
+
+
+class LLMProvider:
+    """
+    Adapter giving one LLM backend the gateway's request/response shape.
+
+    ``complete`` returns a dict with success, content, model, usage
+    (prompt/completion/total tokens), stop_reason and, on failure, error.
+    ``stream_events`` yields "delta", "usage" and "done" event dicts and
+    raises on failure; ``stream`` yields only the text of the deltas.
+    """
+
+    name = "provider"
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+        cache: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def stream_events(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        events = self.stream_events(messages, max_tokens, temperature, system_prompt)
+        try:
+            async for event in events:
+                if event["type"] == "delta":
+                    yield event["content"]
+        finally:
+            await events.aclose()
+
+
+class OpenAIProvider(LLMProvider):
+    """Gateway adapter for OpenAIService."""
+
+    name = "openai"
+
+    def __init__(self):
+        from app.services.openai_service import openai_service
+        self.service = openai_service
+
+    async def complete(self, messages, max_tokens=None, temperature=None, system_prompt=None, cache=None):
+        result = await self.service.chat_completion(
+            messages=messages,
+            temperature=temperature,
+            system_prompt=system_prompt,
+            cache=cache,
+        )
+        if result["success"]:
+            result = {
+                **result,
+                "usage": normalize_usage(result.get("usage")),
+                "stop_reason": result.get("finish_reason"),
+            }
+        return result
+
+    def stream_events(self, messages, max_tokens=None, temperature=None, system_prompt=None):
+        return self.service.stream_chat_events(
+            messages=messages,
+            temperature=temperature,
+            system_prompt=system_prompt,
+        )
+
+
+class BedrockProvider(LLMProvider):
+    """Gateway adapter for BedrockService."""
+
+    name = "bedrock"
+
+    def __init__(self):
+        from app.services.bedrock_service import bedrock_service
+        self.service = bedrock_service
+
+    async def complete(self, messages, max_tokens=None, temperature=None, system_prompt=None, cache=None):
+        result = await self.service.chat_completion(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system_prompt=system_prompt,
+        )
+        if result["success"]:
+            result = {**result, "usage": normalize_usage(result.get("usage"))}
+        return result
+
+    def stream_events(self, messages, max_tokens=None, temperature=None, system_prompt=None):
+        return self.service.stream_chat_events(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system_prompt=system_prompt,
+        )
+
+
+class StubProvider(LLMProvider):
+    """Local provider that echoes the last message after a fixed delay."""
+
+    name = "stub"
+
+    def __init__(self, latency: Optional[float] = None, failure_rate: Optional[float] = None):
+        self.latency = settings.llm_stub_latency if latency is None else latency
+        self.failure_rate = settings.llm_stub_failure_rate if failure_rate is None else failure_rate
+
+    def _reply(self, messages: List[Dict[str, str]]) -> str:
+        return f"Stub reply to: {messages[-1]['content'] if messages else ''}"
+
+    async def complete(self, messages, max_tokens=None, temperature=None, system_prompt=None, cache=None):
+        await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            return {"success": False, "error": "Stub provider failure", "model": "stub"}
+        content = self._reply(messages)
+        return {
+            "success": True,
+            "content": content,
+            "model": "stub",
+            "usage": normalize_usage({
+                "prompt_tokens": sum(len(m["content"].split()) for m in messages),
+                "completion_tokens": len(content.split()),
+            }),
+            "stop_reason": "stop",
+        }
+
+    async def stream_events(self, messages, max_tokens=None, temperature=None, system_prompt=None):
+        await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise Exception("Stub provider failure")
+        words = self._reply(messages).split(" ")
+        for word in words:
+            yield {"type": "delta", "content": word + " "}
+        yield {"type": "usage", "usage": {
+            "prompt_tokens": sum(len(m["content"].split()) for m in messages),
+            "completion_tokens": len(words),
+        }}
+        yield {"type": "done", "finish_reason": "stop", "model": "stub"}
+
+
+PROVIDERS: Dict[str, Callable[[], LLMProvider]] = {
+    "openai": OpenAIProvider,
+    "bedrock": BedrockProvider,
+    "stub": StubProvider,
+}
+
+
+def register_provider(name: str, factory: Callable[[], LLMProvider]) -> None:
+    """Make a provider selectable through ``llm_providers``."""
+    PROVIDERS[name] = factory
+
+
+class ProviderState:
+    """Routing state for one provider: latency EWMA, circuit breaker, limit."""
+
+    def __init__(self, provider: LLMProvider, name: str):
+        self.provider = provider
+        self.name = name
+        self.cost = settings.llm_provider_costs.get(name, 1.0)
+        self.weight = settings.llm_provider_weights.get(name, 1.0)
+        self.limit = settings.llm_provider_max_concurrency.get(name, settings.llm_default_max_concurrency)
+        self.semaphore = asyncio.Semaphore(self.limit)
+        self.in_flight = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        # Set while the single trial request of a half-open circuit runs
+        self.trial = False
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def circuit(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        # Half-open admits one trial; other requests stay away until it passes
+        if not self.trial and time.monotonic() - self.opened_at >= settings.llm_circuit_reset_seconds:
+            return "half_open"
+        return "open"
+
+    def claim_trial(self) -> bool:
+        """Make the request about to start the half-open trial, if due."""
+        if self.circuit != "half_open":
+            return False
+        self.trial = True
+        return True
+
+    @property
+    def saturated(self) -> bool:
+        return self.in_flight >= self.limit
+
+    def record_success(self, latency: float) -> None:
+        alpha = settings.llm_ewma_alpha
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = alpha * latency + (1 - alpha) * self.ewma_latency
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.trial or self.consecutive_failures >= settings.llm_circuit_failure_threshold:
+            self.opened_at = time.monotonic()
+        self.trial = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.circuit,
+            "ewma_latency": self.ewma_latency,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.limit,
+            "requests": self.requests,
+            "failures": self.failures,
+            "cost": self.cost,
+            "weight": self.weight,
+        }
+
+
+class LLMGateway:
+    """
+    Route LLM requests across providers.
+
+    Providers are ranked by the configured policy (``latency``: lowest EWMA
+    latency, ``cost``: cheapest, ``weighted``: random by weight), skipping
+    those with an open circuit and preferring those below their concurrency
+    limit. A failed request fails over to the next provider; when hedging is
+    enabled, a request still pending after ``llm_hedge_after_seconds`` is
+    duplicated to the next provider and the first success wins.
+    """
+
+    def __init__(self, factories: Optional[Dict[str, Callable[[], LLMProvider]]] = None):
+        self.factories = factories if factories is not None else PROVIDERS
+        self.states: Dict[str, ProviderState] = {}
+
+    def state(self, name: str) -> ProviderState:
+        """Return a provider's routing state, building the provider on first use."""
+        if name not in self.states:
+            if name not in self.factories:
+                raise ValueError(f"Unknown LLM provider: {name}")
+            self.states[name] = ProviderState(self.factories[name](), name)
+        return self.states[name]
+
+    def rank(self, only: Optional[List[str]] = None) -> List[ProviderState]:
+        """
+        Order candidate providers by routing policy and health.
+
+        Args:
+            only: Provider names to route between (defaults to ``llm_providers``)
+        """
+        states = [self.state(name) for name in (only or settings.llm_providers)]
+        if not states:
+            raise ValueError("No LLM provider configured")
+
+        policy = settings.llm_routing_policy
+        if policy == "cost":
+            states.sort(key=lambda s: s.cost)
+        elif policy == "weighted":
+            # Weighted sampling without replacement (Efraimidis-Spirakis)
+            states.sort(key=lambda s: random.random() ** (1.0 / max(s.weight, 1e-9)), reverse=True)
+        else:
+            # Unmeasured providers first so every provider gets a latency sample
+            states.sort(key=lambda s: -1.0 if s.ewma_latency is None else s.ewma_latency)
+
+        healthy = [s for s in states if s.circuit != "open"] or states
+        return sorted(healthy, key=lambda s: s.saturated)
+
+    async def _attempt(
+        self,
+        state: ProviderState,
+        call: Callable[[LLMProvider], Any],
+        trial: bool = False,
+    ) -> Dict[str, Any]:
+        try:
+            async with state.semaphore:
+                state.in_flight += 1
+                state.requests += 1
+                started = time.monotonic()
+                try:
+                    result = await call(state.provider)
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                finally:
+                    state.in_flight -= 1
+        except BaseException:
+            if trial:
+                # A cancelled trial gives no verdict; let the next one run
+                state.trial = False
+            raise
+
+        if result.get("success"):
+            state.record_success(time.monotonic() - started)
+        else:
+            state.record_failure()
+        return {**result, "provider": state.name}
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+        cache: Optional[bool] = None,
+        providers: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a chat completion on the best provider, with failover and hedging.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            system_prompt: Optional system prompt
+            cache: Response cache override for providers that support it
+            providers: Restrict routing to these provider names
+
+        Returns:
+            Dict containing the response, metadata and the provider used
+        """
+        ranked = self.rank(providers)
+        hedge_after = settings.llm_hedge_after_seconds
+
+        def call(provider: LLMProvider):
+            return provider.complete(
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                system_prompt=system_prompt,
+                cache=cache,
+            )
+
+        pending = set()
+        next_index = 0
+        last_failure: Dict[str, Any] = {"success": False, "error": "No provider attempted"}
+
+        def launch() -> None:
+            nonlocal next_index
+            state = ranked[next_index]
+            # Claim a half-open trial now, before another request ranks it
+            trial = state.claim_trial()
+            pending.add(asyncio.create_task(self._attempt(state, call, trial)))
+            next_index += 1
+
+        launch()
+        try:
+            while pending:
+                can_hedge = hedge_after is not None and next_index < len(ranked)
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=hedge_after if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Hedge: the current attempt is slow, race the next provider
+                    launch()
+                    continue
+
+                for task in done:
+                    pending.discard(task)
+                    result = task.result()
+                    if result["success"]:
+                        return result
+                    last_failure = result
+
+                if not pending and next_index < len(ranked):
+                    # Fail over to the next provider
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        last_failure.setdefault("model", last_failure.get("provider", "unknown"))
+        return last_failure
+
+    async def stream_events(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+        providers: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a chat completion from the best provider as typed events.
+
+        Fails over to the next provider only until the first event has been
+        produced; after that, errors are raised to the caller. Usage is
+        normalized to prompt/completion/total tokens and the "done" event
+        names the provider.
+
+        Raises:
+            Exception: If every provider fails before producing output
+        """
+        errors = []
+        for state in self.rank(providers):
+            trial = state.claim_trial()
+            try:
+                await state.semaphore.acquire()
+            except BaseException:
+                if trial:
+                    state.trial = False
+                raise
+            state.in_flight += 1
+            state.requests += 1
+            started = time.monotonic()
+            events = state.provider.stream_events(
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                system_prompt=system_prompt,
+            )
+            try:
+                try:
+                    first = await events.__anext__()
+                except StopAsyncIteration:
+                    state.record_success(time.monotonic() - started)
+                    return
+                except Exception as e:
+                    state.record_failure()
+                    errors.append(f"{state.name}: {str(e)}")
+                    continue
+
+                # Latency for streams is time to first event
+                state.record_success(time.monotonic() - started)
+                event = first
+                while True:
+                    if event["type"] == "usage":
+                        event = {**event, "usage": normalize_usage(event["usage"])}
+                    elif event["type"] == "done":
+                        event = {**event, "provider": state.name}
+                    yield event
+                    try:
+                        event = await events.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    except Exception:
+                        state.record_failure()
+                        raise
+            finally:
+                if trial:
+                    state.trial = False
+                state.in_flight -= 1
+                state.semaphore.release()
+                await events.aclose()
+
+        raise Exception("All LLM providers failed: " + "; ".join(errors))
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+        providers: Optional[List[str]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the text of a chat completion from the best provider.
+
+        Raises:
+            Exception: If every provider fails before producing output
+        """
+        events = self.stream_events(messages, max_tokens, temperature, system_prompt, providers)
+        try:
+            async for event in events:
+                if event["type"] == "delta":
+                    yield event["content"]
+        finally:
+            await events.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": settings.llm_routing_policy,
+            "hedge_after_seconds": settings.llm_hedge_after_seconds,
+            "providers": {name: state.stats() for name, state in self.states.items()},
+        }
+
+
+# Singleton instance
+llm_gateway = LLMGateway()
@@ -0,0 +1,126 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+from app.config import settings
+from app.services.metrics import EVENT_LOOP_BLOCKS, EVENT_LOOP_LAG_SECONDS
+
+
+class LoopMonitor:
+    """
+    Watches the health of the event loop.
+
+    A task sleeps for ``loop_monitor_interval_seconds`` at a time. How much
+    later than asked it wakes up is the loop lag, i.e. how long other code
+    held the loop. Every sample goes into the ``event_loop_lag_seconds``
+    histogram. Samples over ``loop_monitor_block_threshold_seconds`` also
+    count in ``event_loop_blocks_total``.
+
+    The lag shows *that* the loop was blocked, not by what. With
+    ``loop_monitor_debug`` on, a watchdog thread checks whether the sampler
+    is overdue while the block is still happening. If so, it prints the
+    stack of the loop thread and the task that was running, so the
+    blocking call can be found.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        # When the sampler expects to wake up; None while it is running
+        self._wake_at: Optional[float] = None
+        self._reported_wake_at: Optional[float] = None
+        self.samples = 0
+        self.blocks = 0
+        self.reports = 0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+
+    async def start(self) -> None:
+        """Start sampling on the running loop, plus the watchdog in debug mode."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._sample())
+        if settings.loop_monitor_debug:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop sampling and the watchdog."""
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _sample(self) -> None:
+        interval = settings.loop_monitor_interval_seconds
+        threshold = settings.loop_monitor_block_threshold_seconds
+        while True:
+            started = time.monotonic()
+            self._wake_at = started + interval
+            await asyncio.sleep(interval)
+            self._wake_at = None
+            lag = max(0.0, time.monotonic() - started - interval)
+
+            self.samples += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+            if lag >= threshold:
+                self.blocks += 1
+                EVENT_LOOP_BLOCKS.inc()
+
+    def _watch(self) -> None:
+        threshold = settings.loop_monitor_block_threshold_seconds
+        poll = max(0.01, threshold / 2)
+        while not self._stopping.wait(poll):
+            wake_at = self._wake_at
+            if wake_at is None or wake_at == self._reported_wake_at:
+                continue
+            overdue = time.monotonic() - wake_at
+            if overdue >= threshold:
+                # One report per block; the stack is of the code holding the loop now
+                self._reported_wake_at = wake_at
+                self._report(overdue)
+
+    def _report(self, overdue: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "(no frame)\n"
+        task = asyncio.current_task(self._loop)
+        self.reports += 1
+        print(
+            f"Event loop blocked for {overdue * 1000:.0f} ms and counting "
+            f"(threshold {settings.loop_monitor_block_threshold_seconds * 1000:.0f} ms); "
+            f"running task: {task.get_name() if task else 'none (callback)'}\n"
+            f"{stack}",
+            file=sys.stderr,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "debug": self._watchdog is not None,
+            "samples": self.samples,
+            "blocks": self.blocks,
+            "stack_reports": self.reports,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+        }
+
+
+# Singleton instance
+loop_monitor = LoopMonitor()
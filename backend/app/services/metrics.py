@@ -0,0 +1,269 @@
+import math
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Seconds; suits both fast routes and multi-second LLM and TTS calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """
+    Base of the metric families.
+
+    Each label combination gets a child holding plain numbers, created on
+    first use and cached, so recording a sample is a dict lookup plus an
+    add. Samples are recorded on the event loop thread, so no locks are
+    taken.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Return the child for these label values, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in self._children.items()
+        ]
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Gauge(Counter):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._children[()].dec(amount)
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf, allocated once
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets or DEFAULT_BUCKETS))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics = MetricsRegistry()
+
+# Metrics recorded across the app
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds",
+    "Time from request to the end of the response body.",
+    ("method", "route"),
+)
+WEBSOCKETS_ACTIVE = metrics.gauge("websocket_connections_active", "Open WebSocket connections.", ("path",))
+VOICE_TURNS = metrics.counter("voice_turns_total", "Voice turns answered.", ("mode",))
+VOICE_STAGE_SECONDS = metrics.histogram(
+    "voice_stage_duration_seconds",
+    "Per-stage time of a voice turn: decode, transcribe, llm_ttft, llm_total, "
+    "tts_ttfb, tts_total, send and turn.",
+    ("stage", "mode"),
+)
+UPSTREAM_ERRORS = metrics.counter(
+    "upstream_errors_total", "Failed calls to upstream services.", ("service", "operation")
+)
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total", "Tokens billed by LLM upstreams.", ("service", "type")
+)
+EVENT_LOOP_LAG_SECONDS = metrics.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a timer, i.e. how long other code held the loop.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+EVENT_LOOP_BLOCKS = metrics.counter(
+    "event_loop_blocks_total", "Lag samples over the loop monitor's block threshold."
+)
+ADMISSION_LIMIT = metrics.gauge(
+    "admission_concurrency_limit", "Current adaptive concurrency limit per upstream.", ("upstream",)
+)
+ADMISSION_IN_FLIGHT = metrics.gauge(
+    "admission_in_flight", "Admitted requests holding an upstream slot.", ("upstream",)
+)
+ADMISSION_REJECTED = metrics.counter(
+    "admission_rejected_total",
+    "Requests shed with 503 because an upstream was saturated.",
+    ("upstream", "priority", "reason"),
+)
+
+
+def record_upstream_error(service: str, operation: str) -> None:
+    """Count a failed upstream call."""
+    UPSTREAM_ERRORS.labels(service, operation).inc()
+
+
+def record_token_usage(service: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    """Count the tokens of one upstream completion."""
+    if prompt_tokens:
+        LLM_TOKENS.labels(service, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(service, "completion").inc(completion_tokens)
+
+
+def record_voice_stage(stage: str, mode: str, seconds: float) -> None:
+    """Record how long one stage of a voice turn took."""
+    VOICE_STAGE_SECONDS.labels(stage, mode).observe(seconds)
@@ -1,6 +1,26 @@
-from openai import OpenAI, AsyncOpenAI
-from typing import Dict, Any, Optional, List
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI, AsyncOpenAI, RateLimitError
+from typing import AsyncIterator, Dict, Any, Optional, List, Tuple
 from app.config import settings
+from app.services.admission import Overloaded, admission
+from app.services.metrics import record_token_usage, record_upstream_error
+from app.services.response_cache import response_cache
+from app.services.semantic_cache import semantic_cache
+from app.services.singleflight import SingleFlight
+from app.services.tracing import tracer
+
+
+def _retry_after(error: RateLimitError) -> Optional[float]:
+    """Seconds to wait according to a rate limit response, if it says."""
+    value = error.response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        # HTTP-date form; fall back to exponential backoff
+        return None
 
 
 class OpenAIService:
@@ -13,11 +33,169 @@ class OpenAIService:
         self.client = AsyncOpenAI(api_key=settings.openai_api_key)
         self.sync_client = OpenAI(api_key=settings.openai_api_key)
 
+        # Identical concurrent completions share one upstream request
+        self.flights = SingleFlight()
+
+        # Batch work backs off together after a rate limit response
+        self._rate_limited_until = 0.0
+
+        # Bound the number of Whisper uploads in flight per worker
+        self._transcription_semaphore = asyncio.Semaphore(
+            settings.openai_transcription_max_concurrency
+        )
+        # Partial transcripts of streamed utterances never take final transcriptions' slots
+        self._partial_transcription_semaphore = asyncio.Semaphore(
+            settings.voice_partial_max_concurrency
+        )
+        self._transcription_executor: Optional[ThreadPoolExecutor] = None
+        if settings.openai_transcription_backend == "thread":
+            self._transcription_executor = ThreadPoolExecutor(
+                max_workers=settings.openai_transcription_max_concurrency + settings.voice_partial_max_concurrency,
+                thread_name_prefix="whisper",
+            )
+
+    async def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        cache: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a chat completion inside an "openai.chat_completion" span.
+
+        Args:
+            messages: Full message list, including any system prompt
+            temperature: Sampling temperature
+            cache: Per-request cache override (None uses the default policy)
+
+        Returns:
+            Dict containing the response and metadata
+        """
+        with tracer.span("openai.chat_completion", **{"llm.model": settings.openai_model}) as span:
+            result = await self._cached_complete(messages, temperature, cache)
+            usage = result.get("usage") or {}
+            span.set_attributes(**{
+                "llm.cached": bool(result.get("cached")),
+                "llm.prompt_tokens": usage.get("prompt_tokens"),
+                "llm.completion_tokens": usage.get("completion_tokens"),
+            })
+            if not result["success"]:
+                span.record_error(result.get("error", "Unknown error"))
+            return result
+
+    async def _cached_complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        cache: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a chat completion, going through the response cache when allowed.
+
+        Args:
+            messages: Full message list, including any system prompt
+            temperature: Sampling temperature
+            cache: Per-request cache override (None uses the default policy)
+
+        Returns:
+            Dict containing the response and metadata
+        """
+        use_cache = response_cache.should_cache(temperature, cache)
+        key = response_cache.make_key(settings.openai_model, messages, temperature)
+        if use_cache:
+            cached = await response_cache.get(key)
+            if cached is not None:
+                return {**cached, "cached": True}
+
+        # Single-prompt requests can also be answered by a similar earlier prompt
+        semantic = None
+        if use_cache and semantic_cache.enabled:
+            semantic = await self._semantic_lookup(messages, temperature)
+            if semantic is not None and semantic[2] is not None:
+                return {**semantic[2], "cached": True}
+
+        async def request() -> Dict[str, Any]:
+            started = time.perf_counter()
+            try:
+                response = await self.client.chat.completions.create(
+                    model=settings.openai_model,
+                    messages=messages,
+                    temperature=temperature,
+                )
+
+                result = {
+                    "success": True,
+                    "content": response.choices[0].message.content,
+                    "model": settings.openai_model,
+                    "usage": {
+                        "prompt_tokens": response.usage.prompt_tokens,
+                        "completion_tokens": response.usage.completion_tokens,
+                        "total_tokens": response.usage.total_tokens,
+                    },
+                    "finish_reason": response.choices[0].finish_reason,
+                }
+                record_token_usage("openai", response.usage.prompt_tokens, response.usage.completion_tokens)
+
+            except RateLimitError as e:
+                record_upstream_error("openai", "chat")
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "model": settings.openai_model,
+                    "rate_limited": True,
+                    "retry_after": _retry_after(e),
+                }
+            except Exception as e:
+                record_upstream_error("openai", "chat")
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "model": settings.openai_model,
+                }
+
+            if use_cache:
+                await response_cache.set(key, result)
+            if semantic is not None:
+                vector, context, _ = semantic
+                semantic_cache.store(vector, context, result, (time.perf_counter() - started) * 1000)
+            return result
+
+        return await self.flights.do(f"complete:{int(use_cache)}:{key}", request)
+
+    async def _semantic_lookup(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+    ) -> Optional[Tuple[Any, int, Optional[Dict[str, Any]]]]:
+        """
+        Look up a single-prompt request in the semantic cache.
+
+        Returns:
+            (prompt embedding, context key, cached response or None), or None
+            if the request is not a single user prompt or embedding failed
+        """
+        system_prompt = None
+        if messages and messages[0]["role"] == "system":
+            system_prompt = messages[0]["content"]
+            messages = messages[1:]
+        if len(messages) != 1 or messages[0]["role"] != "user":
+            return None
+
+        prompt = messages[0]["content"]
+        try:
+            vector = await semantic_cache.embed(prompt)
+        except Exception as e:
+            print(f"Semantic cache embedding failed: {str(e)}")
+            return None
+        context = semantic_cache.context_key(settings.openai_model, temperature, system_prompt, prompt)
+        return vector, context, semantic_cache.lookup(vector, context)
+
     async def generate_text(
         self,
         prompt: str,
         temperature: Optional[float] = None,
         system_prompt: Optional[str] = None,
+        cache: Optional[bool] = None,
     ) -> Dict[str, Any]:
         """
         Generate text using OpenAI model.
@@ -26,42 +204,95 @@ class OpenAIService:
             prompt: The user prompt
             temperature: Sampling temperature
             system_prompt: Optional system prompt
+            cache: Force (True) or bypass (False) the response cache
 
         Returns:
             Dict containing the response and metadata
         """
-        temperature = temperature or settings.openai_temperature
+        temperature = temperature if temperature is not None else settings.openai_temperature
 
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
 
-        try:
-            response = await self.client.chat.completions.create(
-                model=settings.openai_model,
-                messages=messages,
-                temperature=temperature,
-            )
+        return await self._complete(messages, temperature, cache)
 
-            return {
-                "success": True,
-                "content": response.choices[0].message.content,
-                "model": settings.openai_model,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens,
-                },
-                "finish_reason": response.choices[0].finish_reason,
-            }
+    async def generate_many(
+        self,
+        prompts: List[str],
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+        cache: Optional[bool] = None,
+        max_concurrency: Optional[int] = None,
+        priority: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Generate text for many prompts concurrently.
 
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "model": settings.openai_model,
-            }
+        At most ``max_concurrency`` requests are in flight. A prompt that hits
+        an upstream rate limit is retried after the server's Retry-After (or
+        an exponential backoff), and every batch request pauses until then.
+        Failed prompts are reported in their result instead of aborting the
+        batch.
+
+        Args:
+            prompts: User prompts
+            temperature: Sampling temperature
+            system_prompt: Optional system prompt
+            cache: Force (True) or bypass (False) the response cache
+            max_concurrency: Requests in flight (capped at ``openai_batch_max_concurrency``)
+            priority: Admission priority each request holds an "llm" slot at;
+                None for callers already admitted (HTTP routes). A shed request
+                is retried like a rate-limited one.
+
+        Yields:
+            (index, result) tuples in completion order
+        """
+        limit = min(
+            max_concurrency or settings.openai_batch_max_concurrency,
+            settings.openai_batch_max_concurrency,
+        )
+        semaphore = asyncio.Semaphore(limit)
+
+        async def run(index: int, prompt: str) -> Tuple[int, Dict[str, Any]]:
+            async with semaphore:
+                for attempt in range(settings.openai_batch_max_retries + 1):
+                    delay = self._rate_limited_until - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                    try:
+                        if priority is None:
+                            result = await self.generate_text(prompt, temperature, system_prompt, cache)
+                        else:
+                            async with admission.slot("llm", priority):
+                                result = await self.generate_text(prompt, temperature, system_prompt, cache)
+                    except Overloaded as e:
+                        result = {
+                            "success": False,
+                            "error": str(e),
+                            "rate_limited": True,
+                            "retry_after": e.retry_after,
+                        }
+                    if not result.get("rate_limited"):
+                        break
+
+                    backoff = result.get("retry_after")
+                    if backoff is None:
+                        backoff = settings.openai_batch_backoff_seconds * 2 ** attempt
+                    backoff *= 1 + random.random() * 0.1
+                    self._rate_limited_until = max(self._rate_limited_until, time.monotonic() + backoff)
+                return index, result
+
+        tasks = [asyncio.create_task(run(index, prompt)) for index, prompt in enumerate(prompts)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer went away: drop the prompts not yet sent
+            for task in tasks:
+                task.cancel()
 
     async def stream_text(
         self,
@@ -79,34 +310,173 @@ class OpenAIService:
 
         Yields:
             Text chunks as they are generated
+
+        Raises:
+            Exception: If the generation fails
         """
-        temperature = temperature or settings.openai_temperature
+        temperature = temperature if temperature is not None else settings.openai_temperature
 
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
 
+        async def request():
+            try:
+                stream = await self.client.chat.completions.create(
+                    model=settings.openai_model,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True,
+                )
+
+                async for chunk in stream:
+                    if chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
+
+            except Exception:
+                record_upstream_error("openai", "stream")
+                raise
+
+        # Identical concurrent streams share one upstream; late joiners replay
+        key = response_cache.make_key(settings.openai_model, messages, temperature)
+        shared = self.flights.stream(f"stream:{key}", request)
+        # Not made current: a generator must not change its consumer's context
+        span = tracer.span("openai.stream_text", **{"llm.model": settings.openai_model})
+        started = time.perf_counter()
+        chars = 0
         try:
-            stream = await self.client.chat.completions.create(
-                model=settings.openai_model,
-                messages=messages,
-                temperature=temperature,
-                stream=True,
-            )
+            async for text in shared:
+                if not chars:
+                    span.set_attribute("llm.ttft_ms", round((time.perf_counter() - started) * 1000, 1))
+                chars += len(text)
+                yield text
 
-            async for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            span.record_error(e)
+            raise Exception(f"OpenAI streaming error: {str(e)}")
+        finally:
+            span.set_attribute("llm.output_chars", chars)
+            span.end()
+            await shared.aclose()
+
+    async def stream_chat_events(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+    ):
+        """
+        Stream a multi-turn chat completion as typed events.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            temperature: Sampling temperature
+            system_prompt: Optional system prompt
+
+        Yields:
+            {"type": "delta", "content": text} for each text chunk, then
+            {"type": "usage", "usage": {...}} and
+            {"type": "done", "finish_reason": reason, "model": model}
+
+        Raises:
+            Exception: If the completion fails
+        """
+        temperature = temperature if temperature is not None else settings.openai_temperature
+
+        full_messages = []
+        if system_prompt:
+            full_messages.append({"role": "system", "content": system_prompt})
+        full_messages.extend(messages)
+
+        async def request():
+            try:
+                stream = await self.client.chat.completions.create(
+                    model=settings.openai_model,
+                    messages=full_messages,
+                    temperature=temperature,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+
+                finish_reason = None
+                async for chunk in stream:
+                    if chunk.choices:
+                        choice = chunk.choices[0]
+                        if choice.delta.content is not None:
+                            yield {"type": "delta", "content": choice.delta.content}
+                        if choice.finish_reason is not None:
+                            finish_reason = choice.finish_reason
+                    if chunk.usage is not None:
+                        record_token_usage("openai", chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+                        yield {"type": "usage", "usage": chunk.usage.model_dump()}
+
+            except Exception:
+                record_upstream_error("openai", "stream")
+                raise
+
+            yield {"type": "done", "finish_reason": finish_reason, "model": settings.openai_model}
+
+        # Identical concurrent streams share one upstream; late joiners replay
+        key = response_cache.make_key(settings.openai_model, full_messages, temperature)
+        shared = self.flights.stream(f"chat-stream:{key}", request)
+        # Not made current: a generator must not change its consumer's context
+        span = tracer.span("openai.stream_chat", **{"llm.model": settings.openai_model})
+        started = time.perf_counter()
+        first = True
+        try:
+            async for event in shared:
+                if event["type"] == "delta" and first:
+                    first = False
+                    span.set_attribute("llm.ttft_ms", round((time.perf_counter() - started) * 1000, 1))
+                elif event["type"] == "usage":
+                    span.set_attributes(**{
+                        "llm.prompt_tokens": event["usage"].get("prompt_tokens"),
+                        "llm.completion_tokens": event["usage"].get("completion_tokens"),
+                    })
+                yield event
 
         except Exception as e:
-            yield f"Error: {str(e)}"
+            span.record_error(e)
+            raise Exception(f"OpenAI streaming error: {str(e)}")
+        finally:
+            span.end()
+            await shared.aclose()
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        system_prompt: Optional[str] = None,
+    ):
+        """
+        Stream a multi-turn chat completion using OpenAI model.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            temperature: Sampling temperature
+            system_prompt: Optional system prompt
+
+        Yields:
+            Text chunks as they are generated
+
+        Raises:
+            Exception: If the completion fails
+        """
+        events = self.stream_chat_events(messages, temperature, system_prompt)
+        try:
+            async for event in events:
+                if event["type"] == "delta":
+                    yield event["content"]
+        finally:
+            await events.aclose()
 
     async def chat_completion(
         self,
         messages: List[Dict[str, str]],
         temperature: Optional[float] = None,
         system_prompt: Optional[str] = None,
+        cache: Optional[bool] = None,
     ) -> Dict[str, Any]:
         """
         Multi-turn chat completion using OpenAI model.
@@ -115,11 +485,12 @@ class OpenAIService:
             messages: List of message dictionaries with 'role' and 'content'
             temperature: Sampling temperature
             system_prompt: Optional system prompt
+            cache: Force (True) or bypass (False) the response cache
 
         Returns:
             Dict containing the response and metadata
         """
-        temperature = temperature or settings.openai_temperature
+        temperature = temperature if temperature is not None else settings.openai_temperature
 
         # Add system prompt if provided
         full_messages = []
@@ -127,41 +498,50 @@ class OpenAIService:
             full_messages.append({"role": "system", "content": system_prompt})
         full_messages.extend(messages)
 
+        return await self._complete(full_messages, temperature, cache)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts with the retrieval embedding model.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector of ``rag_embedding_dimensions`` floats per text, in order
+
+        Raises:
+            Exception: If the embedding request fails
+        """
         try:
-            response = await self.client.chat.completions.create(
-                model=settings.openai_model,
-                messages=full_messages,
-                temperature=temperature,
+            response = await self.client.embeddings.create(
+                model=settings.rag_embedding_model,
+                input=texts,
+                dimensions=settings.rag_embedding_dimensions,
             )
-
-            return {
-                "success": True,
-                "content": response.choices[0].message.content,
-                "model": settings.openai_model,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens,
-                },
-                "finish_reason": response.choices[0].finish_reason,
-            }
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
 
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "model": settings.openai_model,
-            }
+            record_upstream_error("openai", "embed")
+            raise Exception(f"OpenAI embedding error: {str(e)}")
 
-async def transcribe_audio(
+    async def transcribe_audio(
         self,
-        audio_file: tuple
+        audio_file: tuple,
+        partial: bool = False
     ) -> str:
         """
         Transcribe audio using OpenAI Whisper.
 
+        The upload goes through the async client by default. When the
+        ``thread`` backend is configured, the sync client runs on a bounded
+        thread pool instead. Either way the event loop is never blocked and
+        at most ``openai_transcription_max_concurrency`` uploads are in flight.
+        Partial transcripts have their own limit, ``voice_partial_max_concurrency``.
+
         Args:
             audio_file: Tuple of (filename, audio_data, content_type)
+            partial: Whether this transcribes part of an utterance still being streamed
 
         Returns:
             Transcribed text
@@ -169,24 +549,36 @@ async def transcribe_audio(
         Raises:
             Exception: If transcription fails
         """
-        try:
-            filename, audio_data, content_type = audio_file
-            
-            # Create a file-like object
-            import io
-            audio_buffer = io.BytesIO(audio_data)
-            audio_buffer.name = filename
-
-            # Use sync client for file upload
-            response = self.sync_client.audio.transcriptions.create(
-                model="whisper-1",
-                file=(filename, audio_data, content_type)
-            )
-            
-            return response.text
-
-        except Exception as e:
-            raise Exception(f"Whisper transcription error: {str(e)}")
+        filename, audio_data, content_type = audio_file
+        with tracer.span(
+            "openai.transcribe_audio",
+            **{"llm.model": settings.openai_transcription_model, "audio.bytes": len(audio_data),
+               "transcription.partial": partial},
+        ) as span:
+            semaphore = self._partial_transcription_semaphore if partial else self._transcription_semaphore
+            try:
+                async with semaphore:
+                    if self._transcription_executor is not None:
+                        loop = asyncio.get_running_loop()
+                        response = await loop.run_in_executor(
+                            self._transcription_executor,
+                            lambda: self.sync_client.audio.transcriptions.create(
+                                model=settings.openai_transcription_model,
+                                file=(filename, audio_data, content_type),
+                            ),
+                        )
+                    else:
+                        response = await self.client.audio.transcriptions.create(
+                            model=settings.openai_transcription_model,
+                            file=(filename, audio_data, content_type),
+                        )
+
+                span.set_attribute("transcript.chars", len(response.text))
+                return response.text
+
+            except Exception as e:
+                record_upstream_error("openai", "transcribe")
+                raise Exception(f"Whisper transcription error: {str(e)}")
 
 
 # Singleton instance
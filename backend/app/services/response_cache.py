@@ -0,0 +1,153 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+
+
+class CacheBackend:
+    """
+    Storage interface for cached responses.
+
+    Subclass this to keep entries in a shared store (Redis, memcached, ...)
+    and install it with ``response_cache.set_backend``.
+    """
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for ``key``, or None if missing or expired."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        """Drop every entry."""
+        raise NotImplementedError
+
+
+class InMemoryLRUCache(CacheBackend):
+    """In-process LRU cache bounded by entry count and total payload bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        # key -> (expires_at, size, value); most recently used last
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.current_bytes += size
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+
+class ResponseCache:
+    """Cache of LLM responses keyed on a normalized hash of the request."""
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or InMemoryLRUCache(
+            max_entries=settings.response_cache_max_entries,
+            max_bytes=settings.response_cache_max_bytes,
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def set_backend(self, backend: CacheBackend) -> None:
+        """Swap the storage backend, e.g. for a store shared between workers."""
+        self.backend = backend
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+    ) -> str:
+        """
+        Build a cache key for a chat request.
+
+        The system prompt is part of ``messages``. Roles and contents are
+        whitespace-normalized so cosmetic differences still hit.
+        """
+        normalized = {
+            "model": model,
+            "temperature": round(float(temperature), 4),
+            "messages": [
+                [m.get("role", ""), " ".join(str(m.get("content", "")).split())]
+                for m in messages
+            ],
+        }
+        payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def should_cache(temperature: float, cache: Optional[bool]) -> bool:
+        """
+        Decide whether a request goes through the cache.
+
+        An explicit per-request ``cache`` flag wins; otherwise deterministic
+        (temperature 0) requests are cached.
+        """
+        if not settings.response_cache_enabled:
+            return False
+        if cache is not None:
+            return cache
+        return temperature == 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        await self.backend.set(key, value, settings.response_cache_ttl_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and, for the in-memory backend, its size."""
+        lookups = self.hits + self.misses
+        stats = {
+            "enabled": settings.response_cache_enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+        if isinstance(self.backend, InMemoryLRUCache):
+            stats["entries"] = len(self.backend)
+            stats["bytes"] = self.backend.current_bytes
+        return stats
+
+
+# Singleton instance
+response_cache = ResponseCache()
@@ -0,0 +1,500 @@
+import asyncio
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+
+try:
+    import numpy as np
+except ImportError:  # embedding search is optional
+    np = None
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its "
+    "my of on or should that the their them there these this to was what when which "
+    "who why will with you your".split()
+)
+
+CONTEXT_PROMPT = """Answer using the sources below when they are relevant, and cite them as [1], [2], ...
+If the sources do not cover the question, say so before answering from general knowledge."""
+
+# Rank offset of reciprocal rank fusion between BM25 and embedding results
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase ``text`` and split it into index terms, dropping stopwords."""
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+def chunk_text(text: str, chunk_chars: int, overlap_chars: int) -> List[str]:
+    """
+    Split text into overlapping chunks on word boundaries.
+
+    Args:
+        text: Document text
+        chunk_chars: Target size of a chunk in characters
+        overlap_chars: Characters of the previous chunk repeated at the start of the next
+
+    Returns:
+        Chunks in document order
+    """
+    words = text.split()
+    chunks: List[str] = []
+    start = 0
+    while start < len(words):
+        end = start
+        size = 0
+        while end < len(words) and (size == 0 or size + len(words[end]) + 1 <= chunk_chars):
+            size += len(words[end]) + 1
+            end += 1
+        chunks.append(" ".join(words[start:end]))
+        if end == len(words):
+            break
+
+        # Step back over roughly overlap_chars of words, always moving forward
+        overlap = 0
+        next_start = end
+        while next_start > start + 1 and overlap + len(words[next_start - 1]) + 1 <= overlap_chars:
+            next_start -= 1
+            overlap += len(words[next_start]) + 1
+        start = next_start
+    return chunks
+
+
+def fit_context(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep the best hits whose text fits in ``rag_context_max_chars`` (at least one)."""
+    kept = []
+    used = 0
+    for hit in hits:
+        if kept and used + len(hit["text"]) > settings.rag_context_max_chars:
+            break
+        kept.append(hit)
+        used += len(hit["text"])
+    return kept
+
+
+def with_context(system_prompt: Optional[str], hits: List[Dict[str, Any]]) -> Optional[str]:
+    """Append retrieved chunks to a system prompt as numbered sources."""
+    if not hits:
+        return system_prompt
+    sources = "\n\n".join(
+        f"[{number}] {hit['title'] or hit['url']} ({hit['url']})\n{hit['text']}"
+        for number, hit in enumerate(hits, start=1)
+    )
+    note = f"{CONTEXT_PROMPT}\n\n{sources}"
+    return f"{system_prompt}\n\n{note}" if system_prompt else note
+
+
+class IndexStore:
+    """
+    SQLite store of indexed documents and their chunks.
+
+    Methods are blocking; RetrievalIndex calls them on a worker thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rag_documents ("
+                "url TEXT PRIMARY KEY, "
+                "title TEXT NOT NULL, "
+                "content_hash TEXT NOT NULL, "
+                "indexed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rag_chunks ("
+                "id INTEGER PRIMARY KEY, "
+                "url TEXT NOT NULL, "
+                "position INTEGER NOT NULL, "
+                "text TEXT NOT NULL, "
+                "embedding_row INTEGER)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS rag_chunks_url ON rag_chunks (url)")
+            self._conn.commit()
+        return self._conn
+
+    def load(self) -> Tuple[Dict[str, Tuple[str, str]], List[Tuple[int, str, str, Optional[int]]]]:
+        """Return {url: (title, content_hash)} and every chunk as (id, url, text, embedding_row)."""
+        with self._lock:
+            conn = self._connect()
+            documents = conn.execute("SELECT url, title, content_hash FROM rag_documents").fetchall()
+            chunks = conn.execute(
+                "SELECT id, url, text, embedding_row FROM rag_chunks ORDER BY id"
+            ).fetchall()
+        return {url: (title, content_hash) for url, title, content_hash in documents}, chunks
+
+    def replace(
+        self,
+        url: str,
+        title: str,
+        content_hash: str,
+        chunks: List[str],
+        rows: Optional[List[int]],
+    ) -> List[int]:
+        """Replace a document's chunks, returning the new chunk IDs in order."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM rag_chunks WHERE url = ?", (url,))
+            conn.execute(
+                "INSERT OR REPLACE INTO rag_documents VALUES (?, ?, ?, ?)",
+                (url, title, content_hash, time.time()),
+            )
+            ids = []
+            for position, text in enumerate(chunks):
+                row = rows[position] if rows else None
+                cursor = conn.execute(
+                    "INSERT INTO rag_chunks (url, position, text, embedding_row) VALUES (?, ?, ?, ?)",
+                    (url, position, text, row),
+                )
+                ids.append(cursor.lastrowid)
+            conn.commit()
+        return ids
+
+    def delete(self, url: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM rag_chunks WHERE url = ?", (url,))
+            conn.execute("DELETE FROM rag_documents WHERE url = ?", (url,))
+            conn.commit()
+
+
+class EmbeddingMatrix:
+    """
+    Append-only float32 matrix of unit-length embeddings in a flat file.
+
+    Rows are appended with plain file writes and searched through a
+    read-only memory map, so the matrix does not have to fit in the heap
+    and is paged in by the OS as searches touch it. Rows of replaced
+    chunks are left in place and simply no longer referenced.
+    """
+
+    def __init__(self, path: str, dimensions: int):
+        self.path = path
+        self.dimensions = dimensions
+        self._view = None
+        self._lock = threading.Lock()
+
+    @property
+    def rows(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // (self.dimensions * 4)
+
+    def append(self, vectors: "np.ndarray") -> List[int]:
+        """Normalize and append vectors, returning their row numbers."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            start = self.rows
+            with open(self.path, "ab") as f:
+                f.write(vectors.tobytes())
+            self._view = None
+        return list(range(start, start + len(vectors)))
+
+    def view(self) -> Optional["np.ndarray"]:
+        """Memory-mapped (rows, dimensions) view, reopened after appends."""
+        with self._lock:
+            rows = self.rows
+            if rows == 0:
+                return None
+            if self._view is None or self._view.shape[0] != rows:
+                self._view = np.memmap(
+                    self.path, dtype=np.float32, mode="r", shape=(rows, self.dimensions)
+                )
+            return self._view
+
+
+class RetrievalIndex:
+    """
+    Local retrieval over scraped pages.
+
+    Documents are split into overlapping chunks and kept in SQLite. An
+    in-memory BM25 inverted index over the chunks is built on first use and
+    updated incrementally as documents are added, replaced or removed.
+    With ``rag_embeddings_enabled`` (and NumPy installed) chunks are also
+    embedded, and search fuses BM25 and cosine similarity rankings.
+    """
+
+    def __init__(self, path: str):
+        self.store = IndexStore(path)
+        self.embeddings: Optional[EmbeddingMatrix] = None
+        if settings.rag_embeddings_enabled:
+            if np is None:
+                print("RAG embeddings disabled: numpy is not installed")
+            else:
+                self.embeddings = EmbeddingMatrix(
+                    settings.rag_embeddings_path, settings.rag_embedding_dimensions
+                )
+
+        # term -> {chunk_id: term frequency}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # chunk_id -> (url, text, token count, embedding row)
+        self._chunks: Dict[int, Tuple[str, str, int, Optional[int]]] = {}
+        # url -> (title, content_hash, chunk_ids)
+        self._documents: Dict[str, Tuple[str, str, List[int]]] = {}
+        self._total_tokens = 0
+        self._loaded = False
+        self._write_lock = asyncio.Lock()
+        self.searches = 0
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        async with self._write_lock:
+            if self._loaded:
+                return
+            # Tokenizing every chunk takes a while on a big index; nothing
+            # reads the index before it is loaded, so it is built off the loop
+            await asyncio.to_thread(self._load)
+            self._loaded = True
+
+    def _load(self) -> None:
+        documents, chunks = self.store.load()
+        by_url: Dict[str, List[int]] = {}
+        for chunk_id, url, text, row in chunks:
+            self._add_chunk(chunk_id, url, text, row)
+            by_url.setdefault(url, []).append(chunk_id)
+        for url, (title, content_hash) in documents.items():
+            self._documents[url] = (title, content_hash, by_url.get(url, []))
+
+    def _add_chunk(self, chunk_id: int, url: str, text: str, row: Optional[int]) -> None:
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+        self._chunks[chunk_id] = (url, text, length, row)
+        self._total_tokens += length
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[chunk_id] = count
+
+    def _remove_chunks(self, chunk_ids: List[int]) -> None:
+        for chunk_id in chunk_ids:
+            _, text, length, _ = self._chunks.pop(chunk_id)
+            self._total_tokens -= length
+            for term in set(tokenize(text)):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self._postings[term]
+
+    async def add_document(self, url: str, text: str, title: str = "") -> Dict[str, Any]:
+        """
+        Index a document, replacing any earlier version of the same URL.
+
+        A document whose content has not changed since it was last indexed
+        is left as is.
+
+        Args:
+            url: Document URL, used as its identity
+            text: Document text (usually markdown)
+            title: Document title
+
+        Returns:
+            Dict with the URL, its chunk count and whether it was (re)indexed
+        """
+        await self._ensure_loaded()
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+        existing = self._documents.get(url)
+        if existing is not None and existing[1] == content_hash:
+            return {"url": url, "chunks": len(existing[2]), "indexed": False}
+
+        chunks = chunk_text(text, settings.rag_chunk_chars, settings.rag_chunk_overlap_chars)
+        # Embed before taking the lock so other writers do not wait on the network
+        vectors = await self._embed_chunks(chunks) if chunks else None
+
+        async with self._write_lock:
+            existing = self._documents.get(url)
+            if existing is not None and existing[1] == content_hash:
+                # Indexed by a concurrent writer meanwhile
+                return {"url": url, "chunks": len(existing[2]), "indexed": False}
+
+            rows = await asyncio.to_thread(self.embeddings.append, vectors) if vectors is not None else None
+            ids = await asyncio.to_thread(self.store.replace, url, title, content_hash, chunks, rows)
+
+            if existing is not None:
+                self._remove_chunks(existing[2])
+            for position, (chunk_id, chunk) in enumerate(zip(ids, chunks)):
+                self._add_chunk(chunk_id, url, chunk, rows[position] if rows else None)
+            self._documents[url] = (title, content_hash, ids)
+
+        return {"url": url, "chunks": len(ids), "indexed": True}
+
+    async def add_pages(self, pages: List[Dict[str, Any]]) -> int:
+        """
+        Index Firecrawl scrape or crawl pages that have markdown content.
+
+        Returns:
+            Number of pages indexed
+        """
+        indexed = 0
+        for page in pages:
+            text = page.get("markdown") or page.get("content")
+            metadata = page.get("metadata") or {}
+            url = page.get("url") or metadata.get("sourceURL") or metadata.get("url")
+            if not text or not url:
+                continue
+            title = page.get("title") or metadata.get("title", "")
+            result = await self.add_document(url, text, title)
+            indexed += result["indexed"]
+        return indexed
+
+    async def remove_document(self, url: str) -> bool:
+        """Remove a document from the index; returns whether it was indexed."""
+        await self._ensure_loaded()
+        async with self._write_lock:
+            existing = self._documents.pop(url, None)
+            if existing is None:
+                return False
+            await asyncio.to_thread(self.store.delete, url)
+            self._remove_chunks(existing[2])
+        return True
+
+    async def _embed_chunks(self, chunks: List[str]) -> Optional["np.ndarray"]:
+        if self.embeddings is None:
+            return None
+        from app.services.openai_service import openai_service
+
+        return np.array(await openai_service.embed(chunks))
+
+    def _bm25(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        terms = set(tokenize(query))
+        count = len(self._chunks)
+        if not terms or count == 0:
+            return []
+
+        k1 = settings.rag_bm25_k1
+        b = settings.rag_bm25_b
+        average_length = self._total_tokens / count or 1.0
+        scores: Dict[int, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                length = self._chunks[chunk_id][2]
+                norm = frequency + k1 * (1 - b + b * length / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (k1 + 1) / norm
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+    async def _vector(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        if self.embeddings is None:
+            return []
+        matrix = self.embeddings.view()
+        if matrix is None:
+            return []
+        from app.services.openai_service import openai_service
+
+        (vector,) = await openai_service.embed([query])
+        query_vector = np.asarray(vector, dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        # Snapshot the rows here; writers may change the index while the thread scores
+        rows = [(cid, chunk[3]) for cid, chunk in list(self._chunks.items()) if chunk[3] is not None]
+        # The product reads the whole mapped file, so it runs off the event loop
+        return await asyncio.to_thread(self._score_rows, matrix, query_vector, rows, limit)
+
+    @staticmethod
+    def _score_rows(
+        matrix: "np.ndarray",
+        query_vector: "np.ndarray",
+        rows: List[Tuple[int, int]],
+        limit: int,
+    ) -> List[Tuple[int, float]]:
+        live = [(cid, row) for cid, row in rows if row < len(matrix)]
+        if not live:
+            return []
+        chunk_ids = np.fromiter((cid for cid, _ in live), dtype=np.int64, count=len(live))
+        positions = np.fromiter((row for _, row in live), dtype=np.int64, count=len(live))
+        # One pass over the mapped matrix, then pick the live rows
+        similarities = (matrix @ query_vector)[positions]
+
+        top = min(limit, len(similarities))
+        best = np.argpartition(-similarities, top - 1)[:top]
+        best = best[np.argsort(-similarities[best])]
+        return [(int(chunk_ids[i]), float(similarities[i])) for i in best]
+
+    async def search(self, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Find the chunks most relevant to a query.
+
+        Args:
+            query: Search text
+            k: Number of chunks to return (defaults to ``rag_top_k``)
+
+        Returns:
+            Chunks as dicts with url, title, text and score, best first
+        """
+        await self._ensure_loaded()
+        k = k or settings.rag_top_k
+        self.searches += 1
+
+        try:
+            vector_ranked = await self._vector(query, k * 4)
+        except Exception as e:
+            print(f"Embedding search failed, using BM25 only: {str(e)}")
+            vector_ranked = []
+        bm25_ranked = self._bm25(query, k * 4)
+
+        if vector_ranked:
+            # Reciprocal rank fusion: robust to the two scores' different scales
+            fused: Dict[int, float] = {}
+            for ranked in (bm25_ranked, vector_ranked):
+                for rank, (chunk_id, _) in enumerate(ranked):
+                    fused[chunk_id] = fused.get(chunk_id, 0.0) + 1 / (RRF_K + rank + 1)
+            ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+        else:
+            ranked = bm25_ranked
+
+        hits = []
+        for chunk_id, score in ranked[:k]:
+            chunk = self._chunks.get(chunk_id)
+            if chunk is None:
+                continue
+            url, text, _, _ = chunk
+            hits.append({
+                "url": url,
+                "title": self._documents.get(url, ("",))[0],
+                "text": text,
+                "score": score,
+            })
+        return hits
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self._loaded,
+            "documents": len(self._documents),
+            "chunks": len(self._chunks),
+            "terms": len(self._postings),
+            "embeddings": self.embeddings is not None,
+            "embedding_rows": self.embeddings.rows if self.embeddings is not None else 0,
+            "searches": self.searches,
+        }
+
+
+# Singleton instance
+retrieval_index = RetrievalIndex(settings.rag_index_path)
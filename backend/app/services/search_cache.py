@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import json
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.config import settings
+
+# Hits on entries up to this uncompressed size are decompressed on the event
+# loop; larger ones on a worker thread
+INLINE_DECODE_BYTES = 64 * 1024
+
+
+def _decode(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob))
+
+
+def _encode(value: Dict[str, Any]) -> Tuple[int, bytes]:
+    raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return len(raw), zlib.compress(raw, settings.search_cache_compression_level)
+
+
+class SearchCache:
+    """
+    Compressed in-memory cache of web search results.
+
+    Entries are zlib-compressed JSON, bounded by their compressed size and
+    evicted least recently used first. Compression, and decompression of
+    large entries, run on a worker thread. Each result format has its own TTL;
+    past it an entry is stale but still served for
+    ``search_cache_stale_seconds`` while the caller refreshes it.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.raw_bytes = 0
+        # key -> (stored_at, uncompressed size, compressed payload); most recently used last
+        self._entries: "OrderedDict[str, Tuple[float, int, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, limit: int, format: str) -> str:
+        """Build a cache key from the case- and whitespace-normalized query."""
+        normalized = " ".join(query.lower().split())
+        payload = json.dumps([normalized, limit, format], separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def ttl(format: str) -> float:
+        """Freshness lifetime of results in ``format``."""
+        return settings.search_cache_ttl_seconds.get(format, settings.search_cache_default_ttl_seconds)
+
+    async def get(self, key: str, format: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        Look up cached results.
+
+        Returns:
+            (results, fresh) or None if missing or too old to serve
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, raw_size, blob = entry
+        age = time.time() - stored_at
+        ttl = self.ttl(format)
+        if age > ttl + settings.search_cache_stale_seconds:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        fresh = age <= ttl
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        if raw_size <= INLINE_DECODE_BYTES:
+            return _decode(blob), fresh
+        return await asyncio.to_thread(_decode, blob), fresh
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Compress and store results, evicting old entries to stay in budget."""
+        # Only misses store, after an upstream call; the thread hop is negligible there
+        raw_size, blob = await asyncio.to_thread(_encode, value)
+        if len(blob) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.time(), raw_size, blob)
+        self.current_bytes += len(blob)
+        self.raw_bytes += raw_size
+        while self.current_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        _, raw_size, blob = self._entries.pop(key)
+        self.current_bytes -= len(blob)
+        self.raw_bytes -= raw_size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "enabled": settings.search_cache_enabled,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "uncompressed_bytes": self.raw_bytes,
+        }
+
+
+# Singleton instance
+search_cache = SearchCache(max_bytes=settings.search_cache_max_bytes)
@@ -0,0 +1,333 @@
+import hashlib
+import math
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set
+from app.config import settings
+from app.services.retrieval_index import tokenize
+
+try:
+    import numpy as np
+except ImportError:  # the semantic cache is skipped without numpy
+    np = None
+
+# Words that flip a question's meaning ("fever" vs "no fever"); prompts only
+# match when they contain the same ones
+NEGATIONS = frozenset({"no", "not", "never", "without", "nor", "none", "cannot", "dont", "didnt", "isnt"})
+
+# Numbers, ages, gestation, doses and other measures; "3 months old" must
+# never match "3 years old", nor "34 weeks pregnant" match "14 weeks"
+QUANTITY_PATTERN = re.compile(r"\d+(?:[.,]\d+)?|[a-z]+")
+NUMBER_WORDS = frozenset({
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen",
+    "nineteen", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety",
+    "hundred", "thousand", "half", "quarter", "once", "twice", "first", "second", "third",
+    "newborn", "infant", "toddler", "teen", "teenager", "adult", "elderly",
+})
+MEASURES = frozenset({
+    "second", "minute", "hour", "day", "week", "month", "year", "old", "age", "aged",
+    "pregnant", "pregnancy", "gestation", "gestational", "trimester", "postpartum",
+    "mg", "mcg", "ug", "g", "kg", "lb", "oz", "ml", "l", "cc", "iu", "unit", "dose", "tablet", "pill",
+    "mmol", "mmhg", "bpm", "c", "f", "degree", "celsius", "fahrenheit", "cm", "mm", "m", "inch", "ft",
+    "percent", "time", "daily", "hourly", "weekly",
+})
+
+
+def quantity_terms(prompt: str) -> List[str]:
+    """Numbers and measure words of a prompt, in order, with plurals folded."""
+    terms = []
+    for term in QUANTITY_PATTERN.findall(prompt.lower()):
+        if term[0].isdigit():
+            terms.append(term.replace(",", "."))
+            continue
+        singular = term[:-1] if len(term) > 2 and term.endswith("s") else term
+        if term in NUMBER_WORDS or term in MEASURES or singular in MEASURES:
+            terms.append(singular if singular in MEASURES else term)
+    return terms
+
+
+class Embedder:
+    """
+    Turns prompts into vectors for the semantic cache.
+
+    Register implementations with ``register_embedder`` and select one with
+    ``SEMANTIC_CACHE_EMBEDDER``.
+    """
+
+    dimensions: int
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Return one vector of ``dimensions`` floats per text."""
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """
+    Local bag-of-words embedder using feature hashing.
+
+    Words (with plural endings folded) and their character trigrams are
+    hashed into a fixed number of signed buckets with sublinear term
+    frequency, so word order, stopwords and inflections barely matter. Needs no model or network, which makes it
+    suitable for offline runs.
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    @staticmethod
+    def _singular(word: str) -> str:
+        if len(word) > 4 and word.endswith("ies"):
+            return word[:-3] + "y"
+        if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            return word[:-1]
+        return word
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        features: Counter = Counter()
+        for word in tokenize(text):
+            word = self._singular(word)
+            features[word] += 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                features[padded[i:i + 3]] += 0.25
+        for feature, weight in features.items():
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            scaled = 1.0 + math.log(weight) if weight >= 1 else weight
+            vector[digest % self.dimensions] += sign * scaled
+        return vector
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+
+class OpenAIEmbedder(Embedder):
+    """Embedder using the OpenAI retrieval embedding model."""
+
+    def __init__(self):
+        self.dimensions = settings.rag_embedding_dimensions
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        from app.services.openai_service import openai_service
+        return await openai_service.embed(texts)
+
+
+EMBEDDERS: Dict[str, Callable[[], Embedder]] = {
+    "hashing": lambda: HashingEmbedder(settings.semantic_cache_dimensions),
+    "openai": OpenAIEmbedder,
+}
+
+
+def register_embedder(name: str, factory: Callable[[], Embedder]) -> None:
+    """Make an embedder available under ``name`` for SEMANTIC_CACHE_EMBEDDER."""
+    EMBEDDERS[name] = factory
+
+
+class SemanticCache:
+    """
+    Cache of single-prompt LLM responses matched by meaning.
+
+    Prompt embeddings live in a preallocated matrix of
+    ``semantic_cache_max_entries`` unit vectors. A lookup returns the
+    closest entry with the same model, temperature, system prompt,
+    negations and quantities if its cosine similarity reaches
+    ``semantic_cache_threshold``.
+    Small caches are scanned in full with one matrix-vector product. Above
+    ``semantic_cache_ann_min_entries`` entries, random-hyperplane LSH
+    tables pick the candidates to score. When full, the least recently
+    used entry is replaced.
+    """
+
+    def __init__(self, embedder: Optional[Embedder] = None):
+        self.embedder = embedder
+        self.max_entries = settings.semantic_cache_max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.lookup_ms = 0.0
+        self.embed_ms = 0.0
+        self._reset()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.semantic_cache_enabled and np is not None
+
+    def set_embedder(self, embedder: Embedder) -> None:
+        """Swap the embedder; cached entries are dropped since their vectors no longer compare."""
+        self.embedder = embedder
+        self._reset()
+
+    def _get_embedder(self) -> Embedder:
+        if self.embedder is None:
+            self.embedder = EMBEDDERS[settings.semantic_cache_embedder]()
+        return self.embedder
+
+    def _reset(self) -> None:
+        self._matrix = None
+        self._values: List[Optional[Dict[str, Any]]] = [None] * self.max_entries
+        self._size = 0
+        self._slot_codes = None
+        self._buckets: List[Dict[int, Set[int]]] = []
+        if np is not None:
+            self._contexts = np.zeros(self.max_entries, dtype=np.int64)
+            self._expires = np.zeros(self.max_entries, dtype=np.float64)
+            self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+            self._latency_ms = np.zeros(self.max_entries, dtype=np.float64)
+
+    def _allocate(self, dimensions: int) -> None:
+        self._matrix = np.zeros((self.max_entries, dimensions), dtype=np.float32)
+        tables = settings.semantic_cache_lsh_tables
+        bits = settings.semantic_cache_lsh_bits
+        self._planes = np.random.default_rng(0).standard_normal((tables * bits, dimensions)).astype(np.float32)
+        self._bit_weights = 1 << np.arange(bits, dtype=np.int64)
+        self._slot_codes = np.zeros((self.max_entries, tables), dtype=np.int64)
+        self._buckets = [{} for _ in range(tables)]
+
+    def _codes(self, vector: "np.ndarray") -> "np.ndarray":
+        signs = (self._planes @ vector > 0).reshape(settings.semantic_cache_lsh_tables, -1)
+        return signs.astype(np.int64) @ self._bit_weights
+
+    @staticmethod
+    def context_key(model: str, temperature: float, system_prompt: Optional[str], prompt: str) -> int:
+        """
+        Hash of everything besides the prompt's meaning that must match exactly.
+
+        Besides the model, temperature and system prompt, this covers the
+        prompt's negations and its numbers and measures (ages, gestational
+        weeks, doses), which embeddings barely tell apart.
+        """
+        negations = sorted(NEGATIONS.intersection(tokenize(prompt.replace("'", ""))))
+        payload = "\x1f".join([
+            model,
+            str(round(float(temperature), 4)),
+            " ".join((system_prompt or "").split()),
+            " ".join(negations),
+            " ".join(quantity_terms(prompt)),
+        ])
+        return int.from_bytes(hashlib.sha256(payload.encode("utf-8")).digest()[:8], "big", signed=True)
+
+    async def embed(self, prompt: str) -> "np.ndarray":
+        """Unit-length embedding of a prompt."""
+        started = time.perf_counter()
+        (vector,) = await self._get_embedder().embed([prompt])
+        self.embed_ms += (time.perf_counter() - started) * 1000
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def lookup(self, vector: "np.ndarray", context: int) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached response for a prompt embedding.
+
+        Args:
+            vector: Prompt embedding from ``embed``
+            context: ``context_key`` of the request
+
+        Returns:
+            The cached response with its "similarity", or None on a miss
+        """
+        started = time.perf_counter()
+        slot, similarity = self._nearest(vector, context)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.lookup_ms += elapsed_ms
+
+        if slot is None or similarity < settings.semantic_cache_threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._last_used[slot] = time.monotonic()
+        self.saved_ms += max(0.0, float(self._latency_ms[slot]) - elapsed_ms)
+        return {**self._values[slot], "similarity": similarity}
+
+    def _nearest(self, vector: "np.ndarray", context: int):
+        if self._matrix is None or self._size == 0 or len(vector) != self._matrix.shape[1]:
+            return None, 0.0
+
+        if self._size >= settings.semantic_cache_ann_min_entries:
+            candidates: Set[int] = set()
+            for table, code in zip(self._buckets, self._codes(vector)):
+                candidates.update(table.get(int(code), ()))
+            if not candidates:
+                return None, 0.0
+            slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        else:
+            slots = np.arange(self._size)
+
+        live = (self._contexts[slots] == context) & (self._expires[slots] > time.monotonic())
+        slots = slots[live]
+        if len(slots) == 0:
+            return None, 0.0
+
+        similarities = self._matrix[slots] @ vector
+        best = int(np.argmax(similarities))
+        return int(slots[best]), float(similarities[best])
+
+    def store(self, vector: "np.ndarray", context: int, value: Dict[str, Any], latency_ms: float) -> None:
+        """
+        Cache a response under a prompt embedding.
+
+        Args:
+            vector: Prompt embedding from ``embed``
+            context: ``context_key`` of the request
+            value: Successful response to serve for similar prompts
+            latency_ms: How long the upstream call took, credited on each hit
+        """
+        if self._matrix is None:
+            self._allocate(len(vector))
+        elif len(vector) != self._matrix.shape[1]:
+            return
+
+        now = time.monotonic()
+        if self._size < self.max_entries:
+            slot = self._size
+            self._size += 1
+        else:
+            # Reuse an expired slot, else the least recently used one
+            expired = np.flatnonzero(self._expires <= now)
+            slot = int(expired[0]) if len(expired) else int(np.argmin(self._last_used))
+            for table, code in zip(self._buckets, self._slot_codes[slot]):
+                bucket = table.get(int(code))
+                if bucket is not None:
+                    bucket.discard(slot)
+                    if not bucket:
+                        del table[int(code)]
+
+        self._matrix[slot] = vector
+        self._values[slot] = value
+        self._contexts[slot] = context
+        self._expires[slot] = now + settings.semantic_cache_ttl_seconds
+        self._last_used[slot] = now
+        self._latency_ms[slot] = latency_ms
+
+        codes = self._codes(vector)
+        self._slot_codes[slot] = codes
+        for table, code in zip(self._buckets, codes):
+            table.setdefault(int(code), set()).add(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "embedder": settings.semantic_cache_embedder,
+            "threshold": settings.semantic_cache_threshold,
+            "entries": self._size,
+            "approximate": self._size >= settings.semantic_cache_ann_min_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            # Upstream time avoided by hits, less the embedding time every lookup costs
+            "latency_saved_ms": round(self.saved_ms - self.embed_ms, 1),
+            "avg_embed_ms": round(self.embed_ms / lookups, 3) if lookups else 0.0,
+            "avg_lookup_ms": round(self.lookup_ms / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+semantic_cache = SemanticCache()
+
+if settings.semantic_cache_enabled and np is None:
+    print("Semantic cache disabled: SEMANTIC_CACHE_ENABLED is set but numpy is not installed")
@@ -0,0 +1,396 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.config import settings
+
+# Per-message overhead of the chat format (role, separators) in tokens
+MESSAGE_TOKEN_OVERHEAD = 4
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and a health assistant.
+Merge the previous summary and the new messages into one concise summary written in the third person.
+Keep every fact the assistant may need later: symptoms, their timing and severity, medications,
+allergies, conditions, advice already given and open questions. Drop greetings and small talk.
+Reply with the summary only."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of ``text`` from its length."""
+    return int(len(text) / settings.session_chars_per_token) + 1
+
+
+def window_messages(messages: List[Dict[str, str]], max_tokens: int) -> List[Dict[str, str]]:
+    """
+    Return the most recent messages that fit in a token budget.
+
+    The newest message is always kept, even if it alone exceeds the budget.
+
+    Args:
+        messages: Conversation history, oldest first
+        max_tokens: Token budget for the returned messages
+
+    Returns:
+        The longest suffix of ``messages`` within ``max_tokens``
+    """
+    used = 0
+    start = len(messages)
+    while start > 0:
+        cost = estimate_tokens(messages[start - 1]["content"]) + MESSAGE_TOKEN_OVERHEAD
+        if used + cost > max_tokens and start < len(messages):
+            break
+        used += cost
+        start -= 1
+    return messages[start:]
+
+
+def with_summary(system_prompt: Optional[str], summary: Optional[str]) -> Optional[str]:
+    """Append a conversation summary to a system prompt."""
+    if not summary:
+        return system_prompt
+    note = f"Summary of the earlier conversation:\n{summary}"
+    return f"{system_prompt}\n\n{note}" if system_prompt else note
+
+
+def count_tokens(messages: Sequence[Dict[str, str]]) -> int:
+    """Approximate the prompt tokens of a list of messages."""
+    return sum(estimate_tokens(m["content"]) + MESSAGE_TOKEN_OVERHEAD for m in messages)
+
+
+class SessionBackend:
+    """
+    Durable storage for conversation histories.
+
+    Subclass this to keep sessions in a shared store and install it with
+    ``session_store.set_backend``. Messages are only ever appended, so
+    backends can store each message as its own row.
+    """
+
+    async def load(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        """Return the stored history, or None if the conversation is unknown."""
+        raise NotImplementedError
+
+    async def append(self, conversation_id: str, start: int, messages: List[Dict[str, str]]) -> None:
+        """Store ``messages`` at positions ``start``, ``start + 1``, ..."""
+        raise NotImplementedError
+
+    async def delete(self, conversation_id: str) -> None:
+        """Forget a conversation."""
+        raise NotImplementedError
+
+    async def load_summary(self, conversation_id: str) -> Optional[Tuple[str, int]]:
+        """Return the running summary and how many messages it covers, if any."""
+        return None
+
+    async def save_summary(self, conversation_id: str, summary: str, covered: int) -> None:
+        """Store the running summary of the first ``covered`` messages."""
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Session backend keeping one row per message in a SQLite database."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_messages ("
+                "conversation_id TEXT NOT NULL, "
+                "seq INTEGER NOT NULL, "
+                "role TEXT NOT NULL, "
+                "content TEXT NOT NULL, "
+                "PRIMARY KEY (conversation_id, seq))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_summaries ("
+                "conversation_id TEXT PRIMARY KEY, "
+                "summary TEXT NOT NULL, "
+                "covered INTEGER NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _load(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT role, content FROM session_messages "
+                "WHERE conversation_id = ? ORDER BY seq",
+                (conversation_id,),
+            ).fetchall()
+        if not rows:
+            return None
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def _append(self, conversation_id: str, start: int, messages: List[Dict[str, str]]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_messages VALUES (?, ?, ?, ?)",
+                [
+                    (conversation_id, start + i, m["role"], m["content"])
+                    for i, m in enumerate(messages)
+                ],
+            )
+            conn.commit()
+
+    def _delete(self, conversation_id: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM session_messages WHERE conversation_id = ?", (conversation_id,))
+            conn.execute("DELETE FROM session_summaries WHERE conversation_id = ?", (conversation_id,))
+            conn.commit()
+
+    def _load_summary(self, conversation_id: str) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT summary, covered FROM session_summaries WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def _save_summary(self, conversation_id: str, summary: str, covered: int) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO session_summaries VALUES (?, ?, ?)",
+                (conversation_id, summary, covered),
+            )
+            conn.commit()
+
+    async def load(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        return await asyncio.to_thread(self._load, conversation_id)
+
+    async def append(self, conversation_id: str, start: int, messages: List[Dict[str, str]]) -> None:
+        await asyncio.to_thread(self._append, conversation_id, start, messages)
+
+    async def delete(self, conversation_id: str) -> None:
+        await asyncio.to_thread(self._delete, conversation_id)
+
+    async def load_summary(self, conversation_id: str) -> Optional[Tuple[str, int]]:
+        return await asyncio.to_thread(self._load_summary, conversation_id)
+
+    async def save_summary(self, conversation_id: str, summary: str, covered: int) -> None:
+        await asyncio.to_thread(self._save_summary, conversation_id, summary, covered)
+
+
+class Session:
+    """One conversation: its messages and the running summary of the oldest ones."""
+
+    def __init__(self, messages: List[Dict[str, str]], summary: Optional[str] = None, covered: int = 0):
+        self.messages = messages
+        self.summary = summary
+        # Number of leading messages folded into ``summary``
+        self.covered = covered
+        self.compaction: Optional[asyncio.Task] = None
+
+
+class SessionStore:
+    """
+    Conversation histories keyed by conversation ID.
+
+    Recently used histories are kept in an in-memory LRU. When a durable
+    backend is installed, every append is written through to it and
+    histories evicted from memory (or lost to a restart) are reloaded
+    from it on next use.
+
+    Once the messages not yet summarized exceed
+    ``session_summary_trigger_tokens``, the oldest of them are folded into a
+    running summary by a background task, so the prompt built by
+    ``context`` stays bounded however long the conversation gets.
+    """
+
+    def __init__(self, max_entries: int, backend: Optional[SessionBackend] = None):
+        self.max_entries = max_entries
+        self.backend = backend
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+        self.compaction_failures = 0
+
+    def set_backend(self, backend: Optional[SessionBackend]) -> None:
+        """Swap the durable backend (None keeps sessions in memory only)."""
+        self.backend = backend
+
+    def _remember(self, conversation_id: str, session: Session) -> None:
+        self._sessions[conversation_id] = session
+        self._sessions.move_to_end(conversation_id)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+
+    async def _session(self, conversation_id: str) -> Optional[Session]:
+        session = self._sessions.get(conversation_id)
+        if session is not None:
+            self._sessions.move_to_end(conversation_id)
+            self.hits += 1
+            return session
+
+        self.misses += 1
+        if self.backend is None:
+            return None
+        messages = await self.backend.load(conversation_id)
+        if messages is None:
+            return None
+        summary = await self.backend.load_summary(conversation_id)
+        # Another coroutine may have loaded or appended meanwhile
+        if conversation_id in self._sessions:
+            return self._sessions[conversation_id]
+        session = Session(messages, *(summary or (None, 0)))
+        self._remember(conversation_id, session)
+        return session
+
+    async def get(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        """Return the full history of a conversation, or None if unknown."""
+        session = await self._session(conversation_id)
+        return session.messages if session is not None else None
+
+    async def create(self, conversation_id: str) -> None:
+        """Start an empty conversation (kept in memory until its first append)."""
+        if await self._session(conversation_id) is None:
+            self._remember(conversation_id, Session([]))
+
+    async def append(self, conversation_id: str, messages: List[Dict[str, str]]) -> None:
+        """
+        Add messages to the end of a conversation, creating it if needed.
+
+        Starts a background compaction if the unsummarized history has grown
+        past the trigger.
+
+        Args:
+            conversation_id: Conversation to extend
+            messages: New messages with 'role' and 'content'
+        """
+        session = await self._session(conversation_id)
+        if session is None:
+            session = Session([])
+            self._remember(conversation_id, session)
+        start = len(session.messages)
+        session.messages.extend({"role": m["role"], "content": m["content"]} for m in messages)
+        if self.backend is not None:
+            await self.backend.append(conversation_id, start, messages)
+        self._maybe_compact(conversation_id, session)
+
+    async def context(
+        self,
+        conversation_id: str,
+        pending: Sequence[Dict[str, str]] = (),
+        max_tokens: Optional[int] = None,
+    ) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        """
+        Build the prompt context of a conversation.
+
+        Args:
+            conversation_id: Conversation to read
+            pending: New messages not stored yet, appended after the history
+            max_tokens: Token budget (defaults to ``session_history_max_tokens``)
+
+        Returns:
+            The running summary of older turns (or None), and the most recent
+            unsummarized messages plus ``pending`` that fit the budget left
+            after the summary
+        """
+        if max_tokens is None:
+            max_tokens = settings.session_history_max_tokens
+        session = await self._session(conversation_id)
+        if session is None:
+            return None, window_messages(list(pending), max_tokens)
+
+        summary = session.summary
+        if summary:
+            max_tokens -= estimate_tokens(summary)
+        recent = [*session.messages[session.covered:], *pending]
+        return summary, window_messages(recent, max_tokens)
+
+    def _maybe_compact(self, conversation_id: str, session: Session) -> None:
+        if not settings.session_summary_enabled:
+            return
+        if session.compaction is not None and not session.compaction.done():
+            return
+        keep = settings.session_summary_keep_messages
+        if len(session.messages) - session.covered <= keep:
+            return
+        if count_tokens(session.messages[session.covered:]) <= settings.session_summary_trigger_tokens:
+            return
+        session.compaction = asyncio.create_task(self._compact(conversation_id, session))
+
+    async def _compact(self, conversation_id: str, session: Session) -> None:
+        """Fold all but the newest ``session_summary_keep_messages`` into the summary."""
+        from app.services.llm_gateway import llm_gateway
+
+        covered = len(session.messages) - settings.session_summary_keep_messages
+        folded = session.messages[session.covered:covered]
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in folded)
+        prompt = (
+            f"Previous summary:\n{session.summary or '(none)'}\n\n"
+            f"New messages:\n{transcript}"
+        )
+        try:
+            result = await llm_gateway.complete(
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=settings.session_summary_max_tokens,
+                temperature=0,
+                system_prompt=SUMMARY_PROMPT,
+                cache=False,
+            )
+            if not result["success"]:
+                raise Exception(result.get("error", "Unknown error"))
+
+            session.summary = result["content"].strip()
+            session.covered = covered
+            self.compactions += 1
+            if self.backend is not None:
+                await self.backend.save_summary(conversation_id, session.summary, covered)
+        except Exception as e:
+            self.compaction_failures += 1
+            print(f"Error summarizing conversation {conversation_id}: {str(e)}")
+            return
+
+        # More turns may have arrived while the summary was generated
+        self._maybe_compact(conversation_id, session)
+
+    async def delete(self, conversation_id: str) -> None:
+        """Forget a conversation in memory and in the durable backend."""
+        session = self._sessions.pop(conversation_id, None)
+        if session is not None and session.compaction is not None:
+            session.compaction.cancel()
+        if self.backend is not None:
+            await self.backend.delete(conversation_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._sessions),
+            "compactions": self.compactions,
+            "compaction_failures": self.compaction_failures,
+        }
+
+
+def create_session_backend(name: str) -> Optional[SessionBackend]:
+    """
+    Build the durable session backend selected by ``session_backend``.
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if name == "memory":
+        return None
+    if name == "sqlite":
+        return SQLiteSessionBackend(settings.session_sqlite_path)
+    raise ValueError(f"Unknown session backend: {name}")
+
+
+# Singleton instance
+session_store = SessionStore(
+    max_entries=settings.session_cache_max_entries,
+    backend=create_session_backend(settings.session_backend),
+)
@@ -0,0 +1,166 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class _StreamFlight:
+    """Shared state of one in-flight stream: its buffered chunks and readers."""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        # Absolute index of chunks[0]; above zero once a prefix was dropped
+        self.base = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.readers = 0
+        # Absolute index of the next chunk each reader will take
+        self.positions: Dict[object, int] = {}
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def produced(self) -> int:
+        return self.base + len(self.chunks)
+
+    def ahead(self) -> int:
+        """Number of chunks the slowest reader has not taken yet."""
+        if not self.positions:
+            return 0
+        return self.produced - min(self.positions.values())
+
+    def trim(self) -> None:
+        """Drop the chunks every reader has already taken."""
+        if not self.positions:
+            return
+        low = min(self.positions.values())
+        if low > self.base:
+            del self.chunks[:low - self.base]
+            self.base = low
+
+    def notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into a single upstream request.
+
+    The first caller for a key starts the work; callers arriving while it is
+    in flight wait for the same result. Streams are teed: late joiners first
+    replay the chunks produced so far, then follow the live stream.
+
+    Args:
+        max_buffered: If set, a stream's upstream is read at most this many
+            chunks ahead of its slowest reader, and chunks every reader has
+            taken are dropped. A stream whose first chunk is gone can no
+            longer be joined; later callers start their own.
+    """
+
+    def __init__(self, max_buffered: Optional[int] = None):
+        self.max_buffered = max_buffered
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` once for all concurrent callers with the same key.
+
+        The upstream call runs in its own task, so a caller that is cancelled
+        does not cancel it for the others.
+        """
+        self.calls += 1
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def stream(
+        self,
+        key: str,
+        fn: Callable[[], AsyncIterator[Any]],
+    ) -> AsyncIterator[Any]:
+        """
+        Iterate ``fn()`` once for all concurrent readers with the same key.
+
+        The upstream is read by a background task into a shared buffer. It is
+        cancelled if every reader goes away before it finishes.
+        """
+        self.calls += 1
+        flight = self._streams.get(key)
+        if flight is not None and flight.base == 0:
+            self.coalesced += 1
+        else:
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.create_task(self._produce(key, flight, fn))
+
+        reader = object()
+        flight.readers += 1
+        flight.positions[reader] = 0
+        try:
+            index = 0
+            while True:
+                while index < flight.produced:
+                    yield flight.chunks[index - flight.base]
+                    index += 1
+                    flight.positions[reader] = index
+                    if self.max_buffered is not None:
+                        flight.trim()
+                        # Wake the producer if it waits on this reader
+                        flight.notify()
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.wait()
+        finally:
+            flight.readers -= 1
+            del flight.positions[reader]
+            if self.max_buffered is not None:
+                flight.trim()
+                flight.notify()
+            if flight.readers == 0 and not flight.done:
+                # Unlist it now: a caller arriving before the producer's
+                # cleanup runs must start a new flight, not join this one
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+                flight.task.cancel()
+
+    async def _produce(
+        self,
+        key: str,
+        flight: _StreamFlight,
+        fn: Callable[[], AsyncIterator[Any]],
+    ) -> None:
+        try:
+            async for chunk in fn():
+                flight.chunks.append(chunk)
+                flight.notify()
+                # Read no further ahead than the slowest reader allows
+                while self.max_buffered is not None and flight.ahead() >= self.max_buffered:
+                    await flight.wait()
+        except asyncio.CancelledError:
+            flight.error = Exception("Upstream stream was cancelled")
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            flight.notify()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
@@ -0,0 +1,187 @@
+import asyncio
+from typing import Callable, Dict, Optional
+from app.config import settings
+from app.services.openai_service import openai_service
+
+# The size hint comes from the client; preallocate no more than this for it
+MAX_PREALLOCATED_BYTES = 1024 * 1024
+
+
+class AudioBuffer:
+    """Growable byte buffer that audio chunks are written into in place."""
+
+    def __init__(self, size_hint: int = 0):
+        """
+        Allocate the buffer up front.
+
+        Args:
+            size_hint: Expected utterance size in bytes, if the client knows it;
+                capped at ``MAX_PREALLOCATED_BYTES``, larger utterances grow the buffer
+        """
+        self._data = bytearray(min(max(size_hint, 64 * 1024), MAX_PREALLOCATED_BYTES))
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def write(self, chunk) -> None:
+        """Copy a chunk (bytes or memoryview) to the end of the buffer."""
+        end = self._length + len(chunk)
+        if end > settings.voice_max_utterance_bytes:
+            raise ValueError("Utterance exceeds the maximum audio size")
+        if end > len(self._data):
+            # Grow geometrically so a stream of small chunks stays linear
+            self._data.extend(bytes(max(end, 2 * len(self._data)) - len(self._data)))
+        self._data[self._length:end] = chunk
+        self._length = end
+
+    def getvalue(self) -> bytes:
+        """Return a snapshot of the audio written so far."""
+        with memoryview(self._data) as view:
+            return view[:self._length].tobytes()
+
+
+class StreamingTranscriber:
+    """
+    Base class for transcription backends fed one utterance chunk by chunk.
+
+    Subclasses may transcribe while audio is still arriving and expose
+    intermediate text through ``poll_partial``.
+    """
+
+    def __init__(self, content_type: str = "audio/webm", size_hint: int = 0):
+        self.content_type = content_type
+        self.buffer = AudioBuffer(size_hint)
+
+    @property
+    def filename(self) -> str:
+        return "audio." + self.content_type.split("/")[-1].split(";")[0]
+
+    def feed(self, chunk) -> None:
+        """Append an audio chunk to the utterance."""
+        self.buffer.write(chunk)
+
+    def poll_partial(self) -> Optional[str]:
+        """Return new partial transcript text if any is ready, without waiting."""
+        return None
+
+    async def finish(self) -> str:
+        """Transcribe the complete utterance and return the final text."""
+        return await openai_service.transcribe_audio(
+            (self.filename, self.buffer.getvalue(), self.content_type)
+        )
+
+    def cancel(self) -> None:
+        """Abandon the utterance and any background work."""
+
+
+class BufferedTranscriber(StreamingTranscriber):
+    """Buffer the whole utterance and transcribe it once with Whisper."""
+
+
+class ChunkedWhisperTranscriber(StreamingTranscriber):
+    """
+    Re-transcribe the growing utterance with Whisper while the user talks.
+
+    Whisper only takes whole files, so each partial transcribes the prefix
+    received so far, in the background and at most one at a time. A partial
+    starts once at least ``voice_partial_interval_bytes`` of new audio
+    arrived, and at least as much as was already transcribed. The prefixes
+    thus double in size and all partials together upload about twice the
+    utterance, not a quadratic amount. Partials run under their own, smaller
+    concurrency limit so they never delay final transcriptions.
+
+    When the utterance ends, a partial that covers all of its audio is the
+    final transcript and Whisper is not called again.
+    """
+
+    def __init__(self, content_type: str = "audio/webm", size_hint: int = 0):
+        super().__init__(content_type, size_hint)
+        self._task: Optional[asyncio.Task] = None
+        # Bytes covered by the running (or last started) partial
+        self._transcribed_upto = 0
+        # Latest finished partial and how many bytes it covers
+        self._partial_text: Optional[str] = None
+        self._partial_upto = 0
+        self._last_partial = ""
+
+    def feed(self, chunk) -> None:
+        super().feed(chunk)
+        pending = len(self.buffer) - self._transcribed_upto
+        interval = max(settings.voice_partial_interval_bytes, self._transcribed_upto)
+        if self._task is None and pending >= interval:
+            self._transcribed_upto = len(self.buffer)
+            self._task = asyncio.create_task(openai_service.transcribe_audio(
+                (self.filename, self.buffer.getvalue(), self.content_type),
+                partial=True,
+            ))
+            # A failed partial is simply skipped; mark its error as retrieved
+            self._task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def _collect(self) -> None:
+        """Take the result of a finished partial."""
+        task, self._task = self._task, None
+        if not task.cancelled() and task.exception() is None:
+            self._partial_text = task.result()
+            self._partial_upto = self._transcribed_upto
+
+    def poll_partial(self) -> Optional[str]:
+        if self._task is None or not self._task.done():
+            return None
+        self._collect()
+        text = self._partial_text
+        if not text or text == self._last_partial:
+            return None
+        self._last_partial = text
+        return text
+
+    async def finish(self) -> str:
+        if self._task is not None and self._transcribed_upto == len(self.buffer):
+            # The running partial already covers the whole utterance
+            await asyncio.wait({self._task})
+            self._collect()
+        self.cancel()
+        if self._partial_text is not None and self._partial_upto == len(self.buffer):
+            return self._partial_text
+        return await super().finish()
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+TRANSCRIBERS: Dict[str, Callable[..., StreamingTranscriber]] = {
+    "buffered": BufferedTranscriber,
+    "chunked": ChunkedWhisperTranscriber,
+}
+
+
+def register_transcriber(name: str, factory: Callable[..., StreamingTranscriber]) -> None:
+    """Make a transcription backend selectable through ``voice_transcriber``."""
+    TRANSCRIBERS[name] = factory
+
+
+def create_transcriber(
+    name: Optional[str] = None,
+    content_type: str = "audio/webm",
+    size_hint: int = 0,
+) -> StreamingTranscriber:
+    """
+    Create a transcriber for one utterance.
+
+    Args:
+        name: Registered backend name (defaults to settings)
+        content_type: MIME type of the incoming audio
+        size_hint: Expected utterance size in bytes
+
+    Returns:
+        A fresh StreamingTranscriber
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    name = name or settings.voice_transcriber
+    if name not in TRANSCRIBERS:
+        raise ValueError(f"Unknown transcriber: {name}")
+    return TRANSCRIBERS[name](content_type=content_type, size_hint=size_hint)
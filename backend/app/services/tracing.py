@@ -0,0 +1,277 @@
+import json
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from app.config import settings
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class SpanExporter:
+    """
+    Destination of finished traces.
+
+    Register implementations with ``register_exporter`` and select one with
+    ``TRACING_EXPORTER``. ``export`` is called on the event loop, so it
+    should hand the spans off rather than block.
+    """
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+
+class NoopExporter(SpanExporter):
+    """Drops spans; sampling and timing still run."""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        pass
+
+
+class JSONLinesExporter(SpanExporter):
+    """
+    Appends one JSON object per span to a file.
+
+    Writes happen on a single background thread, in order, so the event
+    loop never waits on the disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-export")
+
+    def _write(self, spans: List[Dict[str, Any]]) -> None:
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(json.dumps(span, default=str) + "\n" for span in spans))
+        self._file.flush()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        self._executor.submit(self._write, spans)
+
+
+EXPORTERS: Dict[str, Callable[[], SpanExporter]] = {
+    "jsonl": lambda: JSONLinesExporter(settings.tracing_jsonl_path),
+    "none": NoopExporter,
+}
+
+
+def register_exporter(name: str, factory: Callable[[], SpanExporter]) -> None:
+    """Make an exporter available under ``name`` for TRACING_EXPORTER."""
+    EXPORTERS[name] = factory
+
+
+class _Trace:
+    """Spans of one trace, exported together when its local root ends."""
+
+    __slots__ = ("trace_id", "root_id", "spans", "done")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.root_id: Optional[str] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.done = False
+
+
+class Span:
+    """
+    A timed operation within a trace.
+
+    Use as a context manager to make it the parent of spans started inside
+    the block, or call ``end`` yourself for spans that must not change the
+    current context (e.g. around async generators).
+    """
+
+    __slots__ = ("tracer", "trace", "name", "span_id", "parent_id", "attributes",
+                 "start_time", "_started", "error", "_token")
+
+    recording = True
+
+    def __init__(self, tracer: "Tracer", trace: _Trace, name: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.trace = trace
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set_name(self, name: str) -> None:
+        self.name = name
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def record_error(self, error: Union[BaseException, str]) -> None:
+        self.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        self.tracer._finish(self, (time.perf_counter() - self._started) * 1000)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_span.reset(self._token)
+        if exc is not None and isinstance(exc, Exception):
+            self.record_error(exc)
+        self.end()
+
+
+class _NonRecordingSpan:
+    """
+    Stand-in for spans that are not sampled; every method is a no-op.
+
+    An unsampled root is made current so that its descendants are skipped
+    too, without rolling the dice again.
+    """
+
+    recording = False
+
+    def __init__(self, attach: bool):
+        self._attach = attach
+
+    def set_name(self, name: str) -> None:
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+    def record_error(self, error: Union[BaseException, str]) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self):
+        if self._attach:
+            # Only roots attach, and a root always replaces "no span"
+            _current_span.set(_UNSAMPLED)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._attach:
+            _current_span.set(None)
+
+
+_UNSAMPLED = _NonRecordingSpan(attach=True)
+_NOOP = _NonRecordingSpan(attach=False)
+
+_current_span: ContextVar[Any] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Creates spans and hands finished traces to the configured exporter.
+
+    Whether a trace is recorded is decided once, at its root, with
+    probability ``tracing_sample_ratio`` (or by the sampled flag of an
+    incoming ``traceparent``). Spans of unsampled traces cost a context
+    variable lookup and nothing else.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None):
+        self.exporter = exporter
+
+    def set_exporter(self, exporter: SpanExporter) -> None:
+        self.exporter = exporter
+
+    def _get_exporter(self) -> SpanExporter:
+        if self.exporter is None:
+            self.exporter = EXPORTERS[settings.tracing_exporter]()
+        return self.exporter
+
+    def span(
+        self,
+        name: str,
+        parent: Optional[Tuple[str, str, bool]] = None,
+        **attributes: Any,
+    ):
+        """
+        Start a span under the current one, or a new trace if there is none.
+
+        Args:
+            name: Operation name, e.g. "openai.chat_completion"
+            parent: Remote (trace_id, span_id, sampled) to continue, from ``parse_traceparent``
+            **attributes: Initial span attributes
+
+        Returns:
+            A Span, or a no-op stand-in if the trace is not sampled
+        """
+        current = _current_span.get()
+        if current is None:
+            if not settings.tracing_enabled:
+                return _NOOP
+            if parent is not None:
+                trace_id, parent_id, sampled = parent
+            else:
+                trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+                sampled = random.random() < settings.tracing_sample_ratio
+            if not sampled:
+                return _UNSAMPLED
+            span = Span(self, _Trace(trace_id), name, parent_id, attributes)
+            span.trace.root_id = span.span_id
+            return span
+
+        if not current.recording:
+            return _NOOP
+        return Span(self, current.trace, name, current.span_id, attributes)
+
+    def current_span(self):
+        """The active span, or a no-op stand-in."""
+        return _current_span.get() or _NOOP
+
+    def _finish(self, span: Span, duration_ms: float) -> None:
+        record = {
+            "trace_id": span.trace.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start": span.start_time,
+            "duration_ms": round(duration_ms, 3),
+            "status": "error" if span.error else "ok",
+            "error": span.error,
+            "attributes": span.attributes,
+        }
+        trace = span.trace
+        if trace.done:
+            # Outlived its root (e.g. a background task); send it on its own
+            self._get_exporter().export([record])
+            return
+        trace.spans.append(record)
+        if span.span_id == trace.root_id:
+            trace.done = True
+            self._get_exporter().export(trace.spans)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """Parse a W3C ``traceparent`` header into (trace_id, parent span_id, sampled)."""
+    if not header:
+        return None
+    match = TRACEPARENT.match(header.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+# Singleton instance
+tracer = Tracer()
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from app.config import settings
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized audio.
+
+    Entries are keyed on (text, voice_id, model_id). Recently used clips stay
+    in a memory tier; every clip is also written to a disk tier of MP3 files,
+    read back whole on a worker thread. Both tiers evict least recently
+    used entries once they exceed their byte budget.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        memory_bytes: int,
+        disk_bytes: int,
+    ):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_used = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_used = 0
+        self.hits = 0
+        self.misses = 0
+        self._load_disk_index()
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, model_id: str) -> str:
+        """Return the content address of a synthesis request."""
+        payload = "\0".join((voice_id, model_id, text))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _load_disk_index(self) -> None:
+        """
+        Rebuild the disk LRU order from file modification times.
+
+        A directory over ``disk_bytes`` (e.g. after the budget was lowered)
+        is trimmed right away rather than on the next write.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".mp3"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_used += size
+        self._remove_files(self._evict_disk())
+
+    def _evict_disk(self) -> List[str]:
+        """Drop least recently used disk entries until the tier fits its budget."""
+        evicted = []
+        while self._disk_used > self.disk_bytes and self._disk:
+            evicted_key, size = self._disk.popitem(last=False)
+            self._disk_used -= size
+            evicted.append(evicted_key)
+        return evicted
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        if len(audio) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_used -= len(self._memory.pop(key))
+        self._memory[key] = audio
+        self._memory_used += len(audio)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+
+    def _read_file(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read() or None
+        except OSError:
+            return None
+
+    def _write_file(self, key: str, audio: bytes) -> bool:
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, self._path(key))
+            return True
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
+
+    def _remove_files(self, keys) -> None:
+        for key in keys:
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return cached audio for ``key`` from memory or disk, if present."""
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return audio
+
+        if key in self._disk:
+            audio = await asyncio.to_thread(self._read_file, key)
+            if audio is not None and key in self._disk:
+                self._disk.move_to_end(key)
+                self._remember(key, audio)
+                self.hits += 1
+                return audio
+            # Missing or unreadable file: forget it
+            self._disk_used -= self._disk.pop(key, 0)
+
+        self.misses += 1
+        return None
+
+    def contains(self, key: str) -> bool:
+        """Whether ``key`` is cached in either tier, without touching LRU order."""
+        return key in self._memory or key in self._disk
+
+    async def put(self, key: str, audio: bytes) -> None:
+        """Store audio in both tiers."""
+        if not audio:
+            return
+        self._remember(key, audio)
+        if not await asyncio.to_thread(self._write_file, key, audio):
+            return
+
+        self._disk_used -= self._disk.pop(key, 0)
+        self._disk[key] = len(audio)
+        self._disk_used += len(audio)
+        evicted = self._evict_disk()
+        if evicted:
+            await asyncio.to_thread(self._remove_files, evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_used,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_used,
+        }
+
+
+# Singleton instance
+tts_cache = TTSCache(
+    directory=settings.tts_cache_dir,
+    memory_bytes=settings.tts_cache_memory_bytes,
+    disk_bytes=settings.tts_cache_disk_bytes,
+)
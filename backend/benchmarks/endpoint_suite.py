@@ -0,0 +1,486 @@
+#!/usr/bin/env python
+"""
+Benchmark suite: the main endpoints against local stub upstreams.
+
+Serves the FastAPI app with uvicorn on a background thread. The OpenAI
+(completions, streaming and Whisper), ElevenLabs, Firecrawl and Bedrock
+clients are replaced with stand-ins whose latency and payload size are set
+on the command line, so no API keys or network access are needed. Each
+scenario is driven over real HTTP and WebSocket connections at each
+concurrency level.
+
+Every run reports throughput, latency p50/p95/p99, time to first byte, the
+lag of the server's event loop and how often the loop was blocked for
+longer than ``--block-threshold``. The stack of each block is printed by
+the app's loop monitor. Results are written as JSON. Pass an earlier file
+as ``--baseline`` to print the changes. The run exits non-zero when
+throughput or p95 regress by more than ``--tolerance``, or when there are
+more loop blocks than before.
+
+The load generator runs in the same process on its own event loop, so
+absolute numbers include some client overhead; compare runs made on the
+same machine.
+
+Usage:
+    python benchmarks/endpoint_suite.py --concurrency 1,8,32 --requests 200 --output bench.json
+    python benchmarks/endpoint_suite.py --scenarios generate_stream,ws_voice --baseline bench.json
+    python benchmarks/endpoint_suite.py --providers bedrock --llm-latency 0.5
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+PROMPT = "Request {n}: what helps with a mild headache that started this morning?"
+HTTP_SCENARIOS = {
+    "generate": ("/api/v1/bedrock/generate", lambda n, args: {"json": {"prompt": PROMPT.format(n=n)}}),
+    "generate_stream": ("/api/v1/bedrock/generate/stream", lambda n, args: {"json": {"prompt": PROMPT.format(n=n)}}),
+    "chat": (
+        "/api/v1/bedrock/chat",
+        lambda n, args: {"json": {"messages": [{"role": "user", "content": PROMPT.format(n=n)}]}},
+    ),
+    "tts": (
+        "/api/v1/voice/text-to-speech",
+        lambda n, args: {"json": {"text": f"Sentence {n}: drink water and rest for a while."}},
+    ),
+    "whisper": (
+        "/api/v1/transcription/whisper",
+        lambda n, args: {"files": {"audio": ("audio.webm", os.urandom(args.audio_bytes), "audio/webm")}},
+    ),
+    "search": ("/api/v1/search/web", lambda n, args: {"json": {"query": f"headache remedies {n}"}}),
+}
+WS_SCENARIOS = {"ws_voice": "legacy", "ws_voice_pipelined": "pipelined"}
+SCENARIOS = list(HTTP_SCENARIOS) + list(WS_SCENARIOS)
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else None
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    return {
+        "p50": round(percentile(samples, 0.50), 3),
+        "p95": round(percentile(samples, 0.95), 3),
+        "p99": round(percentile(samples, 0.99), 3),
+        "max": round(max(samples), 3),
+    }
+
+
+def response_words(count):
+    """Streamed answer text; a full stop every 12 words gives the voice pipeline sentences."""
+    return [f"word{i}." if i % 12 == 11 else f"word{i}" for i in range(count)]
+
+
+def install_stubs(args):
+    """Replace every upstream client with a local stand-in."""
+    from app.services.bedrock_service import bedrock_service
+    from app.services.elevenlabs_service import elevenlabs_service
+    from app.services.firecrawl_service import firecrawl_service
+    from app.services.openai_service import openai_service
+
+    words = response_words(args.tokens)
+    usage = SimpleNamespace(
+        prompt_tokens=20,
+        completion_tokens=len(words),
+        total_tokens=20 + len(words),
+        model_dump=lambda: {"prompt_tokens": 20, "completion_tokens": len(words), "total_tokens": 20 + len(words)},
+    )
+
+    def chunk(content=None, finish_reason=None):
+        delta = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)], usage=None)
+
+    async def openai_stream():
+        await asyncio.sleep(args.llm_latency)
+        for index, word in enumerate(words):
+            yield chunk(word if index == 0 else " " + word)
+            await asyncio.sleep(args.token_delay)
+        yield chunk(finish_reason="stop")
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    async def chat_create(**kwargs):
+        if kwargs.get("stream"):
+            return openai_stream()
+        await asyncio.sleep(args.llm_latency + args.token_delay * len(words))
+        message = SimpleNamespace(content=" ".join(words))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    async def transcribe(**kwargs):
+        await asyncio.sleep(args.whisper_latency)
+        return SimpleNamespace(text="I have had a headache since this morning")
+
+    def transcribe_sync(**kwargs):
+        time.sleep(args.whisper_latency)
+        return SimpleNamespace(text="I have had a headache since this morning")
+
+    openai_service.client.chat.completions.create = chat_create
+    openai_service.client.audio.transcriptions.create = transcribe
+    openai_service.sync_client.audio.transcriptions.create = transcribe_sync
+
+    audio = os.urandom(args.tts_bytes)
+    chunks = [audio[i:i + args.tts_chunk_bytes] for i in range(0, len(audio), args.tts_chunk_bytes)]
+
+    async def tts_convert(**kwargs):
+        await asyncio.sleep(args.tts_latency)
+        for piece in chunks:
+            yield piece
+            await asyncio.sleep(0)
+
+    def tts_convert_sync(**kwargs):
+        time.sleep(args.tts_latency)
+        yield from chunks
+
+    for client, convert in ((elevenlabs_service.async_client, tts_convert), (elevenlabs_service.client, tts_convert_sync)):
+        client.text_to_speech.convert = convert
+        client.text_to_speech.convert_as_stream = convert
+
+    page = "Headache relief: rest, fluids and over-the-counter pain relief. " * max(1, args.page_bytes // 64)
+
+    # Same signatures as FirecrawlApp, so the service makes the calls it makes in production
+    class StubFirecrawl:
+        def search(self, query, params=None):
+            time.sleep(args.search_latency)
+            return {"data": [
+                {"title": f"Result {i}", "url": f"https://example.org/{i}", "description": query, "markdown": page}
+                for i in range((params or {}).get("limit", 5))
+            ]}
+
+        def scrape_url(self, url, params=None):
+            time.sleep(args.search_latency)
+            return {"markdown": page, "metadata": {"title": url, "description": ""}}
+
+    firecrawl_service._client = StubFirecrawl()
+
+    class StubBedrockRuntime:
+        def invoke_model(self, modelId, body):
+            time.sleep(args.llm_latency + args.token_delay * len(words))
+            return {"body": io.BytesIO(json.dumps({
+                "content": [{"type": "text", "text": " ".join(words)}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": 20, "output_tokens": len(words)},
+            }).encode())}
+
+        def invoke_model_with_response_stream(self, modelId, body):
+            def event(payload):
+                return {"chunk": {"bytes": json.dumps(payload).encode()}}
+
+            def events():
+                time.sleep(args.llm_latency)
+                yield event({"type": "message_start", "message": {"usage": {"input_tokens": 20}}})
+                for index, word in enumerate(words):
+                    yield event({"type": "content_block_delta", "delta": {"text": word if index == 0 else " " + word}})
+                    time.sleep(args.token_delay)
+                yield event({
+                    "type": "message_delta",
+                    "delta": {"stop_reason": "end_turn"},
+                    "usage": {"output_tokens": len(words)},
+                })
+
+            return {"body": events()}
+
+    bedrock_service.bedrock_runtime = StubBedrockRuntime()
+
+
+class LoopLagProbe:
+    """Measures how late the server's event loop wakes up from a short sleep."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.samples.append((now, (now - started - self.interval) * 1000))
+
+    def window(self, start, end):
+        return [lag for at, lag in list(self.samples) if start <= at <= end]
+
+
+class ServerThread:
+    """Runs the app under uvicorn on a background thread with its own event loop."""
+
+    def __init__(self, app, port):
+        import uvicorn
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.server.install_signal_handlers = lambda: None
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+async def http_request(client, path, kwargs):
+    """POST and read the body; returns (ok, seconds to first body byte)."""
+    started = time.perf_counter()
+    ttfb = None
+    async with client.stream("POST", path, **kwargs) as response:
+        async for _ in response.aiter_raw():
+            if ttfb is None:
+                ttfb = time.perf_counter() - started
+        return response.status_code < 400, ttfb
+
+
+async def voice_turn(ws, args):
+    """One /ws/voice turn; returns (ok, seconds to the first audio message)."""
+    started = time.perf_counter()
+    await ws.send(json.dumps({"type": "audio", "data": base64.b64encode(os.urandom(args.audio_bytes)).decode()}))
+    ttfb = None
+    while True:
+        message = json.loads(await ws.recv())
+        if message["type"] in ("audio", "audio_chunk") and ttfb is None:
+            ttfb = time.perf_counter() - started
+        if message["type"] == "error":
+            return False, ttfb
+        if message["type"] in ("audio", "audio_end"):
+            # Legacy turns end with one "audio" message, pipelined ones with "audio_end"
+            return True, ttfb
+
+
+async def run_level(scenario, concurrency, args, base_url, probe):
+    import httpx
+    from app.services.loop_monitor import loop_monitor
+
+    blocks_before = loop_monitor.blocks
+
+    total = max(args.requests, concurrency)
+    counter = iter(range(total))
+    latencies, ttfbs = [], []
+    errors = 0
+
+    async def record(call):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            ok, ttfb = await call
+        except Exception:
+            ok, ttfb = False, None
+        if ok:
+            latencies.append((time.perf_counter() - started) * 1000)
+            if ttfb is not None:
+                ttfbs.append(ttfb * 1000)
+        else:
+            errors += 1
+
+    if scenario in HTTP_SCENARIOS:
+        path, make_kwargs = HTTP_SCENARIOS[scenario]
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+            async def worker():
+                for n in counter:
+                    await record(http_request(client, path, make_kwargs(n, args)))
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+    else:
+        import websockets
+
+        url = base_url.replace("http://", "ws://") + f"/ws/voice?mode={WS_SCENARIOS[scenario]}"
+
+        async def worker():
+            # One call per worker, reused for its turns
+            async with websockets.connect(url, max_size=None) as ws:
+                await ws.recv()  # session
+                for _ in counter:
+                    await record(voice_turn(ws, args))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": summarize(latencies),
+        "ttfb_ms": summarize(ttfbs),
+        "loop_lag_ms": summarize(probe.window(started, started + elapsed)),
+        "loop_blocks": loop_monitor.blocks - blocks_before,
+    }
+
+
+def report(result):
+    latency = result["latency_ms"] or {}
+    ttfb = result["ttfb_ms"] or {}
+    lag = result["loop_lag_ms"] or {}
+    print(
+        f"{result['scenario']:<20} c={result['concurrency']:<4} {result['throughput_rps']:8.1f} req/s  "
+        f"p50 {latency.get('p50', 0):8.1f}  p95 {latency.get('p95', 0):8.1f}  p99 {latency.get('p99', 0):8.1f} ms  "
+        f"ttfb p50 {ttfb.get('p50', 0):7.1f} ms  lag p99 {lag.get('p99', 0):6.1f} ms  "
+        f"blocks {result['loop_blocks']}  errors {result['errors']}"
+    )
+
+
+def compare(results, baseline_path, tolerance):
+    """Print changes against a baseline run; returns the number of regressions."""
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for result in results:
+        before = baseline.get((result["scenario"], result["concurrency"]))
+        if before is None or not before["latency_ms"] or not result["latency_ms"]:
+            continue
+        throughput = result["throughput_rps"] / before["throughput_rps"] - 1 if before["throughput_rps"] else 0.0
+        p95 = result["latency_ms"]["p95"] / before["latency_ms"]["p95"] - 1 if before["latency_ms"]["p95"] else 0.0
+        blocks = result["loop_blocks"] - before.get("loop_blocks", 0)
+        regressed = throughput < -tolerance or p95 > tolerance or blocks > 0
+        regressions += regressed
+        print(
+            f"{result['scenario']:<20} c={result['concurrency']:<4} throughput {throughput:+7.1%}  "
+            f"p95 {p95:+7.1%}  loop blocks {blocks:+d}{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure_environment(args, workdir):
+    """Settings for an isolated run; must be set before the app is imported."""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+    os.environ.setdefault("FIRECRAWL_API_KEY", "benchmark")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    os.environ["LLM_PROVIDERS"] = json.dumps(args.providers.split(","))
+    # Print the stack of anything holding the server loop past the threshold
+    os.environ["LOOP_MONITOR_ENABLED"] = "true"
+    os.environ["LOOP_MONITOR_DEBUG"] = "true"
+    os.environ["LOOP_MONITOR_INTERVAL_SECONDS"] = str(min(0.05, args.block_threshold))
+    os.environ["LOOP_MONITOR_BLOCK_THRESHOLD_SECONDS"] = str(args.block_threshold)
+    for name, filename in (
+        ("SESSION_SQLITE_PATH", "sessions.db"),
+        ("JOB_STORE_PATH", "jobs.db"),
+        ("RAG_INDEX_PATH", "rag.db"),
+        ("RAG_EMBEDDINGS_PATH", "rag_embeddings.f32"),
+        ("TTS_CACHE_DIR", "tts"),
+        ("TRACING_JSONL_PATH", "traces.jsonl"),
+    ):
+        os.environ[name] = os.path.join(workdir, filename)
+    if not args.caches:
+        # Measure the upstream path rather than cache hits
+        for name in ("RESPONSE_CACHE_ENABLED", "SEMANTIC_CACHE_ENABLED", "TTS_CACHE_ENABLED", "SEARCH_CACHE_ENABLED"):
+            os.environ[name] = "false"
+        os.environ["TTS_CACHE_WARMUP_PHRASES"] = "[]"
+
+
+async def run_all(args, base_url, probe):
+    results = []
+    for scenario in args.scenarios.split(","):
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            result = await run_level(scenario, concurrency, args, base_url, probe)
+            report(result)
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests (or voice turns) per level")
+    parser.add_argument("--providers", default="openai", help="LLM_PROVIDERS for the LLM routes")
+    parser.add_argument("--caches", action="store_true", help="Keep the response, TTS and search caches on")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds to first token")
+    parser.add_argument("--tokens", type=int, default=60, help="Tokens per LLM response")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Seconds between streamed tokens")
+    parser.add_argument("--whisper-latency", type=float, default=0.4)
+    parser.add_argument("--audio-bytes", type=int, default=64 * 1024, help="Uploaded utterance size")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="Seconds to first audio byte")
+    parser.add_argument("--tts-bytes", type=int, default=48 * 1024, help="Audio bytes per synthesis")
+    parser.add_argument("--tts-chunk-bytes", type=int, default=4096)
+    parser.add_argument("--search-latency", type=float, default=0.5)
+    parser.add_argument("--page-bytes", type=int, default=8 * 1024, help="Markdown bytes per search result")
+    parser.add_argument(
+        "--block-threshold", type=float, default=0.05, help="Loop lag in seconds counted (and traced) as a block"
+    )
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(args, workdir)
+        from app.main import app
+
+        install_stubs(args)
+        probe = LoopLagProbe()
+        app.router.on_startup.append(probe.start)
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        with ServerThread(app, port):
+            results = asyncio.run(run_all(args, f"http://127.0.0.1:{port}", probe))
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "args": vars(args),
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Benchmark: local retrieval index build, incremental update and query latency.
+
+Indexes a synthetic corpus of medical-style pages into a throwaway index,
+then times BM25 queries, re-indexing one changed page, and (if NumPy is
+installed) a brute-force cosine scan over a memory-mapped embedding matrix
+with one random vector per chunk. Compare the query times with the seconds
+a live Firecrawl search or scrape takes per question.
+
+Usage:
+    python benchmarks/rag_query.py --documents 2000 --queries 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+TERMS = (
+    "fever cough headache migraine nausea vomiting diarrhea rash fatigue dizziness "
+    "hypertension diabetes asthma allergy insulin ibuprofen paracetamol antibiotic "
+    "dosage symptoms diagnosis treatment chronic acute infection inflammation pain "
+    "blood pressure glucose cholesterol heart kidney liver lung skin sleep anxiety "
+    "depression vaccine pregnancy children elderly dehydration fracture sprain burn"
+).split()
+FILLER = (
+    "patients may often experience several common signs which usually improve "
+    "within days although some cases need medical advice from a doctor or nurse"
+).split()
+
+
+def make_page(rng, words):
+    """Random page text mixing topic terms into filler prose."""
+    return " ".join(
+        rng.choice(TERMS) if rng.random() < 0.25 else rng.choice(FILLER)
+        for _ in range(words)
+    )
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def report(label, samples_ms):
+    print(
+        f"{label:<28} p50 {statistics.median(samples_ms):8.2f} ms   "
+        f"p95 {percentile(samples_ms, 0.95):8.2f} ms"
+    )
+
+
+async def run(args, index, np):
+    rng = random.Random(args.seed)
+    pages = [make_page(rng, args.words) for _ in range(args.documents)]
+
+    start = time.perf_counter()
+    for number, page in enumerate(pages):
+        await index.add_document(f"https://example.org/page/{number}", page, f"Page {number}")
+    build_s = time.perf_counter() - start
+    stats = index.stats()
+    print(
+        f"Indexed {stats['documents']} pages ({stats['chunks']} chunks, {stats['terms']} terms) "
+        f"in {build_s:.2f} s"
+    )
+
+    queries = [" ".join(rng.sample(TERMS, rng.randint(2, 4))) for _ in range(args.queries)]
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        await index.search(query, args.k)
+        samples.append((time.perf_counter() - start) * 1000)
+    report("BM25 query", samples)
+
+    samples = []
+    for number in rng.sample(range(args.documents), min(50, args.documents)):
+        start = time.perf_counter()
+        await index.add_document(f"https://example.org/page/{number}", make_page(rng, args.words))
+        samples.append((time.perf_counter() - start) * 1000)
+    report("Incremental page update", samples)
+
+    if np is None:
+        print("NumPy not installed; skipping the embedding scan")
+        return
+
+    from app.services.retrieval_index import EmbeddingMatrix
+
+    matrix = EmbeddingMatrix(os.path.join(args.workdir, "embeddings.f32"), args.dimensions)
+    vectors = np.random.default_rng(args.seed).standard_normal(
+        (stats["chunks"], args.dimensions), dtype=np.float32
+    )
+    matrix.append(vectors)
+    view = matrix.view()
+
+    samples = []
+    for _ in range(args.queries):
+        query = vectors[rng.randrange(len(vectors))]
+        start = time.perf_counter()
+        similarities = view @ query
+        top = np.argpartition(-similarities, args.k - 1)[: args.k]
+        top[np.argsort(-similarities[top])]
+        samples.append((time.perf_counter() - start) * 1000)
+    report(f"Cosine scan ({args.dimensions}d, mmap)", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=600, help="Words per page")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dimensions", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        args.workdir = workdir
+        os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+        os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+        os.environ["RAG_EMBEDDINGS_ENABLED"] = "false"
+        from app.services.retrieval_index import RetrievalIndex, np
+
+        index = RetrievalIndex(os.path.join(workdir, "rag.db"))
+        asyncio.run(run(args, index, np))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the AWS Bedrock runtime (Anthropic messages models).
+
+Serves invoke_model and invoke_model_with_response_stream with canned text,
+a configurable delay and chunking, so BedrockService can be exercised with
+no AWS account. Point the backend at it with:
+
+    BEDROCK_ENDPOINT_URL=http://127.0.0.1:8010
+    AWS_ACCESS_KEY_ID=stub AWS_SECRET_ACCESS_KEY=stub
+
+Usage:
+    python benchmarks/stub_bedrock.py --port 8010 --latency 0.2 --words 50
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import struct
+import zlib
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def encode_event(payload: bytes) -> bytes:
+    """Encode one AWS event-stream message carrying a Bedrock ``chunk`` event."""
+    headers = b""
+    for name, value in (
+        (":event-type", "chunk"),
+        (":content-type", "application/json"),
+        (":message-type", "event"),
+    ):
+        name_bytes, value_bytes = name.encode(), value.encode()
+        headers += struct.pack(">B", len(name_bytes)) + name_bytes
+        headers += struct.pack(">BH", 7, len(value_bytes)) + value_bytes
+
+    total_length = 12 + len(headers) + len(payload) + 4
+    prelude = struct.pack(">II", total_length, len(headers))
+    prelude += struct.pack(">I", zlib.crc32(prelude))
+    message = prelude + headers + payload
+    return message + struct.pack(">I", zlib.crc32(message))
+
+
+def create_app(latency: float = 0.2, words: int = 50, token_delay: float = 0.01) -> FastAPI:
+    """Build the stub app; ``latency`` is time to first token in seconds."""
+    app = FastAPI(title="Bedrock runtime stub")
+    text_words = [f"word{i}" for i in range(words)]
+
+    @app.post("/model/{model_id}/invoke")
+    async def invoke(model_id: str, request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency + token_delay * len(text_words))
+        return JSONResponse({
+            "id": "msg_stub",
+            "type": "message",
+            "role": "assistant",
+            "model": model_id,
+            "content": [{"type": "text", "text": " ".join(text_words)}],
+            "stop_reason": "end_turn",
+            "usage": {
+                "input_tokens": sum(len(str(m.get("content", "")).split()) for m in body.get("messages", [])),
+                "output_tokens": len(text_words),
+            },
+        })
+
+    @app.post("/model/{model_id}/invoke-with-response-stream")
+    async def invoke_stream(model_id: str, request: Request):
+        await request.body()
+
+        def chunk_event(chunk: dict) -> bytes:
+            payload = json.dumps({"bytes": base64.b64encode(json.dumps(chunk).encode()).decode()})
+            return encode_event(payload.encode())
+
+        async def events():
+            await asyncio.sleep(latency)
+            yield chunk_event({
+                "type": "message_start",
+                "message": {"usage": {"input_tokens": 10, "output_tokens": 1}},
+            })
+            for index, word in enumerate(text_words):
+                yield chunk_event({
+                    "type": "content_block_delta",
+                    "index": 0,
+                    "delta": {"type": "text_delta", "text": word if index == 0 else " " + word},
+                })
+                await asyncio.sleep(token_delay)
+            yield chunk_event({
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn"},
+                "usage": {"output_tokens": len(text_words)},
+            })
+            yield chunk_event({"type": "message_stop"})
+
+        return StreamingResponse(events(), media_type="application/vnd.amazon.eventstream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--words", type=int, default=50, help="Words per response")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between streamed words")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(create_app(args.latency, args.words, args.token_delay), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
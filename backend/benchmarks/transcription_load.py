@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Load test: /health latency while Whisper transcriptions are in flight.
+
+Upstream Whisper calls are replaced with a local stub that takes a fixed
+amount of time, so no API key or network access is needed. The script
+measures /health latency on an idle app and again while N transcriptions
+run through /api/v1/transcription/whisper, and prints p50/p99 for both.
+
+Usage:
+    python benchmarks/transcription_load.py --transcriptions 16 --latency 2.0
+    python benchmarks/transcription_load.py --backend thread
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def probe_health(client, duration, interval=0.01):
+    """Hit /health repeatedly for `duration` seconds and return latencies in ms."""
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run(args):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+    os.environ["OPENAI_TRANSCRIPTION_BACKEND"] = args.backend
+    os.environ["OPENAI_TRANSCRIPTION_MAX_CONCURRENCY"] = str(args.concurrency)
+
+    import httpx
+    from app.main import app
+    from app.services.openai_service import openai_service
+
+    async def async_stub(**kwargs):
+        await asyncio.sleep(args.latency)
+        return SimpleNamespace(text="stub transcript")
+
+    def sync_stub(**kwargs):
+        time.sleep(args.latency)
+        return SimpleNamespace(text="stub transcript")
+
+    openai_service.client.audio.transcriptions.create = async_stub
+    openai_service.sync_client.audio.transcriptions.create = sync_stub
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        idle = await probe_health(client, args.probe_seconds)
+
+        async def transcribe():
+            files = {"audio": ("audio.webm", b"\0" * args.payload_bytes, "audio/webm")}
+            response = await client.post("/api/v1/transcription/whisper", files=files)
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        uploads = asyncio.gather(*(transcribe() for _ in range(args.transcriptions)))
+        loaded = await probe_health(client, args.probe_seconds)
+        await uploads
+        elapsed = time.perf_counter() - started
+
+    print(f"backend={args.backend} transcriptions={args.transcriptions} "
+          f"concurrency={args.concurrency} stub_latency={args.latency}s")
+    for label, samples in (("idle", idle), ("loaded", loaded)):
+        print(f"  /health {label:6s} n={len(samples):4d} "
+              f"p50={statistics.median(samples):7.2f}ms "
+              f"p99={percentile(samples, 99):7.2f}ms "
+              f"max={max(samples):7.2f}ms")
+    print(f"  all transcriptions finished in {elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transcriptions", type=int, default=16, help="Transcriptions in flight")
+    parser.add_argument("--concurrency", type=int, default=4, help="OPENAI_TRANSCRIPTION_MAX_CONCURRENCY")
+    parser.add_argument("--backend", choices=["async", "thread"], default="async")
+    parser.add_argument("--latency", type=float, default=1.0, help="Stub Whisper latency in seconds")
+    parser.add_argument("--payload-bytes", type=int, default=256 * 1024)
+    parser.add_argument("--probe-seconds", type=float, default=2.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Benchmark: /ws/voice audio frames as base64-in-JSON vs. the binary sub-protocol.
+
+For one voice turn (an inbound utterance and an outbound answer clip) this
+compares the bytes on the wire and the server CPU spent decoding the inbound
+frame and encoding the outbound one, using the same codec the route uses.
+
+Usage:
+    python benchmarks/voice_frame_encoding.py --utterance-kb 480 --reply-kb 320
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def measure(turn, iterations):
+    """Return (server CPU ms per turn, wire bytes per turn) for a turn function."""
+    wire_bytes = turn()
+    start = time.process_time()
+    for _ in range(iterations):
+        turn()
+    return (time.process_time() - start) * 1000 / iterations, wire_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--utterance-kb", type=int, default=480, help="Inbound audio per turn")
+    parser.add_argument("--reply-kb", type=int, default=320, help="Outbound audio per turn")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+    from app.routes.websocket import (
+        FRAME_AUDIO,
+        FRAME_AUDIO_REPLY,
+        decode_audio_frame,
+        encode_audio_frame,
+    )
+
+    utterance = os.urandom(args.utterance_kb * 1024)
+    reply = os.urandom(args.reply_kb * 1024)
+
+    # What each client puts on the wire for the utterance
+    json_inbound = json.dumps({"type": "audio", "data": base64.b64encode(utterance).decode("utf-8")})
+    binary_inbound = encode_audio_frame(FRAME_AUDIO, 0, utterance)
+
+    def json_turn():
+        audio_data = base64.b64decode(json.loads(json_inbound)["data"])
+        outbound = json.dumps(
+            {"type": "audio", "data": base64.b64encode(reply).decode("utf-8")},
+            separators=(",", ":"),
+        ).encode("utf-8")
+        assert len(audio_data) == len(utterance)
+        return len(json_inbound.encode("utf-8")) + len(outbound)
+
+    def binary_turn():
+        _, _, payload = decode_audio_frame(binary_inbound)
+        audio_data = payload.tobytes()
+        outbound = encode_audio_frame(FRAME_AUDIO_REPLY, 0, reply)
+        assert len(audio_data) == len(utterance)
+        return len(binary_inbound) + len(outbound)
+
+    raw = len(utterance) + len(reply)
+    print(f"utterance={args.utterance_kb}KB reply={args.reply_kb}KB iterations={args.iterations}")
+    results = {}
+    for label, turn in (("json+base64", json_turn), ("binary", binary_turn)):
+        cpu_ms, wire = measure(turn, args.iterations)
+        results[label] = cpu_ms
+        print(f"  {label:12s} wire={wire / 1024:9.1f}KB ({wire / raw - 1:+6.1%} vs raw) "
+              f"server_cpu={cpu_ms:7.3f}ms/turn")
+    print(f"  binary uses {results['binary'] / results['json+base64']:.1%} of the JSON CPU per turn")
+
+
+if __name__ == "__main__":
+    main()